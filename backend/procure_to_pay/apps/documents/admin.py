@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DocumentProcessing, Proforma, PurchaseOrder, Receipt
+from .models import DocumentProcessing, Proforma, PurchaseOrder, Receipt, UploadSession, DocumentPreview
 
 @admin.register(DocumentProcessing)
 class DocumentProcessingAdmin(admin.ModelAdmin):
@@ -20,4 +20,16 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
 @admin.register(Receipt)
 class ReceiptAdmin(admin.ModelAdmin):
     list_display = ('po', 'uploaded_by', 'created_at')
-    list_filter = ('created_at',)
\ No newline at end of file
+    list_filter = ('created_at',)
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'uploaded_by', 'total_size', 'status', 'created_at')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('created_at', 'updated_at', 'completed_at')
+
+@admin.register(DocumentPreview)
+class DocumentPreviewAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'variant', 'size', 'created_at', 'last_accessed_at')
+    list_filter = ('variant',)
+    readonly_fields = ('created_at', 'last_accessed_at')
\ No newline at end of file
@@ -0,0 +1,133 @@
+import struct
+import zlib
+from django.conf import settings
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Stored blobs that were compressed start with this frame header:
+# MAGIC (4 bytes) + codec id (1 byte) + original size (8 bytes, big-endian).
+# Anything without the header is a legacy, uncompressed blob and is served as-is.
+MAGIC = b'P2PC'
+HEADER = struct.Struct('>4sBQ')
+HEADER_SIZE = HEADER.size
+
+CODEC_IDS = {'zlib': 1, 'zstd': 2}
+CODEC_NAMES = {value: key for key, value in CODEC_IDS.items()}
+
+# Formats that are already compressed gain nothing from another pass
+INCOMPRESSIBLE_TYPES = {
+    'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp',
+    'application/zip', 'application/gzip', 'application/x-7z-compressed',
+    'application/zstd',
+}
+
+# Scanned TIFFs and PDFs are large and benefit from zstd's better ratio;
+# small text exports compress well enough with zlib
+PREFERRED_CODECS = {
+    'application/pdf': 'zstd',
+    'image/tiff': 'zstd',
+    'image/bmp': 'zstd',
+    'text/csv': 'zlib',
+    'text/plain': 'zlib',
+}
+
+LEVELS = {'zlib': 6, 'zstd': 10}
+
+
+def choose_codec(content_type):
+    """Codec to store a blob of this content type with, or None to store it raw"""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if not getattr(settings, 'DOCUMENT_COMPRESSION', True) or content_type in INCOMPRESSIBLE_TYPES:
+        return None
+    codec = PREFERRED_CODECS.get(content_type, 'zstd')
+    if codec == 'zstd' and zstandard is None:
+        codec = 'zlib'
+    return codec
+
+
+def read_header(head):
+    """Return (codec, original_size) for a framed blob, or None for a raw one"""
+    if head is None or len(head) < HEADER_SIZE:
+        return None
+    magic, codec_id, size = HEADER.unpack(bytes(head[:HEADER_SIZE]))
+    if magic != MAGIC or codec_id not in CODEC_NAMES:
+        return None
+    return CODEC_NAMES[codec_id], size
+
+
+def encode_blob(data, content_type):
+    """Compress raw document bytes for storage when that actually saves space"""
+    if data is None:
+        return None
+    data = bytes(data)
+    if read_header(data) is not None:
+        return data
+    codec = choose_codec(content_type)
+    if codec is None or len(data) < getattr(settings, 'DOCUMENT_COMPRESSION_MIN_SIZE', 1024):
+        return data
+    if codec == 'zstd':
+        payload = zstandard.ZstdCompressor(level=LEVELS['zstd']).compress(data)
+    else:
+        payload = zlib.compress(data, LEVELS['zlib'])
+    if len(payload) + HEADER_SIZE >= len(data):
+        return data
+    return HEADER.pack(MAGIC, CODEC_IDS[codec], len(data)) + payload
+
+
+def _decompressor(codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read this document')
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj()
+
+
+def iter_decoded(chunks):
+    """Decode a stored blob supplied as an iterator of chunks, yielding raw bytes"""
+    chunks = iter(chunks)
+    head = b''
+    for chunk in chunks:
+        head += bytes(chunk)
+        if len(head) >= HEADER_SIZE:
+            break
+    frame = read_header(head)
+    if frame is None:
+        if head:
+            yield head
+        for chunk in chunks:
+            yield bytes(chunk)
+        return
+
+    decompressor = _decompressor(frame[0])
+    data = decompressor.decompress(head[HEADER_SIZE:])
+    if data:
+        yield data
+    for chunk in chunks:
+        data = decompressor.decompress(bytes(chunk))
+        if data:
+            yield data
+    if hasattr(decompressor, 'flush'):
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+def decode_blob(data):
+    """Return the raw bytes of a stored blob, framed or not"""
+    if data is None:
+        return None
+    return b''.join(iter_decoded([data]))
+
+
+def slice_stream(chunks, start, end):
+    """Yield only bytes [start, end] of a stream of chunks"""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0):end - position + 1]
+        position = chunk_end
+        if position > end:
+            break
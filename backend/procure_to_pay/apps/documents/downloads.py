@@ -0,0 +1,280 @@
+import abc
+import hashlib
+import os
+import re
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import BinaryField, F, Func, Value
+from django.db.models.functions import Length
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header, http_date, parse_http_date_safe, quote_etag
+)
+from .codecs import HEADER_SIZE, iter_decoded, read_header, slice_stream
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _substr(field_name, offset, length):
+    """SUBSTR over a binary column; offset is zero-based"""
+    return Func(
+        F(field_name), Value(offset + 1), Value(length),
+        function='SUBSTR', output_field=BinaryField()
+    )
+
+
+class DocumentSource(abc.ABC):
+    """A stored document that can be streamed in chunks instead of loaded whole"""
+
+    def __init__(self, filename, content_type, size, last_modified=None, version=''):
+        self.filename = filename
+        self.content_type = content_type or 'application/octet-stream'
+        self.size = size
+        self.last_modified = last_modified
+        self.version = version
+
+    @property
+    def etag(self):
+        """Cheap validator derived from metadata, never from the content itself"""
+        stamp = self.last_modified.timestamp() if self.last_modified else ''
+        digest = hashlib.md5(f"{self.version}:{stamp}:{self.size}".encode()).hexdigest()
+        return quote_etag(digest)
+
+    @property
+    def last_modified_timestamp(self):
+        return int(self.last_modified.timestamp()) if self.last_modified else None
+
+    @abc.abstractmethod
+    def iter_range(self, start, end, chunk_size):
+        """Yield the bytes in [start, end] in chunks of at most chunk_size"""
+
+    async def aiter_range(self, start, end, chunk_size):
+        """iter_range for ASGI: each chunk is read on a thread, none is held while the client drains it"""
+        chunks = self.iter_range(start, end, chunk_size)
+        read = sync_to_async(next)
+        while (chunk := await read(chunks, None)) is not None:
+            yield chunk
+
+    def sendfile_path(self):
+        """Path the front proxy can serve directly, if the document lives on disk"""
+        return None
+
+
+class DatabaseBlobSource(DocumentSource):
+    """Document stored in a BinaryField, read back with one SUBSTR query per chunk.
+
+    Compressed blobs (see codecs.py) are decompressed on the fly, so callers
+    always see the original bytes and size.
+    """
+
+    def __init__(self, model, pk, field_name, stored_size=None, codec=None, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+        self.pk = pk
+        self.field_name = field_name
+        self.stored_size = stored_size if stored_size is not None else self.size
+        self.codec = codec
+
+    @classmethod
+    def load(cls, model, pk, field_name, **kwargs):
+        """Build a source for model.field_name, or None when the blob is empty"""
+        row = model.objects.filter(pk=pk).annotate(
+            blob_size=Length(field_name),
+            blob_head=_substr(field_name, 0, HEADER_SIZE)
+        ).values_list('blob_size', 'blob_head').first()
+        if not row or not row[0]:
+            return None
+        stored_size, head = row
+        frame = read_header(head)
+        if frame is None:
+            return cls(model, pk, field_name, size=stored_size, **kwargs)
+        codec, size = frame
+        return cls(model, pk, field_name, size=size, stored_size=stored_size, codec=codec, **kwargs)
+
+    def iter_range(self, start, end, chunk_size):
+        if self.codec is None:
+            return self._iter_stored(start, end, chunk_size)
+        # Compressed offsets do not map to raw offsets: decode from the start
+        decoded = iter_decoded(self._iter_stored(0, self.stored_size - 1, chunk_size))
+        return slice_stream(decoded, start, end)
+
+    async def aiter_range(self, start, end, chunk_size):
+        if self.codec is not None:
+            async for chunk in super().aiter_range(start, end, chunk_size):
+                yield chunk
+            return
+        position = start
+        while position <= end:
+            length = min(chunk_size, end - position + 1)
+            chunk = await self._chunk_query(position, length).afirst()
+            if not chunk:
+                break
+            chunk = bytes(chunk)
+            position += len(chunk)
+            yield chunk
+
+    def _chunk_query(self, position, length):
+        return self.model.objects.filter(pk=self.pk).annotate(
+            blob_chunk=_substr(self.field_name, position, length)
+        ).values_list('blob_chunk', flat=True)
+
+    def _iter_stored(self, start, end, chunk_size):
+        position = start
+        while position <= end:
+            length = min(chunk_size, end - position + 1)
+            chunk = self._chunk_query(position, length).first()
+            if not chunk:
+                break
+            chunk = bytes(chunk)
+            position += len(chunk)
+            yield chunk
+
+
+class FieldFileSource(DocumentSource):
+    """Document stored through a FileField on the configured storage"""
+
+    def __init__(self, field_file, **kwargs):
+        super().__init__(**kwargs)
+        self.field_file = field_file
+
+    @classmethod
+    def load(cls, field_file, **kwargs):
+        """Build a source for a FieldFile, or None when nothing is stored"""
+        if not field_file or not field_file.name:
+            return None
+        try:
+            size = field_file.storage.size(field_file.name)
+        except (OSError, NotImplementedError):
+            return None
+        kwargs.setdefault('filename', os.path.basename(field_file.name))
+        return cls(field_file, size=size, **kwargs)
+
+    def iter_range(self, start, end, chunk_size):
+        with self.field_file.storage.open(self.field_file.name, 'rb') as handle:
+            handle.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = handle.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def sendfile_path(self):
+        try:
+            return self.field_file.storage.path(self.field_file.name)
+        except NotImplementedError:
+            return None
+
+
+def parse_range_header(header, size):
+    """Parse a single 'bytes=' range into (start, end).
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range) and raises ValueError when the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, source):
+    """A Range is only honoured when If-Range (if sent) still matches the document"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == source.etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and source.last_modified_timestamp is not None and \
+        source.last_modified_timestamp <= since
+
+
+def _sendfile_response(source):
+    """Hand the transfer to the front proxy instead of streaming it from Python"""
+    backend = getattr(settings, 'DOCUMENT_SENDFILE_BACKEND', '')
+    path = source.sendfile_path() if backend else None
+    if not path:
+        return None
+    if backend == 'nginx':
+        try:
+            relative = os.path.relpath(path, settings.MEDIA_ROOT)
+        except ValueError:
+            # Different drive on Windows
+            return None
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            # Outside MEDIA_ROOT, so not under the internal location either: stream it
+            return None
+        response = HttpResponse(content_type=source.content_type)
+        response['X-Accel-Redirect'] = (
+            settings.DOCUMENT_SENDFILE_PREFIX.rstrip('/') + '/' + relative.replace(os.sep, '/')
+        )
+    else:
+        response = HttpResponse(content_type=source.content_type)
+        response['X-Sendfile'] = path
+    return response
+
+
+def _is_asgi(request):
+    # DRF views pass their Request wrapper
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def serve_document(request, source, as_attachment=True):
+    """Stream a DocumentSource honouring Range and conditional request headers"""
+    last_modified = source.last_modified_timestamp
+    response = get_conditional_response(request, etag=source.etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    response = _sendfile_response(source)
+    if response is None:
+        try:
+            byte_range = parse_range_header(request.META.get('HTTP_RANGE'), source.size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{source.size}'
+            return response
+
+        if byte_range is None or not _if_range_matches(request, source):
+            byte_range = (0, source.size - 1)
+            status = 200
+        else:
+            status = 206
+
+        start, end = byte_range
+        chunk_size = settings.DOCUMENT_STREAM_CHUNK_SIZE
+        # Under ASGI a sync iterator would be read whole into memory before sending
+        iter_range = source.aiter_range if _is_asgi(request) else source.iter_range
+        response = StreamingHttpResponse(
+            iter_range(start, end, chunk_size),
+            status=status,
+            content_type=source.content_type
+        )
+        response['Content-Length'] = str(end - start + 1)
+        if status == 206:
+            response['Content-Range'] = f'bytes {start}-{end}/{source.size}'
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = source.etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Content-Disposition'] = content_disposition_header(as_attachment, source.filename)
+    return response
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from ...codecs import choose_codec, decode_blob, encode_blob, read_header
+from ....requests.models import PurchaseRequest
+from ....finance.models import FinancialDocument
+
+class Command(BaseCommand):
+    help = 'Compress stored document blobs and report storage before and after'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Rows loaded per batch (each row holds full document blobs)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the expected savings without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+
+        totals = [0, 0, 0]
+        for model, blob_fields in self.targets():
+            before, after, rows = self.compress_model(model, blob_fields)
+            totals = [totals[0] + before, totals[1] + after, totals[2] + rows]
+
+        self.report('Total', *totals)
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('Dry run: no rows were changed'))
+
+    def targets(self):
+        yield PurchaseRequest, {
+            field: type_field for field, type_field in PurchaseRequest.BLOB_CONTENT_TYPES.items()
+        }
+        yield FinancialDocument, {'file_content': 'content_type'}
+
+    def compress_model(self, model, blob_fields):
+        self.stdout.write(f'\n--- {model._meta.verbose_name_plural.title()} ---')
+        before = after = rows_changed = 0
+
+        # Only rows that hold at least one blob; the blobs themselves load per batch
+        has_blob = Q()
+        for field in blob_fields:
+            has_blob |= Q(**{f'{field}__isnull': False})
+        pks = list(model.objects.filter(has_blob).order_by('pk').values_list('pk', flat=True))
+
+        type_fields = [type_field for type_field in blob_fields.values() if type_field]
+        for offset in range(0, len(pks), self.batch_size):
+            batch = pks[offset:offset + self.batch_size]
+            rows = model.objects.filter(pk__in=batch).values('pk', *blob_fields, *type_fields)
+            for row in rows:
+                updates = {}
+                for field, type_field in blob_fields.items():
+                    stored = row[field]
+                    if not stored:
+                        continue
+                    content_type = row[type_field] if type_field else 'application/pdf'
+                    recompressed = self.recompress(bytes(stored), content_type)
+                    before += len(stored)
+                    after += len(recompressed)
+                    if recompressed != bytes(stored):
+                        updates[field] = recompressed
+                if updates:
+                    rows_changed += 1
+                    if not self.dry_run:
+                        # update() keeps updated_at (and so download ETags) unchanged
+                        model.objects.filter(pk=row['pk']).update(**updates)
+
+        self.report(model._meta.verbose_name_plural.title(), before, after, rows_changed)
+        return before, after, rows_changed
+
+    def recompress(self, stored, content_type):
+        """Re-encode a blob when it is raw or stored with a codec we no longer prefer"""
+        frame = read_header(stored)
+        preferred = choose_codec(content_type)
+        if frame is not None and frame[0] == preferred:
+            return stored
+        return encode_blob(decode_blob(stored), content_type)
+
+    def report(self, label, before, after, rows):
+        saved = before - after
+        ratio = (saved / before * 100) if before else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: {before:,} bytes -> {after:,} bytes '
+            f'({saved:,} saved, {ratio:.1f}%), {rows} rows recompressed'
+        ))
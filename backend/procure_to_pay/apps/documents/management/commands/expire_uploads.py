@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from ...uploads import ChunkedUploadService
+
+class Command(BaseCommand):
+    help = 'Discard chunked uploads idle for UPLOAD_SESSION_TTL_HOURS and their partial files'
+
+    def handle(self, *args, **options):
+        expired = ChunkedUploadService().expire()
+        self.stdout.write(self.style.SUCCESS(f'{expired} uploads expired'))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPreview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('variant', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('page', 'First Page')], max_length=10)),
+                ('image', models.BinaryField()),
+                ('content_type', models.CharField(default='image/png', max_length=50)),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_accessed_at'], name='documents_d_last_ac_2b0e91_idx')],
+                'unique_together': {('content_hash', 'variant')},
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.conf import settings
 
@@ -48,4 +49,66 @@ class Receipt(models.Model):
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     
     def __str__(self):
-        return f"Receipt - PO {self.po.id} - {self.created_at}"
\ No newline at end of file
+        return f"Receipt - PO {self.po.id} - {self.created_at}"
+
+class UploadSession(models.Model):
+    """A resumable upload assembled on disk from independently sent chunks"""
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+        ('aborted', 'Aborted'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Chunk index -> SHA-256 of that chunk, recorded as chunks arrive
+    received_chunks = models.JSONField(default=dict, blank=True)
+    content_hash = models.CharField(max_length=80, blank=True)
+    file = models.FileField(upload_to='uploads/', blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def missing_chunks(self):
+        return [i for i in range(self.total_chunks) if str(i) not in self.received_chunks]
+    
+    def __str__(self):
+        return f"Upload {self.filename} ({self.get_status_display()})"
+
+
+class DocumentPreview(models.Model):
+    """Rendered thumbnail or first-page image, shared by every document with the same content"""
+    VARIANTS = [
+        ('thumbnail', 'Thumbnail'),
+        ('page', 'First Page'),
+    ]
+    
+    content_hash = models.CharField(max_length=64)
+    variant = models.CharField(max_length=10, choices=VARIANTS)
+    image = models.BinaryField()
+    content_type = models.CharField(max_length=50, default='image/png')
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['content_hash', 'variant']
+        indexes = [
+            models.Index(fields=['last_accessed_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_variant_display()} - {self.content_hash[:12]}"
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.utils import timezone
+from PIL import Image, ImageDraw
+from .models import DocumentPreview
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewService:
+    """Render document previews once and serve them from a content-addressed cache.
+
+    Previews are keyed by the SHA-256 of the document content, so identical
+    files share one rendering and replacing a document never serves a stale
+    image. The table is bounded by PREVIEW_CACHE_MAX_BYTES, evicting the
+    least recently used previews first.
+    """
+
+    SIZES = {
+        'thumbnail': (240, 320),
+        'page': (1024, 1400),
+    }
+    HASH_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+    TOUCH_INTERVAL = timedelta(hours=1)
+
+    def get_preview(self, source, variant):
+        """Return a DocumentPreview for a DocumentSource, rendering it on first use"""
+        content_hash = self.content_hash(source)
+        preview = DocumentPreview.objects.filter(content_hash=content_hash, variant=variant).first()
+        if preview is not None:
+            self._touch(preview)
+            return preview
+
+        image = self._render(source, variant)
+        if image is None:
+            return None
+        try:
+            preview = DocumentPreview.objects.create(
+                content_hash=content_hash,
+                variant=variant,
+                image=image,
+                size=len(image)
+            )
+        except IntegrityError:
+            # Another worker rendered the same content first
+            return DocumentPreview.objects.get(content_hash=content_hash, variant=variant)
+        self.evict()
+        return preview
+
+    def content_hash(self, source):
+        """SHA-256 of the document, memoized against its cheap metadata validator"""
+        key = f'preview:hash:{source.etag}'
+        content_hash = cache.get(key)
+        if content_hash is None:
+            hasher = hashlib.sha256()
+            for chunk in source.iter_range(0, source.size - 1, settings.DOCUMENT_STREAM_CHUNK_SIZE):
+                hasher.update(chunk)
+            content_hash = hasher.hexdigest()
+            cache.set(key, content_hash, self.HASH_CACHE_TIMEOUT)
+        return content_hash
+
+    def evict(self):
+        """Drop least recently used previews until the cache fits its byte budget"""
+        budget = settings.PREVIEW_CACHE_MAX_BYTES
+        total = DocumentPreview.objects.aggregate(total=Sum('size'))['total'] or 0
+        if total <= budget:
+            return 0
+
+        evicted = []
+        for pk, size in DocumentPreview.objects.order_by('last_accessed_at').values_list('pk', 'size').iterator():
+            if total <= budget:
+                break
+            evicted.append(pk)
+            total -= size
+        DocumentPreview.objects.filter(pk__in=evicted).delete()
+        return len(evicted)
+
+    def _touch(self, preview):
+        # Recency only drives eviction, so an hourly resolution avoids a write per hit
+        now = timezone.now()
+        if now - preview.last_accessed_at > self.TOUCH_INTERVAL:
+            DocumentPreview.objects.filter(pk=preview.pk).update(last_accessed_at=now)
+
+    def _render(self, source, variant):
+        suffix = os.path.splitext(source.filename or '')[1].lower() or '.bin'
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, f'document{suffix}')
+            with open(path, 'wb') as handle:
+                for chunk in source.iter_range(0, source.size - 1, settings.DOCUMENT_STREAM_CHUNK_SIZE):
+                    handle.write(chunk)
+            try:
+                image = self._first_page(path, source.content_type, workdir)
+            except Exception as e:
+                logger.warning(f"Preview rendering failed for {source.filename}: {e}")
+                return None
+        if image is None:
+            return None
+
+        image.thumbnail(self.SIZES[variant])
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = BytesIO()
+        image.save(output, format='PNG', optimize=True)
+        return output.getvalue()
+
+    def _first_page(self, path, content_type, workdir):
+        if content_type == 'application/pdf' or path.endswith('.pdf'):
+            return self._render_pdf(path, workdir)
+        if content_type.startswith('image/'):
+            image = Image.open(path)
+            image.seek(0)  # first frame of multi-page TIFFs
+            image.load()
+            return image
+        if content_type.startswith('text/'):
+            return self._render_text(path)
+        return None
+
+    def _render_pdf(self, path, workdir):
+        # poppler-utils ships in the Docker image; pdfplumber (ImageMagick) is the fallback
+        if shutil.which('pdftoppm'):
+            output = os.path.join(workdir, 'page')
+            subprocess.run(
+                ['pdftoppm', '-png', '-f', '1', '-l', '1', '-scale-to', str(self.SIZES['page'][1]),
+                 '-singlefile', path, output],
+                check=True, timeout=30, capture_output=True
+            )
+            image = Image.open(f'{output}.png')
+            image.load()
+            return image
+
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            if not pdf.pages:
+                return None
+            return pdf.pages[0].to_image(resolution=100).original.copy()
+
+    def _render_text(self, path, max_lines=60):
+        with open(path, 'r', encoding='utf-8', errors='replace') as handle:
+            lines = [line.rstrip('\n')[:120] for _, line in zip(range(max_lines), handle)]
+        image = Image.new('L', self.SIZES['page'], color=255)
+        draw = ImageDraw.Draw(image)
+        for number, line in enumerate(lines):
+            draw.text((24, 24 + number * 22), line, fill=0)
+        return image
+
+
+def serve_preview(request, source, variant):
+    """Preview response for a DocumentSource, or None when it cannot be rendered.
+
+    Clients that pass a version (``?v=``, e.g. the request's updated_at) get an
+    immutable, year-long cache lifetime; unversioned URLs revalidate with the
+    content-hash ETag, which is answered with 304 before anything is rendered.
+    """
+    service = PreviewService()
+    etag = quote_etag(f'{service.content_hash(source)}-{variant}')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        preview = service.get_preview(source, variant)
+        if preview is None:
+            return None
+        response = HttpResponse(bytes(preview.image), content_type=preview.content_type)
+
+    response['ETag'] = etag
+    if request.GET.get('v'):
+        response['Cache-Control'] = f'private, max-age={settings.PREVIEW_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'private, no-cache'
+    return response
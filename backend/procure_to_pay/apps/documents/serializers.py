@@ -0,0 +1,19 @@
+from rest_framework import serializers
+from .models import UploadSession
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received = serializers.SerializerMethodField()
+    missing = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'content_type', 'total_size', 'chunk_size', 'total_chunks',
+                 'received', 'missing', 'content_hash', 'status', 'created_at', 'completed_at']
+        read_only_fields = fields
+    
+    def get_received(self, obj):
+        return sorted(int(index) for index in obj.received_chunks)
+    
+    def get_missing(self, obj):
+        return obj.missing_chunks()
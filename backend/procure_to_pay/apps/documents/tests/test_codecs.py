@@ -0,0 +1,77 @@
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from ..codecs import decode_blob, encode_blob, iter_decoded, read_header
+from ...requests.models import PurchaseRequest
+
+User = get_user_model()
+
+class BlobCodecTest(TestCase):
+    def setUp(self):
+        self.text = b'Item, Quantity, Unit price\n' * 500
+
+    def test_text_is_compressed(self):
+        """Test compressible content types are framed and shrink"""
+        stored = encode_blob(self.text, 'text/csv')
+        self.assertEqual(read_header(stored), ('zlib', len(self.text)))
+        self.assertLess(len(stored), len(self.text))
+        self.assertEqual(decode_blob(stored), self.text)
+
+    def test_images_are_stored_raw(self):
+        """Test already-compressed formats are skipped"""
+        self.assertEqual(encode_blob(self.text, 'image/jpeg'), self.text)
+
+    def test_streamed_decode(self):
+        """Test decoding works across arbitrary chunk boundaries"""
+        stored = encode_blob(self.text, 'application/pdf')
+        chunks = [stored[i:i + 7] for i in range(0, len(stored), 7)]
+        self.assertEqual(b''.join(iter_decoded(chunks)), self.text)
+
+    def test_legacy_blobs_pass_through(self):
+        """Test uncompressed rows are served unchanged"""
+        self.assertEqual(decode_blob(b'%PDF-1.4 raw'), b'%PDF-1.4 raw')
+
+    @override_settings(DOCUMENT_COMPRESSION=False)
+    def test_compression_can_be_disabled(self):
+        """Test the DOCUMENT_COMPRESSION switch"""
+        self.assertEqual(encode_blob(self.text, 'text/csv'), self.text)
+
+    def test_model_save_compresses(self):
+        """Test document blobs are compressed transparently on save"""
+        user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        request = PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=user,
+            receipt_content=self.text,
+            receipt_content_type='text/plain'
+        )
+        stored = PurchaseRequest.objects.values_list('receipt_content', flat=True).get(pk=request.pk)
+        self.assertIsNotNone(read_header(stored))
+
+    def test_compress_command_reports_savings(self):
+        """Test the recompression command shrinks legacy rows"""
+        user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        request = PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=user
+        )
+        # Simulate a row written before compression existed
+        PurchaseRequest.objects.filter(pk=request.pk).update(
+            proforma_content=self.text, proforma_content_type='text/plain'
+        )
+
+        out = StringIO()
+        call_command('compress_documents', stdout=out)
+        self.assertIn('1 rows recompressed', out.getvalue())
+        stored = PurchaseRequest.objects.values_list('proforma_content', flat=True).get(pk=request.pk)
+        self.assertEqual(decode_blob(stored), self.text)
@@ -0,0 +1,96 @@
+from io import BytesIO
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from PIL import Image
+from ..models import DocumentPreview
+from ..previews import PreviewService
+from ...requests.models import PurchaseRequest
+
+User = get_user_model()
+
+class DocumentPreviewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.client.force_authenticate(user=self.staff_user)
+        self.image = self.make_png((800, 600))
+
+    def make_png(self, size, color='white'):
+        output = BytesIO()
+        Image.new('RGB', size, color=color).save(output, format='PNG')
+        return output.getvalue()
+
+    def create_request(self, content, content_type='image/png', filename='scan.png'):
+        return PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=self.staff_user,
+            proforma_content=content,
+            proforma_filename=filename,
+            proforma_content_type=content_type
+        )
+
+    def test_thumbnail_rendered_once(self):
+        """Test thumbnails are rendered on first use and then served from cache"""
+        request = self.create_request(self.image)
+        url = f'/api/requests/{request.id}/preview/proforma/'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        thumbnail = Image.open(BytesIO(response.content))
+        self.assertLessEqual(thumbnail.width, 240)
+
+        self.client.get(url)
+        self.assertEqual(DocumentPreview.objects.count(), 1)
+
+    def test_identical_content_shares_preview(self):
+        """Test previews are keyed by content hash, not by document"""
+        first = self.create_request(self.image)
+        second = self.create_request(self.image)
+        self.client.get(f'/api/requests/{first.id}/preview/proforma/')
+        self.client.get(f'/api/requests/{second.id}/preview/proforma/')
+        self.assertEqual(DocumentPreview.objects.count(), 1)
+
+    def test_conditional_and_versioned_caching(self):
+        """Test ETag revalidation and immutable versioned URLs"""
+        request = self.create_request(self.image)
+        url = f'/api/requests/{request.id}/preview/proforma/'
+
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, {'v': '1', 'variant': 'page'})
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_text_documents_render(self):
+        """Test plain-text documents get a first-page image"""
+        request = self.create_request(b'Vendor: ABC Supplies\nOffice chair x2\n', 'text/plain', 'quote.txt')
+        response = self.client.get(f'/api/requests/{request.id}/preview/proforma/', {'variant': 'page'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_document_preview(self):
+        """Test previews of absent documents return 404"""
+        request = self.create_request(self.image)
+        response = self.client.get(f'/api/requests/{request.id}/preview/receipt/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_size_bounded_eviction(self):
+        """Test least recently used previews are evicted over budget"""
+        for color in ['red', 'green', 'blue']:
+            request = self.create_request(self.make_png((300, 300), color))
+            self.client.get(f'/api/requests/{request.id}/preview/proforma/')
+        budget = DocumentPreview.objects.order_by('-last_accessed_at').first().size
+        with override_settings(PREVIEW_CACHE_MAX_BYTES=budget):
+            PreviewService().evict()
+        self.assertEqual(DocumentPreview.objects.count(), 1)
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from ...requests.models import PurchaseRequest
+from ...finance.models import FinancialDocument
+from ..models import UploadSession
+from ..uploads import ChunkedUploadService
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, UPLOAD_CHUNK_SIZE=1024)
+class ChunkedUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.finance_user = User.objects.create_user(
+            username='finance1', email='finance1@example.com', password='test123', role='finance'
+        )
+        self.content = b'%PDF-1.4\n' + b'x' * 2500
+        self.client.force_authenticate(user=self.staff_user)
+
+    def start_upload(self, filename='quote.pdf'):
+        response = self.client.post('/api/documents/uploads/', {
+            'filename': filename,
+            'total_size': len(self.content),
+            'chunk_size': 1024
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def put_chunk(self, upload_id, index, **extra):
+        data = self.content[index * 1024:(index + 1) * 1024]
+        return self.client.put(
+            f'/api/documents/uploads/{upload_id}/chunks/{index}/',
+            data, content_type='application/octet-stream', **extra
+        )
+
+    def test_out_of_order_upload_and_resume(self):
+        """Test chunks can arrive in any order and progress is reported"""
+        upload_id = self.start_upload()
+        self.assertEqual(self.put_chunk(upload_id, 2).status_code, status.HTTP_200_OK)
+        response = self.put_chunk(upload_id, 0)
+        self.assertEqual(response.data['content_type'], 'application/pdf')
+
+        progress = self.client.get(f'/api/documents/uploads/{upload_id}/')
+        self.assertEqual(progress.data['missing'], [1])
+
+        response = self.client.post(f'/api/documents/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.put_chunk(upload_id, 1)
+        response = self.client.post(f'/api/documents/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertTrue(response.data['content_hash'].endswith('-3'))
+
+    def test_chunk_integrity_check(self):
+        """Test a chunk whose digest does not match is rejected"""
+        upload_id = self.start_upload()
+        response = self.put_chunk(upload_id, 0, HTTP_X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        digest = hashlib.sha256(self.content[:1024]).hexdigest()
+        response = self.put_chunk(upload_id, 0, HTTP_X_CHUNK_SHA256=digest)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_wrong_chunk_length_rejected(self):
+        """Test chunks must match the negotiated chunk size"""
+        upload_id = self.start_upload()
+        response = self.client.put(
+            f'/api/documents/uploads/{upload_id}/chunks/0/',
+            b'short', content_type='application/octet-stream'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unrecognised_type_rejected(self):
+        """Test a first chunk that sniffs as generic binary aborts the upload"""
+        self.content = b'\x01\x02\x03' * 1000
+        upload_id = self.start_upload('blob.bin')
+        response = self.put_chunk(upload_id, 0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def complete_upload(self, filename='quote.pdf'):
+        upload_id = self.start_upload(filename)
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        self.client.post(f'/api/documents/uploads/{upload_id}/complete/')
+        return upload_id
+
+    def test_chunk_after_complete_is_refused(self):
+        """Test a re-sent chunk cannot write into an upload that was already completed"""
+        upload_id = self.complete_upload()
+        self.content = b'%PDF-1.4\n' + b'y' * 2500
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, status.HTTP_400_BAD_REQUEST)
+        with default_storage.open(f'uploads/{upload_id}/quote.pdf') as stored:
+            self.assertEqual(stored.read(), b'%PDF-1.4\n' + b'x' * 2500)
+
+    @override_settings(UPLOAD_MAX_ACTIVE_SESSIONS=2)
+    def test_active_uploads_are_limited(self):
+        """Test a user cannot keep more than UPLOAD_MAX_ACTIVE_SESSIONS uploads open"""
+        first = self.start_upload()
+        self.start_upload()
+        response = self.client.post('/api/documents/uploads/', {'filename': 'more.pdf', 'total_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.delete(f'/api/documents/uploads/{first}/')
+        self.start_upload()
+
+    def test_expire_discards_idle_uploads(self):
+        """Test idle and unattached uploads are discarded along with their files"""
+        service = ChunkedUploadService()
+        idle = self.start_upload()
+        self.put_chunk(idle, 0)
+        unattached = self.complete_upload()
+        recent = self.start_upload()
+        stray = default_storage.path(f'{service.PARTIAL_DIR}/stray.part')
+        open(stray, 'wb').close()
+        UploadSession.objects.filter(pk__in=[idle, unattached]).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        output = StringIO()
+        call_command('expire_uploads', stdout=output)
+        self.assertIn('2 uploads expired', output.getvalue())
+        statuses = {str(pk): value for pk, value in UploadSession.objects.values_list('pk', 'status')}
+        self.assertEqual([statuses[idle], statuses[unattached], statuses[recent]], ['aborted', 'aborted', 'active'])
+        self.assertFalse(os.path.exists(default_storage.path(f'{service.PARTIAL_DIR}/{idle}.part')))
+        self.assertFalse(default_storage.exists(f'uploads/{unattached}/quote.pdf'))
+        self.assertTrue(os.path.exists(default_storage.path(f'{service.PARTIAL_DIR}/{recent}.part')))
+        self.assertFalse(os.path.exists(stray))
+
+    def test_attach_to_purchase_request(self):
+        """Test a finished upload becomes the request's proforma without a copy"""
+        request = PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=self.staff_user
+        )
+        upload_id = self.complete_upload()
+        response = self.client.post(f'/api/documents/uploads/{upload_id}/attach/', {
+            'target': 'purchase_request', 'request_id': request.id, 'document': 'proforma'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        request.refresh_from_db()
+        self.assertEqual(request.proforma.name, f'uploads/{upload_id}/quote.pdf')
+        self.assertIsNone(request.proforma_content)
+
+        download = self.client.get(f'/api/requests/{request.id}/download/proforma/')
+        self.assertEqual(b''.join(download.streaming_content), self.content)
+
+    def test_attach_runs_field_validators(self):
+        """Test an upload the document field would refuse is not attached"""
+        request = PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=self.staff_user
+        )
+        self.content = b'GIF89a' + b'\x00' * 2500
+        upload_id = self.complete_upload('quote.gif')
+        response = self.client.post(f'/api/documents/uploads/{upload_id}/attach/', {
+            'target': 'purchase_request', 'request_id': request.id, 'document': 'proforma'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        request.refresh_from_db()
+        self.assertFalse(request.proforma)
+
+    def test_attach_to_financial_document(self):
+        """Test finance users can store an upload as a financial document"""
+        self.client.force_authenticate(user=self.finance_user)
+        upload_id = self.complete_upload()
+        response = self.client.post(f'/api/documents/uploads/{upload_id}/attach/', {
+            'target': 'financial_document', 'title': 'Annual contract', 'document_type': 'contract'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        document = FinancialDocument.objects.get(pk=response.data['document_id'])
+        self.assertEqual(document.file_size, len(self.content))
+        download = self.client.get(f'/api/finance/documents/{document.id}/download/')
+        self.assertEqual(b''.join(download.streaming_content), self.content)
+
+    def test_uploads_are_private(self):
+        """Test users cannot see other users' uploads"""
+        upload_id = self.start_upload()
+        self.client.force_authenticate(user=self.finance_user)
+        response = self.client.get(f'/api/documents/uploads/{upload_id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,144 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404
+from drf_spectacular.utils import extend_schema, extend_schema_view
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+from .uploads import ChunkedUploadService
+from ..requests.models import PurchaseRequest
+
+def _error(exc):
+    return Response({'error': ' '.join(exc.messages)}, status=status.HTTP_400_BAD_REQUEST)
+
+@extend_schema_view(
+    retrieve=extend_schema(description="Get upload progress (received and missing chunks)", tags=['Uploads']),
+    destroy=extend_schema(description="Abort an upload and discard received chunks", tags=['Uploads']),
+)
+class UploadSessionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return UploadSession.objects.none()
+        return UploadSession.objects.filter(uploaded_by=self.request.user)
+    
+    @extend_schema(
+        description="Start a resumable upload: {filename, total_size, chunk_size?}",
+        request=None,
+        responses={201: UploadSessionSerializer, 400: None},
+        tags=['Uploads']
+    )
+    def create(self, request):
+        try:
+            session = ChunkedUploadService().initiate(
+                request.user,
+                request.data.get('filename', ''),
+                request.data.get('total_size', 0),
+                request.data.get('chunk_size')
+            )
+        except ValidationError as e:
+            return _error(e)
+        except (ValueError, TypeError):
+            return Response({'error': 'total_size and chunk_size must be integers'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED)
+    
+    def destroy(self, request, pk=None):
+        session = self.get_object()
+        ChunkedUploadService().abort(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @extend_schema(
+        description="Upload chunk N as the raw request body. Re-sending a chunk overwrites it; "
+                    "an optional X-Chunk-SHA256 header is verified against the received bytes.",
+        request=None,
+        responses={200: UploadSessionSerializer, 400: None},
+        tags=['Uploads']
+    )
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        session = self.get_object()
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+            session = ChunkedUploadService().write_chunk(
+                session, int(index), request.stream, length,
+                expected_digest=request.META.get('HTTP_X_CHUNK_SHA256')
+            )
+        except ValidationError as e:
+            return _error(e)
+        return Response(self.get_serializer(session).data)
+    
+    @extend_schema(
+        description="Finish an upload once every chunk has been received",
+        request=None,
+        responses={200: UploadSessionSerializer, 400: None},
+        tags=['Uploads']
+    )
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        try:
+            session = ChunkedUploadService().complete(session)
+        except ValidationError as e:
+            return _error(e)
+        return Response(self.get_serializer(session).data)
+    
+    @extend_schema(
+        description="Attach a completed upload to a purchase request "
+                    "({target: 'purchase_request', request_id, document: 'proforma'|'receipt'}) "
+                    "or store it as a financial document "
+                    "({target: 'financial_document', title, document_type, description?})",
+        request=None,
+        responses={200: None, 400: None, 403: None, 404: None},
+        tags=['Uploads']
+    )
+    @action(detail=True, methods=['post'])
+    def attach(self, request, pk=None):
+        session = self.get_object()
+        target = request.data.get('target')
+        service = ChunkedUploadService()
+        
+        try:
+            if target == 'purchase_request':
+                purchase_request = get_object_or_404(
+                    PurchaseRequest.objects.defer(
+                        'proforma_content', 'purchase_order_content', 'receipt_content'
+                    ),
+                    pk=request.data.get('request_id')
+                )
+                if request.user != purchase_request.created_by:
+                    return Response({'error': 'Permission denied'}, 
+                                  status=status.HTTP_403_FORBIDDEN)
+                document = request.data.get('document', 'proforma')
+                if document == 'receipt' and purchase_request.status != 'approved':
+                    return Response({'error': 'Can only submit receipt for approved requests'}, 
+                                  status=status.HTTP_400_BAD_REQUEST)
+                service.attach_to_request(session, purchase_request, document)
+                return Response({
+                    'message': f'Upload attached as {document}',
+                    'request_id': purchase_request.id
+                })
+            
+            if target == 'financial_document':
+                if request.user.role != 'finance':
+                    return Response({'error': 'Permission denied'}, 
+                                  status=status.HTTP_403_FORBIDDEN)
+                document = service.attach_to_financial_document(
+                    session, request.user,
+                    request.data.get('title', ''),
+                    request.data.get('document_type', 'other'),
+                    request.data.get('description', '')
+                )
+                return Response({
+                    'message': 'Upload stored as financial document',
+                    'document_id': document.id
+                })
+        except ValidationError as e:
+            return _error(e)
+        
+        return Response({'error': "target must be 'purchase_request' or 'financial_document'"}, 
+                      status=status.HTTP_400_BAD_REQUEST)
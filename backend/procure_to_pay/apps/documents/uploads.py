@@ -0,0 +1,279 @@
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from .models import UploadSession
+try:
+    import magic
+except ImportError:
+    magic = None
+
+ALLOWED_UPLOAD_TYPES = [
+    'application/pdf', 'image/jpeg', 'image/png', 'image/bmp', 'image/tiff',
+    'image/gif', 'text/plain', 'text/csv'
+]
+SNIFF_BYTES = 2048
+READ_SIZE = 64 * 1024
+
+
+class ChunkedUploadService:
+    """Assemble an upload on disk from chunks that may arrive in any order.
+
+    Every chunk is hashed as it is received, so completing an upload never
+    re-reads the file: the content hash is the SHA-256 of the ordered chunk
+    digests (the same scheme S3 uses for multipart ETags). The first chunk is
+    MIME-sniffed as soon as it arrives so disallowed files fail early.
+
+    A chunk is received into a temporary file and copied into the assembled
+    file only under the session's row lock, after checking the upload is
+    still active; complete() and abort() change the status under the same
+    lock, so a late or re-sent chunk can never write into a finished file.
+    Each user may have UPLOAD_MAX_ACTIVE_SESSIONS uploads in progress, and
+    expire() discards uploads idle for UPLOAD_SESSION_TTL_HOURS.
+    """
+
+    PARTIAL_DIR = 'uploads/partial'
+
+    def initiate(self, user, filename, total_size, chunk_size=None):
+        filename = self._safe_filename(filename)
+        total_size = int(total_size)
+        chunk_size = int(chunk_size or settings.UPLOAD_CHUNK_SIZE)
+        if total_size <= 0:
+            raise ValidationError('total_size must be greater than zero')
+        if total_size > settings.UPLOAD_MAX_SIZE:
+            raise ValidationError(f'File too large. Maximum size is {settings.UPLOAD_MAX_SIZE} bytes')
+        if not 0 < chunk_size <= settings.UPLOAD_CHUNK_SIZE:
+            raise ValidationError(f'chunk_size must be between 1 and {settings.UPLOAD_CHUNK_SIZE}')
+        active = UploadSession.objects.filter(uploaded_by=user, status='active').count()
+        if active >= settings.UPLOAD_MAX_ACTIVE_SESSIONS:
+            raise ValidationError(
+                f'At most {settings.UPLOAD_MAX_ACTIVE_SESSIONS} uploads may be in progress; '
+                'complete or abort one first'
+            )
+
+        session = UploadSession.objects.create(
+            uploaded_by=user,
+            filename=filename,
+            total_size=total_size,
+            chunk_size=chunk_size
+        )
+
+        # Sparse file sized up front so chunks can be written at their offsets
+        path = self._partial_path(session)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.truncate(total_size)
+        return session
+
+    def write_chunk(self, session, index, stream, length, expected_digest=None):
+        if session.status != 'active':
+            raise ValidationError('Upload is no longer accepting chunks')
+        if not 0 <= index < session.total_chunks:
+            raise ValidationError(f'Chunk index must be between 0 and {session.total_chunks - 1}')
+
+        offset = index * session.chunk_size
+        expected_length = min(session.chunk_size, session.total_size - offset)
+        if length != expected_length:
+            raise ValidationError(f'Chunk {index} must be exactly {expected_length} bytes')
+
+        with tempfile.TemporaryFile() as received:
+            hasher = hashlib.sha256()
+            head = b''
+            written = 0
+            while written < length:
+                piece = stream.read(min(READ_SIZE, length - written))
+                if not piece:
+                    break
+                if len(head) < SNIFF_BYTES:
+                    head += piece[:SNIFF_BYTES - len(head)]
+                received.write(piece)
+                hasher.update(piece)
+                written += len(piece)
+
+            if written != length:
+                raise ValidationError(f'Chunk {index} was truncated ({written} of {length} bytes)')
+
+            digest = hasher.hexdigest()
+            if expected_digest and expected_digest.lower() != digest:
+                raise ValidationError(f'Chunk {index} failed its integrity check')
+
+            content_type = None
+            if index == 0:
+                content_type = self._sniff(head, session.filename)
+                if content_type not in ALLOWED_UPLOAD_TYPES:
+                    self.abort(session)
+                    raise ValidationError(f'File type {content_type} is not allowed')
+
+            # Only the local copy and the bookkeeping are serialized
+            with transaction.atomic():
+                session = UploadSession.objects.select_for_update().get(pk=session.pk)
+                if session.status != 'active':
+                    raise ValidationError('Upload is no longer accepting chunks')
+                received.seek(0)
+                with open(self._partial_path(session), 'r+b') as handle:
+                    handle.seek(offset)
+                    shutil.copyfileobj(received, handle, READ_SIZE)
+                session.received_chunks[str(index)] = digest
+                update_fields = ['received_chunks', 'updated_at']
+                if content_type:
+                    session.content_type = content_type
+                    update_fields.append('content_type')
+                session.save(update_fields=update_fields)
+        return session
+
+    def complete(self, session):
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status != 'active':
+                raise ValidationError('Upload is not active')
+            missing = session.missing_chunks()
+            if missing:
+                raise ValidationError(f'Missing chunks: {missing[:20]}')
+
+            partial_path = self._partial_path(session)
+            if os.path.getsize(partial_path) != session.total_size:
+                raise ValidationError('Assembled file size does not match total_size')
+
+            ordered = ''.join(session.received_chunks[str(i)] for i in range(session.total_chunks))
+            session.content_hash = f"{hashlib.sha256(ordered.encode()).hexdigest()}-{session.total_chunks}"
+
+            # Move the assembled file into place; no copy of the content is made
+            name = f'uploads/{session.pk}/{session.filename}'
+            final_path = default_storage.path(name)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(partial_path, final_path)
+
+            session.file.name = name
+            session.status = 'complete'
+            session.completed_at = timezone.now()
+            session.save()
+        return session
+
+    def abort(self, session):
+        # Status first: it waits for a chunk being copied in, and stops later ones
+        UploadSession.objects.filter(pk=session.pk, status='active').update(
+            status='aborted', updated_at=timezone.now()
+        )
+        session.status = 'aborted'
+        self._discard(self._partial_path(session))
+
+    def expire(self, now=None):
+        """Discard uploads idle for UPLOAD_SESSION_TTL_HOURS and stray partial files; returns how many"""
+        cutoff = (now or timezone.now()) - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        expired = 0
+        for session in UploadSession.objects.filter(status__in=['active', 'complete'], updated_at__lt=cutoff):
+            if session.status == 'active':
+                self.abort(session)
+                expired += 1
+                continue
+            # Completed but never attached: nothing else points at the file
+            stale = UploadSession.objects.filter(pk=session.pk, status='complete', updated_at__lt=cutoff)
+            if stale.update(status='aborted', updated_at=timezone.now()):
+                self._discard(default_storage.path(session.file.name))
+                expired += 1
+
+        # Partial files whose upload is no longer active (left by a crash mid-abort)
+        partial_dir = default_storage.path(self.PARTIAL_DIR)
+        names = {name: name[:-len('.part')] for name in os.listdir(partial_dir)
+                 if name.endswith('.part')} if os.path.isdir(partial_dir) else {}
+        active = {str(pk) for pk in UploadSession.objects.filter(
+            pk__in=[value for value in names.values() if self._is_uuid(value)], status='active'
+        ).values_list('pk', flat=True)}
+        for name, session_id in names.items():
+            if session_id not in active:
+                self._discard(os.path.join(partial_dir, name))
+        return expired
+
+    def attach_to_request(self, session, purchase_request, document):
+        """Point a PurchaseRequest document at the uploaded file"""
+        if document not in ['proforma', 'receipt']:
+            raise ValidationError('Document must be proforma or receipt')
+        self._ensure_complete(session)
+        self._run_field_validators(purchase_request._meta.get_field(document), session)
+
+        setattr(purchase_request, document, session.file.name)
+        setattr(purchase_request, f'{document}_filename', session.filename)
+        setattr(purchase_request, f'{document}_content_type', session.content_type)
+        # Drop any older database copy so downloads serve the new file
+        setattr(purchase_request, f'{document}_content', None)
+        purchase_request.save()
+        self._mark_attached(session)
+        return purchase_request
+
+    def attach_to_financial_document(self, session, user, title, document_type, description=''):
+        """Create a FinancialDocument backed by the uploaded file"""
+        from ..finance.models import FinancialDocument
+        self._ensure_complete(session)
+
+        valid_types = [choice[0] for choice in FinancialDocument.DOCUMENT_TYPES]
+        if document_type not in valid_types:
+            raise ValidationError(f'document_type must be one of: {", ".join(valid_types)}')
+        self._run_field_validators(FinancialDocument._meta.get_field('file'), session)
+
+        document = FinancialDocument.objects.create(
+            title=title or session.filename,
+            document_type=document_type,
+            file=session.file.name,
+            filename=session.filename,
+            content_type=session.content_type or 'application/octet-stream',
+            file_size=session.total_size,
+            uploaded_by=user,
+            description=description
+        )
+        self._mark_attached(session)
+        return document
+
+    def _ensure_complete(self, session):
+        if session.status != 'complete':
+            raise ValidationError('Upload must be completed before it can be attached')
+
+    def _run_field_validators(self, field, session):
+        """Validate the assembled file as a direct upload to field would be"""
+        with default_storage.open(session.file.name) as handle:
+            field.run_validators(File(handle, name=session.filename))
+
+    def _mark_attached(self, session):
+        session.status = 'attached'
+        session.save(update_fields=['status', 'updated_at'])
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _is_uuid(value):
+        try:
+            uuid.UUID(value)
+        except ValueError:
+            return False
+        return True
+
+    def _partial_path(self, session):
+        return default_storage.path(f'{self.PARTIAL_DIR}/{session.pk}.part')
+
+    def _sniff(self, head, filename):
+        if magic:
+            try:
+                return magic.from_buffer(head, mime=True)
+            except Exception:
+                pass
+        return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    def _safe_filename(self, filename):
+        name = re.sub(r'[^\w\-. ]', '', os.path.basename(filename or '')).strip()
+        if not name or name.startswith('.') or len(name) > 255:
+            raise ValidationError('Invalid filename')
+        return name
@@ -1,5 +1,7 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
 from .views import ProcessDocumentView
+from .upload_views import UploadSessionViewSet
 
 from django.http import JsonResponse
 
@@ -10,7 +12,11 @@ def document_health(request):
         'supported_formats': ['pdf', 'jpg', 'jpeg', 'png', 'bmp', 'tiff', 'gif', 'txt', 'csv']
     })
 
+router = DefaultRouter()
+router.register(r'uploads', UploadSessionViewSet, basename='upload-sessions')
+
 urlpatterns = [
     path('health/', document_health, name='document_health'),
     path('process/', ProcessDocumentView.as_view(), name='process_document'),
+    path('', include(router.urls)),
 ]
\ No newline at end of file
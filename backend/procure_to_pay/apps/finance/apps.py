@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class FinanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'procure_to_pay.apps.finance'
\ No newline at end of file
+    name = 'procure_to_pay.apps.finance'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .models import ComplianceAlert
+from ..requests.dashboard import growth
+from ..requests.models import RequestDailyRollup
+
+
+def build_finance_stats(user=None, now=None):
+    """Finance dashboard figures: one aggregate over the request rollups, one over alerts"""
+    current_month = timezone.localdate(now).replace(day=1)
+    last_month = (current_month - timedelta(days=1)).replace(day=1)
+
+    totals = RequestDailyRollup.objects.aggregate(
+        total_requests=Sum('request_count'),
+        total_value=Sum('total_amount'),
+        pending_requests=Sum('request_count', filter=Q(status='pending')),
+        approved_requests=Sum('request_count', filter=Q(status='approved')),
+        rejected_requests=Sum('request_count', filter=Q(status='rejected')),
+        high_value_requests=Sum('high_value_count'),
+        current_value=Sum('total_amount', filter=Q(day__gte=current_month)),
+        last_value=Sum('total_amount', filter=Q(day__gte=last_month, day__lt=current_month)),
+    )
+    totals = {name: value or 0 for name, value in totals.items()}
+    alerts = ComplianceAlert.objects.aggregate(
+        total_alerts=Count('id'),
+        active_alerts=Count('id', filter=Q(is_active=True)),
+    )
+    total_requests = totals['total_requests']
+    total_value = totals['total_value']
+
+    return {
+        'total_requests': total_requests,
+        'total_value': float(total_value),
+        'pending_requests': totals['pending_requests'],
+        'approved_requests': totals['approved_requests'],
+        'rejected_requests': totals['rejected_requests'],
+        'high_value_requests': totals['high_value_requests'],
+        'total_alerts': alerts['total_alerts'],
+        'active_alerts': alerts['active_alerts'],
+        'avg_request_value': float(total_value / total_requests) if total_requests > 0 else 0,
+        # Month-over-month change in requested spend
+        'monthly_growth': round(float(growth(totals['current_value'], totals['last_value'])), 1)
+    }
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_financialdocument_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compliancealert',
+            index=models.Index(fields=['is_active', 'created_at', 'id'], name='finance_com_is_acti_a8fd81_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialdocument',
+            index=models.Index(fields=['uploaded_at', 'id'], name='finance_fin_uploade_a7ac2f_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from ..documents.codecs import encode_blob
 
 User = get_user_model()
 
@@ -15,7 +16,9 @@ class FinancialDocument(models.Model):
     
     title = models.CharField(max_length=200)
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
-    file_content = models.BinaryField()
+    file_content = models.BinaryField(null=True, blank=True)
+    # Large documents attached from a chunked upload stay on disk instead
+    file = models.FileField(upload_to='financial_documents/', null=True, blank=True)
     filename = models.CharField(max_length=255)
     content_type = models.CharField(max_length=100)
     file_size = models.PositiveIntegerField()
@@ -25,6 +28,16 @@ class FinancialDocument(models.Model):
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Keyset pagination on (uploaded_at, id)
+            models.Index(fields=['uploaded_at', 'id']),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Compress newly assigned content; a deferred blob is never loaded here
+        if self.__dict__.get('file_content'):
+            self.file_content = encode_blob(self.file_content, self.content_type)
+        super().save(*args, **kwargs)
 
 class ComplianceAlert(models.Model):
     ALERT_TYPES = [
@@ -53,4 +66,51 @@ class ComplianceAlert(models.Model):
     is_active = models.BooleanField(default=True)
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over active alerts on (created_at, id)
+            models.Index(fields=['is_active', 'created_at', 'id']),
+        ]
+
+
+class ReportJob(models.Model):
+    """A report generated in the background (see report_jobs.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed')
+    ]
+    IN_FLIGHT = ['queued', 'running']
+    
+    # Normalized columns, filters and format; spec_hash identifies identical specs
+    spec = models.JSONField()
+    spec_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    rows_written = models.PositiveIntegerField(default=0)
+    progress = models.PositiveSmallIntegerField(default=0)
+    document = models.ForeignKey(FinancialDocument, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='report_jobs')
+    error = models.CharField(max_length=255, blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Heartbeat: bumped with every progress update
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['created_at', 'id']),
+        ]
+        constraints = [
+            # At most one queued or running job per spec
+            models.UniqueConstraint(fields=['spec_hash'], condition=models.Q(status__in=['queued', 'running']),
+                                    name='finance_reportjob_in_flight_spec'),
+        ]
+    
+    def __str__(self):
+        return f"Report job {self.pk} ({self.status})"
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from ..requests.events import publish, publish_on_commit
+from ...utils.background import submit_on_commit
+from ...utils.db_router import read_alias
+from .models import FinancialDocument, ReportJob
+from .reports import DEFAULT_COLUMNS, FORMATS, count_rows, iter_report
+from .serializers import ReportSpecSerializer
+
+logger = logging.getLogger(__name__)
+
+SUBMIT_ATTEMPTS = 3
+
+# Report jobs.
+#
+# Reports too large to stream within the proxy timeout are generated in the
+# background: submit_report() records a ReportJob and, once committed, hands
+# it to a utils.background worker, so the request returns at once. The
+# worker writes the report (reports.py, from the replica when usable) to a
+# temporary file, updating rows_written and progress every
+# REPORT_EXPORT_CHUNK_SIZE rows, then stores it under reports/ in the
+# default storage as a FinancialDocument of type 'report' and publishes
+# report.ready or report.failed to the requester and finance users. Clients
+# poll the job or listen for the event.
+#
+# Specs are normalized and hashed: while a job for a spec is queued or
+# running, submitting the same spec returns that job (a partial unique
+# constraint settles races). A job whose heartbeat (updated_at) is older than
+# REPORT_JOB_STALE_SECONDS went down with its process (the queue lives in
+# the process); it is failed, with report.failed published, on the next
+# submission or when jobs are listed or polled, so the spec can run again
+# and pollers stop waiting.
+
+
+def normalize_spec(data):
+    """JSON-able spec from validated ReportSpecSerializer data, and its hash"""
+    spec = {
+        'columns': list(dict.fromkeys(data.get('columns') or DEFAULT_COLUMNS)),
+        'filters': {name: str(value) for name, value in sorted(data.get('filters', {}).items()) if value},
+        'format': data.get('format', 'csv'),
+    }
+    encoded = json.dumps(spec, sort_keys=True, separators=(',', ':'))
+    return spec, hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def fail_stale_jobs():
+    """Fail jobs whose worker went away; returns how many"""
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.REPORT_JOB_STALE_SECONDS)
+    stale = ReportJob.objects.filter(status__in=ReportJob.IN_FLIGHT, updated_at__lt=cutoff)
+    # Usually nothing: one read, and a write only when there is something to fail
+    jobs = list(stale.values_list('pk', 'requested_by_id'))
+    if not jobs:
+        return 0
+    failed = 0
+    for job_id, requested_by_id in jobs:
+        if stale.filter(pk=job_id).update(status='failed', error='Worker lost', finished_at=now, updated_at=now):
+            publish('report.failed', job_id, requested_by_id)
+            failed += 1
+    return failed
+
+
+def submit_report(user, data):
+    """Queue a report for validated spec data; returns (job, created)"""
+    spec, spec_hash = normalize_spec(data)
+    fail_stale_jobs()
+    for attempt in range(SUBMIT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(spec=spec, spec_hash=spec_hash, requested_by=user)
+        except IntegrityError:
+            # Same spec already in flight; it may finish between the insert and this read
+            job = ReportJob.objects.filter(spec_hash=spec_hash, status__in=ReportJob.IN_FLIGHT).first()
+            if job is not None:
+                return job, False
+            if attempt == SUBMIT_ATTEMPTS - 1:
+                # Not (or no longer) the in-flight constraint
+                raise
+            continue
+        submit_on_commit(run_report_job, job.pk)
+        return job, True
+
+
+def _update(job_id, **fields):
+    ReportJob.objects.filter(pk=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def _generate(job):
+    spec = ReportSpecSerializer(data=job.spec)
+    spec.is_valid(raise_exception=True)
+    columns, filters, fmt = job.spec['columns'], spec.validated_data.get('filters', {}), job.spec['format']
+    content_type, extension = FORMATS[fmt]
+
+    using = read_alias()
+    total = count_rows(filters, using)
+    _update(job.pk, total_rows=total)
+
+    def on_progress(rows):
+        _update(job.pk, rows_written=rows, progress=min(rows * 100 // total, 99) if total else 99)
+
+    with tempfile.TemporaryFile() as output:
+        for piece in iter_report(columns, filters, fmt, using, on_progress=on_progress):
+            output.write(piece)
+        size = output.tell()
+        output.seek(0)
+        filename = f'financial_report_{job.pk}.{extension}'
+        name = default_storage.save(f'reports/{job.pk}/{filename}', File(output, name=filename))
+
+    return FinancialDocument.objects.create(
+        title=f'Financial report {timezone.localdate():%Y-%m-%d}',
+        document_type='report',
+        file=name,
+        filename=filename,
+        content_type=content_type,
+        file_size=size,
+        uploaded_by=job.requested_by,
+        description=', '.join(f'{key}={value}' for key, value in job.spec['filters'].items())
+    )
+
+
+def run_report_job(job_id):
+    """Generate a queued report; a job another worker claimed is left alone"""
+    now = timezone.now()
+    if not ReportJob.objects.filter(pk=job_id, status='queued').update(status='running', started_at=now,
+                                                                        updated_at=now):
+        return
+    job = ReportJob.objects.select_related('requested_by').get(pk=job_id)
+    try:
+        document = _generate(job)
+    except Exception:
+        logger.exception('Report job %s failed', job_id)
+        _update(job_id, status='failed', error='Report generation failed', finished_at=timezone.now())
+        publish('report.failed', job_id, job.requested_by_id)
+        return
+
+    with transaction.atomic():
+        _update(job_id, status='completed', document=document, progress=100, finished_at=timezone.now())
+        publish_on_commit('report.ready', job_id, job.requested_by_id, document=document.pk)
@@ -0,0 +1,125 @@
+import csv
+import heapq
+import json
+from datetime import datetime, time, timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from ..requests.models import ArchivedRequest, PurchaseRequest
+
+# Financial reports.
+#
+# Rows are projected with values_list (no blob columns, no model instances)
+# and read with .iterator(), which on PostgreSQL is a server-side cursor
+# fetching REPORT_EXPORT_CHUNK_SIZE rows at a time, so memory stays flat
+# however many requests match. The output is produced in pieces of about
+# REPORT_EXPORT_FLUSH_SIZE bytes, streamed by the export endpoint and written
+# to a file by report jobs (report_jobs.py). Live and archived requests are
+# two ordered streams merged row by row, so the report is newest first
+# across both.
+
+
+def _person(first_name, last_name, username):
+    return f'{first_name} {last_name}'.strip() or username
+
+
+def _day(value):
+    return value.strftime('%Y-%m-%d')
+
+
+def _department(value):
+    return value or 'N/A'
+
+
+# Column name -> (header, projected fields, formatter of those fields)
+COLUMNS = {
+    'id': ('ID', ('id',), None),
+    'title': ('Title', ('title',), None),
+    'amount': ('Amount', ('amount',), None),
+    'status': ('Status', ('status',), None),
+    'created_by': ('Created By', ('created_by__first_name', 'created_by__last_name', 'created_by__username'),
+                   _person),
+    'created_at': ('Created At', ('created_at',), _day),
+    'updated_at': ('Updated At', ('updated_at',), _day),
+    'department': ('Department', ('department',), _department),
+}
+DEFAULT_COLUMNS = ['title', 'amount', 'status', 'created_by', 'created_at', 'department']
+
+# Format -> (content type, file extension)
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+def filtered(model, filters, using):
+    """Rows of model matching filters (start_date, end_date, status, department)"""
+    queryset = model.objects.using(using)
+    if filters.get('start_date'):
+        start = datetime.combine(filters['start_date'], time.min)
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(start))
+    if filters.get('end_date'):
+        # Whole end day, as a range so the created_at indexes apply
+        end = datetime.combine(filters['end_date'] + timedelta(days=1), time.min)
+        queryset = queryset.filter(created_at__lt=timezone.make_aware(end))
+    if filters.get('status'):
+        queryset = queryset.filter(status=filters['status'])
+    if filters.get('department'):
+        queryset = queryset.filter(department=filters['department'])
+    return queryset
+
+
+def count_rows(filters, using='default'):
+    return sum(filtered(model, filters, using).count() for model in (PurchaseRequest, ArchivedRequest))
+
+
+def report_rows(columns, filters, using):
+    """Formatted values of columns for every matching request, newest first"""
+    # created_at and id lead every row as the merge key
+    fields, plan = ['created_at', 'id'], []
+    for name in columns:
+        header, projected, formatter = COLUMNS[name]
+        plan.append((len(fields), len(projected), formatter))
+        fields.extend(projected)
+    streams = [
+        filtered(model, filters, using).order_by('-created_at', '-id').values_list(*fields).iterator(
+            chunk_size=settings.REPORT_EXPORT_CHUNK_SIZE
+        )
+        for model in (PurchaseRequest, ArchivedRequest)
+    ]
+    for row in heapq.merge(*streams, key=lambda row: row[:2], reverse=True):
+        yield [formatter(*row[start:start + size]) if formatter else row[start]
+               for start, size, formatter in plan]
+
+
+def iter_report(columns=None, filters=None, fmt='csv', using='default', on_progress=None):
+    """Encoded pieces of a report; on_progress(rows) is called every REPORT_EXPORT_CHUNK_SIZE rows"""
+    columns = columns or DEFAULT_COLUMNS
+    buffer = StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow([COLUMNS[name][0] for name in columns])
+        write = writer.writerow
+    else:
+        def write(values):
+            buffer.write(json.dumps(dict(zip(columns, values)), cls=DjangoJSONEncoder) + '\n')
+
+    rows = 0
+    for values in report_rows(columns, filters or {}, using):
+        write(values)
+        rows += 1
+        if on_progress and rows % settings.REPORT_EXPORT_CHUNK_SIZE == 0:
+            on_progress(rows)
+        if buffer.tell() >= settings.REPORT_EXPORT_FLUSH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+    if on_progress:
+        on_progress(rows)
+
+
+def iter_financial_report(filters=None, using='default'):
+    """Encoded CSV pieces of the default financial report, read from the using database"""
+    return iter_report(DEFAULT_COLUMNS, filters, 'csv', using)
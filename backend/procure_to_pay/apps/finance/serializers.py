@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import FinancialDocument, ComplianceAlert
+from .models import FinancialDocument, ComplianceAlert, ReportJob
+from .reports import COLUMNS, FORMATS
+from ..requests.models import PurchaseRequest
 
 class FinancialDocumentSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
@@ -31,4 +33,31 @@ class ComplianceAlertSerializer(serializers.ModelSerializer):
         from django.utils import timezone
         if obj.resolved_at:
             return (obj.resolved_at - obj.created_at).days
-        return (timezone.now() - obj.created_at).days
\ No newline at end of file
+        return (timezone.now() - obj.created_at).days
+class FinancialReportFilterSerializer(serializers.Serializer):
+    """Query parameters of the financial report export"""
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=PurchaseRequest.STATUS_CHOICES, required=False)
+    department = serializers.CharField(max_length=100, required=False)
+    
+    def validate(self, data):
+        if data.get('start_date') and data.get('end_date') and data['start_date'] > data['end_date']:
+            raise serializers.ValidationError('start_date must not be after end_date')
+        return data
+
+class ReportSpecSerializer(serializers.Serializer):
+    """A report job: columns (default: the export's), filters and format"""
+    columns = serializers.ListField(child=serializers.ChoiceField(choices=list(COLUMNS)), required=False,
+                                    allow_empty=False)
+    filters = FinancialReportFilterSerializer(required=False)
+    format = serializers.ChoiceField(choices=list(FORMATS), default='csv')
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    requested_by_name = serializers.CharField(source='requested_by.get_full_name', read_only=True)
+    
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'spec', 'status', 'total_rows', 'rows_written', 'progress', 'document', 'error',
+                  'requested_by', 'requested_by_name', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import ComplianceAlert
+from ..requests.cache import RequestCache
+
+
+@receiver(post_save, sender=ComplianceAlert)
+@receiver(post_delete, sender=ComplianceAlert)
+def invalidate_finance_dashboard(sender, instance, **kwargs):
+    """Alert counts are only shown to finance: drop its cached dashboard"""
+    RequestCache.invalidate_role_cache('finance')
@@ -0,0 +1,75 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from rest_framework.test import APIClient
+from ..dashboard import build_finance_stats
+from ..models import ComplianceAlert
+from ...requests.models import PurchaseRequest
+from ...requests.rollups import rebuild_rollups
+
+User = get_user_model()
+
+class FinanceDashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.finance_user = User.objects.create_user(
+            username='finance1', email='finance1@example.com', password='test123', role='finance'
+        )
+        self.request = self.create(Decimal('300.00'))
+        self.create(Decimal('150000.00'), status='approved')
+        old = self.create(Decimal('100.00'), status='rejected')
+        month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        PurchaseRequest.objects.filter(pk=old.pk).update(created_at=month_start - timedelta(days=3))
+        # .update() bypasses the signals that maintain the rollups
+        rebuild_rollups()
+        ComplianceAlert.objects.create(
+            alert_type='high_value', severity='high', title='High value', description='Test'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.finance_user)
+
+    def create(self, amount, status='pending'):
+        return PurchaseRequest.objects.create(
+            title='Request', description='Test description', amount=amount,
+            created_by=self.staff_user, status=status
+        )
+
+    def test_figures_in_two_queries(self):
+        """Test one aggregate over requests and one over alerts build the dashboard"""
+        with self.assertNumQueries(2):
+            stats = build_finance_stats()
+        self.assertEqual(stats['total_requests'], 3)
+        self.assertEqual(stats['total_value'], 150400.0)
+        self.assertEqual(stats['pending_requests'], 1)
+        self.assertEqual(stats['approved_requests'], 1)
+        self.assertEqual(stats['rejected_requests'], 1)
+        self.assertEqual(stats['high_value_requests'], 1)
+        self.assertEqual(stats['total_alerts'], 1)
+        self.assertEqual(stats['active_alerts'], 1)
+        self.assertAlmostEqual(stats['avg_request_value'], 150400 / 3)
+        self.assertEqual(stats['monthly_growth'], 150200.0)
+
+    def test_cached_until_alert_changes(self):
+        """Test the dashboard is cached and an alert change invalidates it"""
+        self.client.get('/api/finance/alerts/dashboard_stats/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/finance/alerts/dashboard_stats/')
+        self.assertEqual(response.data['active_alerts'], 1)
+
+        ComplianceAlert.objects.update(is_active=False)
+        alert = ComplianceAlert.objects.get()
+        alert.save()
+        response = self.client.get('/api/finance/alerts/dashboard_stats/')
+        self.assertEqual(response.data['active_alerts'], 0)
+
+    def test_finance_only(self):
+        """Test other roles are refused"""
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get('/api/finance/alerts/dashboard_stats/')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,92 @@
+import csv
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from decimal import Decimal
+from rest_framework.test import APIClient
+from ...requests.archive import archive_requests
+from ...requests.models import PurchaseRequest
+
+User = get_user_model()
+
+@override_settings(REPORT_EXPORT_CHUNK_SIZE=2, REPORT_EXPORT_FLUSH_SIZE=64)
+class FinancialReportExportTest(TestCase):
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username='report_staff', email='report_staff@example.com', password='test123', role='staff',
+            first_name='Alice', last_name='Buyer', department='IT'
+        )
+        self.finance_user = User.objects.create_user(
+            username='report_finance', email='report_finance@example.com', password='test123', role='finance'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.finance_user)
+
+    def create(self, title, status='pending', days_old=0):
+        request = PurchaseRequest.objects.create(
+            title=title, description='Test description', amount=Decimal('100.00'),
+            created_by=self.staff_user, proforma_content=b'x' * 1000
+        )
+        PurchaseRequest.objects.filter(pk=request.pk).update(
+            status=status, created_at=timezone.now() - timedelta(days=days_old),
+            updated_at=timezone.now() - timedelta(days=days_old)
+        )
+        return request
+
+    def export(self, **params):
+        response = self.client.get('/api/finance/documents/export_financial_report/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_streams_live_and_archived_requests(self):
+        """Test every request is exported, newest first, archived ones included"""
+        for i in range(5):
+            self.create(f'Request {i}', days_old=i)
+        self.create('Old', status='approved', days_old=400)
+        self.assertEqual(archive_requests(older_than_days=365), 1)
+
+        rows = self.export()
+        self.assertEqual(rows[0], ['Title', 'Amount', 'Status', 'Created By', 'Created At', 'Department'])
+        self.assertEqual([row[0] for row in rows[1:]], [f'Request {i}' for i in range(5)] + ['Old'])
+        self.assertEqual(rows[1][1:4], ['100.00', 'pending', 'Alice Buyer'])
+        self.assertEqual(rows[1][5], 'IT')
+
+    def test_live_and_archived_rows_are_interleaved(self):
+        """Test archived requests are merged into the live ones by creation date"""
+        self.create('Recent')
+        self.create('Ancient', days_old=500)
+        self.create('Old', status='approved', days_old=400)
+        self.assertEqual(archive_requests(older_than_days=365), 1)
+        self.assertEqual([row[0] for row in self.export()[1:]], ['Recent', 'Old', 'Ancient'])
+
+    def test_filters(self):
+        """Test the date, status and department filters"""
+        self.create('Recent')
+        self.create('Approved', status='approved', days_old=3)
+        self.create('Old', days_old=40)
+        today = timezone.now().date()
+
+        rows = self.export(start_date=today - timedelta(days=5), end_date=today)
+        self.assertEqual([row[0] for row in rows[1:]], ['Recent', 'Approved'])
+        self.assertEqual([row[0] for row in self.export(status='approved')[1:]], ['Approved'])
+        self.assertEqual(self.export(department='Sales')[1:], [])
+
+    def test_rows_are_projected(self):
+        """Test the export never loads model instances or blobs: one query per model"""
+        for i in range(5):
+            self.create(f'Request {i}')
+        response = self.client.get('/api/finance/documents/export_financial_report/')
+        with self.assertNumQueries(2) as queries:
+            b''.join(response.streaming_content)
+        self.assertFalse(any('proforma_content' in query['sql'] for query in queries.captured_queries))
+
+    def test_validation_and_permissions(self):
+        """Test bad filters get 400 and non-finance users 403"""
+        url = '/api/finance/documents/export_financial_report/'
+        self.assertEqual(self.client.get(url, {'status': 'lost'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start_date': '2025-02-01', 'end_date': '2025-01-01'}).status_code, 400)
+        self.client.force_authenticate(user=self.staff_user)
+        self.assertEqual(self.client.get(url).status_code, 403)
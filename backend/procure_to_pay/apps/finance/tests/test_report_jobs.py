@@ -0,0 +1,137 @@
+import csv
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.utils import timezone
+from decimal import Decimal
+from unittest import mock
+from rest_framework.test import APIClient
+from ..models import FinancialDocument, ReportJob
+from ..report_jobs import SUBMIT_ATTEMPTS, submit_report
+from ...requests.models import PurchaseRequest
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+URL = '/api/finance/reports/'
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True, REPORT_EXPORT_CHUNK_SIZE=2)
+@mock.patch('procure_to_pay.apps.requests.events.get_broker')
+class ReportJobTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username='jobs_staff', email='jobs_staff@example.com', password='test123', role='staff'
+        )
+        self.finance_user = User.objects.create_user(
+            username='jobs_finance', email='jobs_finance@example.com', password='test123', role='finance'
+        )
+        for i, status in enumerate(['pending', 'approved', 'approved', 'rejected', 'approved']):
+            PurchaseRequest.objects.create(
+                title=f'Request {i}', description='Test description', amount=Decimal('100.00'),
+                created_by=self.staff_user, status=status
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.finance_user)
+
+    def published(self, get_broker):
+        return [call.args[0] for call in get_broker.return_value.publish.call_args_list]
+
+    def download(self, document_id):
+        response = self.client.get(f'/api/finance/documents/{document_id}/download/')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_job_generates_a_report_document(self, get_broker):
+        """Test a job runs after commit, stores a report document and publishes report.ready"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(URL, {'filters': {'status': 'approved'}}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+
+        job = self.client.get(f"{URL}{response.data['id']}/").data
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual((job['total_rows'], job['rows_written'], job['progress']), (3, 3, 100))
+        document = FinancialDocument.objects.get(pk=job['document'])
+        self.assertEqual((document.document_type, document.content_type), ('report', 'text/csv'))
+
+        rows = list(csv.reader(StringIO(self.download(document.pk))))
+        self.assertEqual(rows[0], ['Title', 'Amount', 'Status', 'Created By', 'Created At', 'Department'])
+        self.assertEqual([row[0] for row in rows[1:]], ['Request 4', 'Request 2', 'Request 1'])
+        self.assertEqual(document.file_size, len(self.download(document.pk).encode()))
+
+        [event] = self.published(get_broker)
+        self.assertEqual(event['type'], 'report.ready')
+        self.assertEqual(event['data']['id'], job['id'])
+        self.assertEqual(event['data']['document'], document.pk)
+        self.assertEqual(event['channels'], [f'user:{self.finance_user.id}', 'role:finance'])
+
+    def test_columns_and_jsonl(self, get_broker):
+        """Test the requested columns in the requested order, as JSON Lines"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(URL, {'columns': ['status', 'title'], 'format': 'jsonl'}, format='json')
+        job = ReportJob.objects.get(pk=response.data['id'])
+        lines = [json.loads(line) for line in self.download(job.document_id).splitlines()]
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0], {'status': 'approved', 'title': 'Request 4'})
+
+    def test_identical_specs_share_a_job_while_in_flight(self, get_broker):
+        """Test resubmitting a queued spec returns its job; stale jobs are failed and rerun"""
+        spec = {'filters': {'status': 'approved', 'start_date': '2024-01-01'}}
+        with self.captureOnCommitCallbacks(execute=False):
+            first = self.client.post(URL, spec, format='json')
+            again = self.client.post(URL, {'filters': {'start_date': '2024-01-01', 'status': 'approved'},
+                                           'format': 'csv'}, format='json')
+            other = self.client.post(URL, {'filters': {'status': 'rejected'}}, format='json')
+        self.assertEqual((first.status_code, again.status_code, other.status_code), (202, 200, 202))
+        self.assertEqual(again.data['id'], first.data['id'])
+        self.assertNotEqual(other.data['id'], first.data['id'])
+
+        ReportJob.objects.filter(pk=first.data['id']).update(updated_at=timezone.now() - timedelta(hours=1))
+        with self.captureOnCommitCallbacks(execute=False):
+            rerun = self.client.post(URL, spec, format='json')
+        self.assertEqual(rerun.status_code, 202)
+        self.assertEqual(ReportJob.objects.get(pk=first.data['id']).status, 'failed')
+
+    def test_polling_fails_lost_jobs(self, get_broker):
+        """Test a job lost with its process is failed when polled, not left in flight"""
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self.client.post(URL, {}, format='json').data['id']
+        self.assertEqual(self.client.get(f'{URL}{job_id}/').data['status'], 'queued')
+        ReportJob.objects.filter(pk=job_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get(f'{URL}{job_id}/')
+        self.assertEqual((response.data['status'], response.data['error']), ('failed', 'Worker lost'))
+        self.assertEqual([event['type'] for event in self.published(get_broker)], ['report.failed'])
+
+    def test_other_integrity_errors_are_not_retried_forever(self, get_broker):
+        """Test an IntegrityError that is not the in-flight constraint is raised after a few attempts"""
+        with mock.patch.object(ReportJob.objects, 'create', side_effect=IntegrityError) as create, \
+                self.assertRaises(IntegrityError):
+            submit_report(self.finance_user, {})
+        self.assertEqual(create.call_count, SUBMIT_ATTEMPTS)
+
+    def test_failure_is_reported(self, get_broker):
+        """Test a job that raises is marked failed and publishes report.failed"""
+        with mock.patch('procure_to_pay.apps.finance.report_jobs.iter_report', side_effect=RuntimeError('boom')), \
+                self.assertLogs('procure_to_pay.apps.finance.report_jobs', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(URL, {}, format='json')
+        job = ReportJob.objects.get(pk=response.data['id'])
+        self.assertEqual((job.status, job.document), ('failed', None))
+        self.assertEqual([event['type'] for event in self.published(get_broker)], ['report.failed'])
+
+    def test_validation_and_permissions(self, get_broker):
+        """Test bad specs get 400 and non-finance users 403 and no jobs"""
+        self.assertEqual(self.client.post(URL, {'columns': ['password']}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(URL, {'format': 'pdf'}, format='json').status_code, 400)
+        self.client.force_authenticate(user=self.staff_user)
+        self.assertEqual(self.client.post(URL, {}, format='json').status_code, 403)
+        self.assertEqual(self.client.get(URL).data['results'], [])
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FinancialDocumentViewSet, ComplianceAlertViewSet
+from .views import FinancialDocumentViewSet, ComplianceAlertViewSet, ReportJobViewSet
 
 router = DefaultRouter()
 router.register(r'documents', FinancialDocumentViewSet, basename='financial-documents')
 router.register(r'alerts', ComplianceAlertViewSet, basename='compliance-alerts')
+router.register(r'reports', ReportJobViewSet, basename='report-jobs')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -2,25 +2,37 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
-from django.db.models import Q, Count, Sum
+from django.http import StreamingHttpResponse
+from django.db.models import Q, Count
 from django.utils import timezone
 from datetime import timedelta
 from drf_spectacular.utils import extend_schema
-from .models import FinancialDocument, ComplianceAlert
-from .serializers import FinancialDocumentSerializer, ComplianceAlertSerializer
+from .models import FinancialDocument, ComplianceAlert, ReportJob
+from .serializers import (
+    FinancialDocumentSerializer, ComplianceAlertSerializer, FinancialReportFilterSerializer,
+    ReportJobSerializer, ReportSpecSerializer
+)
+from .report_jobs import fail_stale_jobs, submit_report
+from .reports import iter_financial_report
+from .dashboard import build_finance_stats
 from ..requests.models import PurchaseRequest
-import csv
-from io import StringIO
+from ..requests.dashboard import DashboardCache
+from ..documents.downloads import DatabaseBlobSource, FieldFileSource, serve_document
+from ..documents.previews import PreviewService, serve_preview
+from ...utils.pagination import KeysetPagination
+from ...utils.db_router import ReplicaReadsMixin, read_alias
 
 class FinancialDocumentViewSet(viewsets.ModelViewSet):
     serializer_class = FinancialDocumentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    pagination_ordering = 'uploaded_at'
     
     def get_queryset(self):
         if self.request.user.role != 'finance':
             return FinancialDocument.objects.none()
-        return FinancialDocument.objects.all()
+        # File content is streamed by the download action, never loaded with the row
+        return FinancialDocument.objects.defer('file_content')
     
     def perform_create(self, serializer):
         file_obj = self.request.FILES.get('file')
@@ -37,38 +49,96 @@ class FinancialDocumentViewSet(viewsets.ModelViewSet):
     @extend_schema(description="Download financial document")
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
-        document = self.get_object()
-        response = HttpResponse(document.file_content, content_type=document.content_type)
-        response['Content-Disposition'] = f'attachment; filename="{document.filename}"'
+        source = self._get_document_source(self.get_object())
+        if source is None:
+            return Response({'error': 'No document content available'}, status=status.HTTP_404_NOT_FOUND)
+        return serve_document(request, source)
+    
+    @extend_schema(description="Thumbnail (?variant=thumbnail) or first-page image (?variant=page) of a document")
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        variant = request.query_params.get('variant', 'thumbnail')
+        if variant not in PreviewService.SIZES:
+            return Response({'error': 'variant must be thumbnail or page'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        source = self._get_document_source(self.get_object())
+        response = serve_preview(request, source, variant) if source else None
+        if response is None:
+            return Response({'error': 'No preview available'}, status=status.HTTP_404_NOT_FOUND)
         return response
     
-    @extend_schema(description="Export financial reports as CSV")
+    def _get_document_source(self, document):
+        metadata = {
+            'filename': document.filename,
+            'content_type': document.content_type,
+            'last_modified': document.uploaded_at,
+            'version': f'financial-document-{document.pk}',
+        }
+        return DatabaseBlobSource.load(FinancialDocument, document.pk, 'file_content', **metadata) \
+            or FieldFileSource.load(document.file, **metadata)
+    
+    @extend_schema(
+        description="Stream the financial report as CSV, live and archived requests, newest first. "
+                    "Filters: ?start_date=, ?end_date= (YYYY-MM-DD, inclusive), ?status=, ?department=",
+        parameters=[FinancialReportFilterSerializer],
+        responses={200: None, 400: None, 403: None}
+    )
     @action(detail=False, methods=['get'])
     def export_financial_report(self, request):
         """Export comprehensive financial report"""
-        requests = PurchaseRequest.objects.select_related('created_by').all()
-        
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Title', 'Amount', 'Status', 'Created By', 'Created At', 'Department'])
+        if request.user.role != 'finance':
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        for req in requests:
-            writer.writerow([
-                req.title,
-                req.amount,
-                req.status,
-                req.created_by.get_full_name() or req.created_by.username,
-                req.created_at.strftime('%Y-%m-%d'),
-                req.created_by.department or 'N/A'
-            ])
+        filters = FinancialReportFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
+        # The body is produced after the view returns, so the alias is chosen here;
+        # this path runs through the WSGI handler, where a sync iterator streams
+        response = StreamingHttpResponse(
+            iter_financial_report(filters.validated_data, using=read_alias(request.user)),
+            content_type='text/csv'
+        )
         response['Content-Disposition'] = 'attachment; filename="financial_report.csv"'
         return response
 
-class ComplianceAlertViewSet(viewsets.ModelViewSet):
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Reports generated in the background; poll a job until it is completed, then download its document"""
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    
+    def get_queryset(self):
+        if self.request.user.role != 'finance':
+            return ReportJob.objects.none()
+        if self.action in ('list', 'retrieve'):
+            # Jobs lost with a restarted process would otherwise stay in flight for pollers
+            fail_stale_jobs()
+        return ReportJob.objects.select_related('requested_by')
+    
+    @extend_schema(
+        description="Queue a report: columns, filters (start_date, end_date, status, department) and format "
+                    "(csv or jsonl). 202 for a new job, 200 with the existing job while the same spec is in flight. "
+                    "report.ready or report.failed is published when it finishes",
+        request=ReportSpecSerializer,
+        responses={200: ReportJobSerializer, 202: ReportJobSerializer, 400: None, 403: None}
+    )
+    def create(self, request):
+        if request.user.role != 'finance':
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        spec = ReportSpecSerializer(data=request.data)
+        if not spec.is_valid():
+            return Response(spec.errors, status=status.HTTP_400_BAD_REQUEST)
+        job, created = submit_report(request.user, spec.validated_data)
+        return Response(ReportJobSerializer(job).data,
+                        status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+class ComplianceAlertViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     serializer_class = ComplianceAlertSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    replica_actions = ['stats', 'dashboard_stats']
     
     def get_queryset(self):
         if self.request.user.role not in ['finance', 'approver_level_1', 'approver_level_2']:
@@ -82,6 +152,9 @@ class ComplianceAlertViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
         alerts_created = 0
+        # The scans dedupe against alerts written to the primary, possibly
+        # moments ago, so they read the primary too: a lagging replica would
+        # not see those alerts and the same ones would be created again
         
         # High value requests (>100,000 RWF)
         high_value_requests = PurchaseRequest.objects.filter(
@@ -161,20 +234,5 @@ class ComplianceAlertViewSet(viewsets.ModelViewSet):
         if request.user.role != 'finance':
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        requests = PurchaseRequest.objects.all()
-        total_value = requests.aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        stats = {
-            'total_requests': requests.count(),
-            'total_value': float(total_value),
-            'pending_requests': requests.filter(status='pending').count(),
-            'approved_requests': requests.filter(status='approved').count(),
-            'rejected_requests': requests.filter(status='rejected').count(),
-            'high_value_requests': requests.filter(amount__gt=100000).count(),
-            'total_alerts': ComplianceAlert.objects.count(),
-            'active_alerts': ComplianceAlert.objects.filter(is_active=True).count(),
-            'avg_request_value': float(total_value / requests.count()) if requests.count() > 0 else 0,
-            'monthly_growth': 12.5  # Mock data - replace with real calculation
-        }
-        
-        return Response(stats)
\ No newline at end of file
+        return Response(DashboardCache.get(request.user, builder=build_finance_stats,
+                                           name='finance-dashboard'))
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PurchaseRequest, Approval
+from .models import ArchivedRequest, PurchaseRequest, Approval, RequestDailyRollup
 
 @admin.register(PurchaseRequest)
 class PurchaseRequestAdmin(admin.ModelAdmin):
@@ -12,4 +12,23 @@ class PurchaseRequestAdmin(admin.ModelAdmin):
 class ApprovalAdmin(admin.ModelAdmin):
     list_display = ('request', 'approver', 'approved', 'created_at')
     list_filter = ('approved', 'created_at')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+@admin.register(RequestDailyRollup)
+class RequestDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'status', 'department', 'created_by', 'request_count', 'total_amount')
+    list_filter = ('status', 'department', 'day')
+    readonly_fields = ('day', 'status', 'department', 'created_by', 'request_count',
+                       'total_amount', 'high_value_count')
+
+@admin.register(ArchivedRequest)
+class ArchivedRequestAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'amount', 'status', 'created_by', 'created_at', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('title',)
+    exclude = ('snapshot', 'proforma_content', 'purchase_order_content', 'receipt_content')
+    readonly_fields = ('archived_at',)
+    
+    def has_add_permission(self, request):
+        # Rows only come from archive_requests
+        return False
@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class RequestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'procure_to_pay.apps.requests'
\ No newline at end of file
+    name = 'procure_to_pay.apps.requests'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals
+        post_migrate.connect(signals.repair_search_index, sender=self)
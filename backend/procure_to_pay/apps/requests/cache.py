@@ -1,45 +1,123 @@
 from django.core.cache import cache
-from django.conf import settings
+from django.db import transaction
 import hashlib
-import json
+import time
 
 class RequestCache:
-    """Caching utility for purchase requests"""
-    
+    """Versioned response cache for purchase requests.
+
+    Every entry is keyed by the generation number of the scope it was built
+    for: ``user:<id>`` for staff (who only see their own requests) and
+    ``role:<role>`` for roles that see every request. Invalidation bumps the
+    generations, so stale entries are simply never read again and expire on
+    their own. Nothing relies on key scanning, which keeps this working on
+    the LocMem, file and Redis backends alike.
+    """
+
     CACHE_TIMEOUT = 300  # 5 minutes
-    
-    @staticmethod
-    def get_cache_key(user_id, filters=None):
-        """Generate cache key for user requests"""
-        key_data = f"requests_{user_id}"
-        if filters:
-            filter_str = json.dumps(filters, sort_keys=True)
-            key_data += f"_{hashlib.md5(filter_str.encode()).hexdigest()}"
+    PREFIX = 'requests'
+
+    # Roles that can see every request share one cache scope per role
+    GLOBAL_ROLES = ['approver_level_1', 'approver_level_2', 'finance']
+
+    @classmethod
+    def scope_for(cls, user):
+        """Cache scope whose data this user can see"""
+        if user.role in cls.GLOBAL_ROLES:
+            return f"role:{user.role}"
+        return f"user:{user.id}"
+
+    @classmethod
+    def _generation_key(cls, scope):
+        return f"{cls.PREFIX}:gen:{scope}"
+
+    @classmethod
+    def get_generation(cls, scope):
+        key = cls._generation_key(scope)
+        generation = cache.get(key)
+        if generation is None:
+            # Seed from the clock so an evicted counter never reuses an old value
+            cache.add(key, time.time_ns(), None)
+            generation = cache.get(key)
+        return generation
+
+    @classmethod
+    def bump_generation(cls, scope):
+        key = cls._generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    @classmethod
+    def get_cache_key(cls, user, view, params=None, *parts):
+        """Generate cache key for a response in the user's scope"""
+        scope = cls.scope_for(user)
+        key_data = f"{cls.PREFIX}:{view}:{scope}:{cls.get_generation(scope)}"
+        if parts:
+            key_data += ':' + ':'.join(str(part) for part in parts)
+        if params:
+            query = '&'.join(f"{name}={','.join(params.getlist(name))}" for name in sorted(params))
+            key_data += f":{hashlib.md5(query.encode()).hexdigest()}"
         return key_data
-    
+
     @classmethod
-    def get_requests(cls, user_id, filters=None):
-        """Get cached requests"""
-        cache_key = cls.get_cache_key(user_id, filters)
-        return cache.get(cache_key)
-    
+    def get(cls, key, record=True):
+        """Get cached response data, recording a hit or a miss"""
+        data = cache.get(key)
+        if record:
+            cls.record('hits' if data is not None else 'misses')
+        return data
+
     @classmethod
-    def set_requests(cls, user_id, data, filters=None):
-        """Cache requests data"""
-        cache_key = cls.get_cache_key(user_id, filters)
-        cache.set(cache_key, data, cls.CACHE_TIMEOUT)
-    
+    def set(cls, key, data):
+        cache.set(key, data, cls.CACHE_TIMEOUT)
+
     @classmethod
     def invalidate_user_cache(cls, user_id):
-        """Invalidate all cache for a user"""
-        # In production, use cache versioning or tags
-        cache.delete_many([
-            cls.get_cache_key(user_id),
-            f"requests_{user_id}_*"
-        ])
-    
-    @classmethod
-    def invalidate_request_cache(cls, request_id):
-        """Invalidate cache when request is updated"""
-        # Clear all related caches
-        cache.delete_pattern(f"requests_*")
\ No newline at end of file
+        """Invalidate everything cached for requests created by this user"""
+        scopes = [f"user:{user_id}"] + [f"role:{role}" for role in cls.GLOBAL_ROLES]
+        for scope in scopes:
+            cls.bump_generation(scope)
+
+    @classmethod
+    def invalidate_request_cache(cls, purchase_request):
+        """Invalidate cache when a request (or its approvals/items) changes.
+
+        Generations are bumped right away, so the writer never reads its own
+        stale data, and again on commit, so entries that concurrent readers
+        cached from the pre-commit state are dropped as well.
+        """
+        user_id = purchase_request.created_by_id
+        cls.invalidate_user_cache(user_id)
+        transaction.on_commit(lambda: cls.invalidate_user_cache(user_id))
+
+    @classmethod
+    def invalidate_role_cache(cls, role):
+        """Invalidate a role's shared scope now and again on commit"""
+        scope = f"role:{role}"
+        cls.bump_generation(scope)
+        transaction.on_commit(lambda: cls.bump_generation(scope))
+
+    @classmethod
+    def record(cls, metric):
+        """Increment a shared hit/miss counter"""
+        key = f"{cls.PREFIX}:metrics:{metric}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    @classmethod
+    def stats(cls):
+        """Hit/miss counters shared by every worker using this cache"""
+        counts = cache.get_many([f"{cls.PREFIX}:metrics:hits", f"{cls.PREFIX}:metrics:misses"])
+        hits = counts.get(f"{cls.PREFIX}:metrics:hits", 0)
+        misses = counts.get(f"{cls.PREFIX}:metrics:misses", 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0
+        }
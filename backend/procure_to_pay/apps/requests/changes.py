@@ -0,0 +1,114 @@
+import base64
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import RequestDeletion
+
+# Change feed for incremental client sync.
+#
+# A cursor remembers the last (updated_at, id) a client has seen, the last
+# tombstone id and when it was issued. Each poll returns the visible requests changed after that
+# position, oldest first, plus the ids deleted since, so a client that keeps
+# its copy of the list only ever transfers what changed. Approvals, items and
+# bulk writes all move updated_at, so they surface here too. A cursor expires
+# when it was issued longer ago than the tombstone retention window, since
+# tombstones it has not seen may have been pruned; how old its updated_at is
+# does not matter, so clients of a quiet scope keep polling normally.
+#
+# updated_at and tombstone ids are assigned before commit, so a transaction
+# can become visible after a later-stamped one was read. The cursor
+# therefore never moves past the last CHANGE_FEED_OVERLAP_SECONDS: rows that
+# recent are returned but read again on the next poll (clients dedupe by
+# id), and a page that reaches them reports no more pages.
+
+
+class CursorExpired(Exception):
+    """The cursor was issued before the tombstone retention window; the client must resync"""
+
+
+def encode_cursor(position, issued_at=None):
+    data = {
+        't': position['t'].isoformat() if position['t'] else None, 'pk': position['pk'], 'd': position['d'],
+        'i': (issued_at or timezone.now()).isoformat(),
+    }
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(value):
+    """Position encoded in a cursor, or ValidationError"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(value.encode()).decode())
+        updated_at = parse_datetime(data['t']) if data['t'] else None
+        # Cursors from before issue times were recorded expire by their updated_at
+        issued_at = parse_datetime(data['i']) if data.get('i') else updated_at
+        if (data['t'] and updated_at is None) or (data.get('i') and issued_at is None):
+            raise ValueError
+        return {'t': updated_at, 'pk': int(data['pk']), 'd': int(data['d']), 'i': issued_at}
+    except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise ValidationError('Invalid cursor')
+
+
+def visible(queryset, user, owner_field='created_by'):
+    if user.role == 'staff':
+        return queryset.filter(**{owner_field: user.id})
+    return queryset
+
+
+def changes_since(user, queryset, cursor=None, limit=None):
+    """Requests changed and ids deleted after cursor, and the cursor to resume from.
+
+    queryset must already be limited to what user may see; tombstones are
+    scoped here the same way. Without a cursor this is the initial sync: every visible request and no
+    tombstones. Returns (requests, deleted ids, next cursor, has_more).
+    """
+    limit = limit or settings.CHANGE_FEED_PAGE_SIZE
+    # Writes stamped before this have committed (or never will)
+    settled = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_OVERLAP_SECONDS)
+    if cursor is None:
+        last = RequestDeletion.objects.aggregate(last=Max('id', filter=Q(deleted_at__lt=settled)))['last']
+        position = {'t': None, 'pk': 0, 'd': last or 0}
+    else:
+        position = decode_cursor(cursor)
+        retention = timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS)
+        issued_at = position.pop('i')
+        if issued_at is not None and issued_at < timezone.now() - retention:
+            raise CursorExpired
+
+    queryset = queryset.annotate(feed_updated_at=F('updated_at'))
+    if position['t'] is not None:
+        queryset = queryset.filter(
+            Q(updated_at__gt=position['t']) | Q(updated_at=position['t'], pk__gt=position['pk'])
+        )
+    requests = list(queryset.order_by('updated_at', 'pk')[:limit + 1])
+    tombstones = list(
+        visible(RequestDeletion.objects.filter(id__gt=position['d']), user, 'created_by_id')
+        .order_by('id').values_list('id', 'request_id', 'deleted_at')[:limit + 1]
+    )
+    more_requests, more_tombstones = len(requests) > limit, len(tombstones) > limit
+    requests, tombstones = requests[:limit], tombstones[:limit]
+
+    if requests and requests[-1].feed_updated_at < settled:
+        position['t'], position['pk'] = requests[-1].feed_updated_at, requests[-1].pk
+    elif requests:
+        # Stop at the overlap window; whatever follows is in it too
+        more_requests = False
+        if position['t'] is None or position['t'] < settled:
+            position['t'], position['pk'] = settled, 0
+    for tombstone_id, _, deleted_at in tombstones:
+        if deleted_at >= settled:
+            more_tombstones = False
+            break
+        position['d'] = tombstone_id
+    deleted = [request_id for _, request_id, _ in tombstones]
+    return requests, deleted, encode_cursor(position), more_requests or more_tombstones
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones older than the retention window; returns how many"""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS)
+    deleted, _ = RequestDeletion.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,183 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q, Sum
+from django.utils import timezone
+from ...utils.db_router import current_read_alias, is_pinned, replica_configured
+from .cache import RequestCache
+from .models import PurchaseRequest, RequestDailyRollup
+
+
+def growth(current, previous):
+    """Percentage change from previous to current"""
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return 100 if current > 0 else 0
+
+
+def scoped_rollups(user):
+    """Daily rollup rows behind the user's visible requests"""
+    if user.role == 'staff':
+        return RequestDailyRollup.objects.filter(created_by=user)
+    return RequestDailyRollup.objects.all()
+
+
+def build_dashboard_stats(user, now=None):
+    """Dashboard figures for the user's scope: one rollup aggregate plus the recent list"""
+    now = timezone.localtime(now or timezone.now())
+    current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last_month = (current_month - timedelta(days=1)).replace(day=1)
+
+    if user.role == 'staff':
+        base_qs = PurchaseRequest.objects.filter(created_by=user)
+    else:
+        base_qs = PurchaseRequest.objects.all()
+
+    in_current = Q(day__gte=current_month.date())
+    in_last = Q(day__gte=last_month.date(), day__lt=current_month.date())
+    totals = scoped_rollups(user).aggregate(
+        current_count=Sum('request_count', filter=in_current),
+        current_amount=Sum('total_amount', filter=in_current),
+        last_count=Sum('request_count', filter=in_last),
+        last_amount=Sum('total_amount', filter=in_last),
+        pending=Sum('request_count', filter=Q(status='pending')),
+        approved=Sum('request_count', filter=Q(status='approved')),
+        rejected=Sum('request_count', filter=Q(status='rejected')),
+    )
+    totals = {name: value or 0 for name, value in totals.items()}
+    current_amount = totals['current_amount']
+    last_amount = totals['last_amount']
+
+    recent_requests = base_qs.order_by('-created_at', '-id').values(
+        'id', 'title', 'amount', 'status', 'created_at'
+    )[:5]
+    recent_data = [{
+        'id': req['id'],
+        'title': req['title'],
+        'amount': str(req['amount']),
+        'status': req['status'],
+        'created_at': req['created_at'].isoformat()
+    } for req in recent_requests]
+
+    return {
+        'current_month': {
+            'requests_count': totals['current_count'],
+            'total_amount': str(current_amount),
+            'month_name': now.strftime('%B')
+        },
+        'last_month': {
+            'requests_count': totals['last_count'],
+            'total_amount': str(last_amount),
+            'month_name': last_month.strftime('%B')
+        },
+        'growth': {
+            'requests_growth': round(growth(totals['current_count'], totals['last_count']), 1),
+            'amount_growth': round(growth(current_amount, last_amount), 1)
+        },
+        'status_counts': {
+            'pending': totals['pending'],
+            'approved': totals['approved'],
+            'rejected': totals['rejected']
+        },
+        'recent_requests': recent_data,
+        'user_role': user.role
+    }
+
+
+def build_trend(user, days=30, now=None):
+    """Requests and spend per day over the last `days` days, from the rollups"""
+    today = timezone.localdate(now)
+    start = today - timedelta(days=days - 1)
+    rows = scoped_rollups(user).filter(day__gte=start).values('day').annotate(
+        requests=Sum('request_count'),
+        amount=Sum('total_amount'),
+        high_value=Sum('high_value_count'),
+    ).order_by('day')
+    by_day = {row['day']: row for row in rows}
+    trend = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day, {})
+        trend.append({
+            'day': day.isoformat(),
+            'requests': row.get('requests') or 0,
+            'amount': str(row.get('amount') or 0),
+            'high_value': row.get('high_value') or 0,
+        })
+    return trend
+
+
+class DashboardCache:
+    """Stale-while-revalidate cache of dashboard figures per cache scope.
+
+    ``name`` separates dashboards that share a scope (the request and the
+    finance dashboards are both cached for ``role:finance``).
+
+    Entries remember the scope generation they were built for (see
+    RequestCache). A fresh entry is served as is. Once it is stale, because
+    the generation moved or it is older than DASHBOARD_FRESH_SECONDS, exactly
+    one worker, the one that wins ``cache.add`` on the lock key, rebuilds it,
+    while the others keep serving the stale copy instead of stampeding the
+    database.
+
+    Entries also remember the database alias they were built from. A scope
+    is shared, so its entry may have been rebuilt from a lagging replica
+    right after someone's write; users pinned to the primary after a write
+    (see utils/db_router.py) are only served entries built on the primary,
+    and never a stale copy, so they always see their own changes.
+    """
+
+    PREFIX = 'requests'
+    LOCK_TIMEOUT = 30
+    WAIT_TIMEOUT = 2.0
+    WAIT_INTERVAL = 0.05
+
+    @classmethod
+    def get(cls, user, builder=build_dashboard_stats, name='dashboard'):
+        scope = RequestCache.scope_for(user)
+        generation = RequestCache.get_generation(scope)
+        key = f"{cls.PREFIX}:{name}:{scope}"
+        alias = current_read_alias()
+        primary_only = replica_configured() and is_pinned(user.id)
+        entry = cache.get(key)
+        if cls._is_fresh(entry, generation) and (not primary_only or entry.get('alias') == DEFAULT_DB_ALIAS):
+            RequestCache.record('hits')
+            return entry['data']
+        RequestCache.record('misses')
+
+        lock_key = f"{key}:lock"
+        if cache.add(lock_key, 1, cls.LOCK_TIMEOUT):
+            try:
+                data = builder(user)
+                cache.set(key, {'data': data, 'generation': generation, 'built_at': time.time(), 'alias': alias},
+                          settings.DASHBOARD_STALE_SECONDS)
+            finally:
+                cache.delete(lock_key)
+            return data
+
+        if primary_only:
+            # Whatever is cached or in flight may predate this user's write
+            return builder(user)
+
+        if entry is not None:
+            # Someone else is already rebuilding: serve what we have meanwhile
+            return entry['data']
+
+        # Cold cache and a rebuild in flight: wait for it rather than duplicate it
+        deadline = time.monotonic() + cls.WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(cls.WAIT_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['data']
+        return builder(user)
+
+    @staticmethod
+    def _is_fresh(entry, generation):
+        return (
+            entry is not None and
+            entry['generation'] == generation and
+            time.time() - entry['built_at'] < settings.DASHBOARD_FRESH_SECONDS
+        )
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional, only the Redis broker needs it
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Push notifications about purchase requests, streamed to browsers as
+# Server-Sent Events by streams.EventStreamApp.
+#
+# Code that changes a request calls publish_on_commit(). The configured broker
+# (settings.EVENTS_BROKER) carries the event to every ASGI process, whose hub
+# hands it to the open streams subscribed to one of its channels:
+# ``user:<id>`` for the requester and ``role:<role>`` for roles that follow
+# every request. LocalBroker delivers straight to this process's hub, which
+# is enough when a single process both writes and streams (development,
+# tests); RedisBroker goes through Redis pub/sub so events written by WSGI
+# workers or other nodes reach every stream.
+#
+# Events are notifications, not a log: a client that (re)connects catches up
+# through /api/requests/changes/.
+
+# Roles that hear about a request event besides the requester
+AUDIENCES = {
+    'request.approved': ['approver_level_1', 'approver_level_2', 'finance'],
+    'request.rejected': ['approver_level_1', 'approver_level_2'],
+    'request.po_ready': ['finance'],
+    'request.receipt_validated': ['finance'],
+    # Report jobs (apps/finance/report_jobs.py); the id is the job's
+    'report.ready': ['finance'],
+    'report.failed': ['finance'],
+}
+
+
+def format_event(kind, data):
+    """One SSE message"""
+    return f"event: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """One open stream: a bounded queue of encoded messages owned by an event loop"""
+
+    __slots__ = ('channels', 'loop', 'queue')
+
+    def __init__(self, channels, loop, max_queue):
+        self.channels = channels
+        self.loop = loop
+        self.queue = asyncio.Queue(max_queue)
+
+    def deliver(self, message):
+        """Queue a message; runs on the subscription's loop"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client this far behind resyncs anyway: end its stream
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Next message, '' when timeout passes first, None once the stream should end"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return ''
+
+
+class EventHub:
+    """Fans events out to the subscriptions of this process.
+
+    An idle stream costs one small queue and a suspended coroutine; an event
+    is encoded once and only touches the subscriptions of its channels.
+    """
+
+    def __init__(self):
+        self.channels = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channels, loop=None):
+        subscription = Subscription(
+            tuple(channels), loop or asyncio.get_running_loop(), settings.EVENTS_QUEUE_SIZE
+        )
+        with self.lock:
+            for channel in subscription.channels:
+                self.channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.channels[channel]
+
+    def dispatch(self, event):
+        """Deliver an event to its subscribers; safe to call from any thread"""
+        with self.lock:
+            targets = set()
+            for channel in event['channels']:
+                targets.update(self.channels.get(channel, ()))
+        if not targets:
+            return 0
+        message = format_event(event['type'], event['data'])
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The stream's loop is closing; its finally block unsubscribes it
+                pass
+        return len(targets)
+
+    def __len__(self):
+        with self.lock:
+            return len({subscription for subscribers in self.channels.values() for subscription in subscribers})
+
+
+class LocalBroker:
+    """Delivers events to this process only"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, event):
+        self.hub.dispatch(event)
+
+    def start(self):
+        pass
+
+
+class RedisBroker:
+    """Relays events between processes over a Redis pub/sub channel.
+
+    Every process publishes; a process starts listening (one daemon thread)
+    the first time a stream subscribes, so WSGI workers never do.
+    """
+
+    CHANNEL = 'p2p:events'
+
+    def __init__(self, hub, url=None):
+        if redis is None:
+            raise ImproperlyConfigured('RedisBroker requires the redis package')
+        url = url or settings.CACHE_REDIS_URL
+        if not url:
+            raise ImproperlyConfigured('RedisBroker requires REDIS_URL')
+        self.hub = hub
+        self.client = redis.Redis.from_url(url)
+        self.listener = None
+        self.lock = threading.Lock()
+
+    def publish(self, event):
+        self.client.publish(self.CHANNEL, json.dumps(event, separators=(',', ':')))
+
+    def start(self):
+        with self.lock:
+            if self.listener is None or not self.listener.is_alive():
+                self.listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                self.listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    try:
+                        self.hub.dispatch(json.loads(message['data']))
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning('Dropping malformed event %r', message.get('data'))
+            except redis.RedisError:
+                logger.exception('Event listener lost Redis, reconnecting')
+                threading.Event().wait(1)
+
+
+hub = EventHub()
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTS_BROKER)(hub)
+    return _broker
+
+
+def publish(kind, request_id, created_by_id, **data):
+    """Send an event about a request to its requester and the roles following kind"""
+    channels = [f'user:{created_by_id}'] + [f'role:{role}' for role in AUDIENCES.get(kind, [])]
+    event = {
+        'type': kind,
+        'channels': channels,
+        'data': {'id': request_id, 'at': timezone.now().isoformat(), **data},
+    }
+    try:
+        get_broker().publish(event)
+    except Exception:
+        # Notifications are best effort; the write they describe already happened
+        logger.exception('Could not publish %s for request %s', kind, request_id)
+
+
+def publish_on_commit(kind, request_id, created_by_id, **data):
+    """Publish once the current transaction commits (right away outside one)"""
+    transaction.on_commit(lambda: publish(kind, request_id, created_by_id, **data))
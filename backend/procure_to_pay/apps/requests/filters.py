@@ -1,6 +1,8 @@
 import django_filters
-from django.db.models import Q
 from .models import PurchaseRequest
+from .search import search_requests
+from .cache import RequestCache
+from .fuzzy import fuzzy_search_requests
 
 class PurchaseRequestFilter(django_filters.FilterSet):
     """Advanced filtering for purchase requests"""
@@ -11,13 +13,20 @@ class PurchaseRequestFilter(django_filters.FilterSet):
     created_after = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     created_before = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
     search = django_filters.CharFilter(method='filter_search')
+    q = django_filters.CharFilter(method='filter_fuzzy')
     
     class Meta:
         model = PurchaseRequest
         fields = ['status', 'amount_min', 'amount_max', 'created_after', 'created_before']
     
     def filter_search(self, queryset, name, value):
-        """Search across title and description"""
-        return queryset.filter(
-            Q(title__icontains=value) | Q(description__icontains=value)
-        )
\ No newline at end of file
+        """Ranked full-text search over title, description, vendor and item names"""
+        return search_requests(queryset, value)
+    
+    def filter_fuzzy(self, queryset, name, value):
+        """Typo-tolerant match on title, vendor and item names"""
+        # Same visibility as the queryset: staff only match their own requests
+        user = getattr(self.request, 'user', None)
+        staff = user is not None and user.is_authenticated and user.role not in RequestCache.GLOBAL_ROLES
+        created_by = user.id if staff else None
+        return fuzzy_search_requests(queryset, value, created_by=created_by)
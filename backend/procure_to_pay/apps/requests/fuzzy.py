@@ -0,0 +1,247 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+from ...utils.background import submit
+from .cache import RequestCache
+
+# Typo-tolerant search over request titles, vendor names and item names.
+#
+# PostgreSQL uses pg_trgm's word_similarity (the <% operator) backed by GIN
+# trigram indexes from migration 0008. Other databases use TrigramIndex, an
+# in-process index built with the same trigram scheme and rebuilt whenever the
+# requests table changes. Every write to requests or their items bumps the
+# shared RequestCache generations, so checking for changes is one cache read;
+# autocomplete serves the previous index while a background task rebuilds it,
+# so a rebuild never eats into its budget.
+
+TABLE = 'requests_purchaserequest'
+ITEM_TABLE = 'requests_requestitem'
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# pg_trgm's default pg_trgm.word_similarity_threshold, so both paths agree
+SIMILARITY_THRESHOLD = 0.6
+MAX_CANDIDATES = 500
+# Bumped by every request write (RequestCache.invalidate_user_cache)
+VERSION_SCOPE = 'role:approver_level_1'
+
+
+def trigrams(text):
+    """pg_trgm-style trigrams: each word lower-cased and padded with '  ' and ' '"""
+    grams = set()
+    for word in WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """In-process trigram index of titles, vendor names and item names.
+
+    A candidate's score is the share of the query's trigrams it contains,
+    which approximates pg_trgm's word_similarity.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.entries = []
+        self.postings = defaultdict(list)
+        self.lock = threading.Lock()
+        # Guards rebuilding only, so checking it never waits for a build
+        self.rebuilding_lock = threading.Lock()
+        self.rebuilding = False
+
+    def ensure_current(self, model, wait=True):
+        """Rebuild when requests were written since the last build.
+
+        With wait=False an index that is merely out of date is served as is
+        while a background task rebuilds it.
+        """
+        version = RequestCache.get_generation(VERSION_SCOPE)
+        if version == self.version:
+            return self
+        if not wait and self.version is not None:
+            with self.rebuilding_lock:
+                start = not self.rebuilding
+                self.rebuilding = True
+            if start:
+                submit(self._rebuild_in_background, model)
+            return self
+        self._rebuild(model, version)
+        return self
+
+    def _rebuild(self, model, version):
+        with self.lock:
+            if version != self.version:
+                self._build(model)
+                self.version = version
+
+    def _rebuild_in_background(self, model):
+        try:
+            # Read before the rows, so a write made meanwhile triggers another rebuild
+            self._rebuild(model, RequestCache.get_generation(VERSION_SCOPE))
+        finally:
+            with self.rebuilding_lock:
+                self.rebuilding = False
+
+    def _build(self, model):
+        from .models import RequestItem
+        grouped = {}
+
+        def add(kind, text, request_id, created_by_id):
+            text = (text or '').strip()
+            if not text:
+                return
+            entry = grouped.setdefault((kind, text.lower()), {
+                'kind': kind, 'text': text, 'grams': trigrams(text), 'requests': {}
+            })
+            entry['requests'][request_id] = created_by_id
+
+        for request_id, title, vendor, created_by_id in model.objects.values_list(
+                'id', 'title', 'vendor_name', 'created_by_id').iterator():
+            add('title', title, request_id, created_by_id)
+            add('vendor', vendor, request_id, created_by_id)
+        for name, request_id, created_by_id in RequestItem.objects.values_list(
+                'name', 'request_id', 'request__created_by_id').iterator():
+            add('item', name, request_id, created_by_id)
+
+        entries = list(grouped.values())
+        postings = defaultdict(list)
+        for position, entry in enumerate(entries):
+            for gram in entry['grams']:
+                postings[gram].append(position)
+        self.entries, self.postings = entries, postings
+
+    def search(self, text, created_by=None, deadline=None):
+        """(score, entry) pairs over the threshold, best first, and whether every candidate was scored"""
+        query = trigrams(text)
+        overlaps = defaultdict(int)
+        for gram in query:
+            for position in self.postings.get(gram, ()):
+                overlaps[position] += 1
+        minimum = SIMILARITY_THRESHOLD * len(query)
+        matches = []
+        complete = True
+        for checked, (position, overlap) in enumerate(overlaps.items()):
+            if deadline is not None and checked % 256 == 0 and time.monotonic() > deadline:
+                complete = False
+                break
+            if overlap < minimum:
+                continue
+            entry = self.entries[position]
+            if created_by is not None and created_by not in entry['requests'].values():
+                continue
+            matches.append((overlap / len(query), entry))
+        matches.sort(key=lambda match: (-match[0], match[1]['text']))
+        return matches, complete
+
+
+_index = TrigramIndex()
+
+
+def _visible_ids(entry, created_by):
+    return [pk for pk, owner in entry['requests'].items() if created_by is None or owner == created_by]
+
+
+def fuzzy_search_requests(queryset, text, created_by=None):
+    """Filter queryset to requests whose title, vendor or items resemble text, best match first.
+
+    created_by limits the in-process candidates to that user's requests, as
+    the queryset does, so others' matches never use up MAX_CANDIDATES.
+    """
+    text = ' '.join(WORD_RE.findall(text or ''))
+    if not text:
+        return queryset.none()
+
+    if connections[queryset.db].vendor == 'postgresql':
+        queryset = queryset.filter(pk__in=RawSQL(
+            f"SELECT id FROM {TABLE} WHERE %s <%% title OR %s <%% vendor_name "
+            f"UNION SELECT request_id FROM {ITEM_TABLE} WHERE %s <%% name",
+            [text, text, text]
+        )).annotate(search_rank=RawSQL(
+            f"GREATEST(word_similarity(%s, {TABLE}.title), word_similarity(%s, {TABLE}.vendor_name), "
+            f"(SELECT MAX(word_similarity(%s, name)) FROM {ITEM_TABLE} WHERE request_id = {TABLE}.id))",
+            [text, text, text], output_field=FloatField()
+        ))
+        return queryset.order_by('-search_rank', '-created_at', '-id')
+
+    scores = {}
+    matches, _ = _index.ensure_current(queryset.model).search(text, created_by=created_by)
+    for score, entry in matches:
+        for pk in _visible_ids(entry, created_by):
+            scores.setdefault(pk, score)
+        if len(scores) >= MAX_CANDIDATES:
+            break
+    if not scores:
+        return queryset.none()
+    rank = Case(*[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+                default=Value(0.0), output_field=FloatField())
+    return queryset.filter(pk__in=list(scores)).annotate(search_rank=rank).order_by(
+        '-search_rank', '-created_at', '-id'
+    )
+
+
+def autocomplete(model, text, created_by=None, limit=10):
+    """Top-k distinct titles, vendors and item names resembling text.
+
+    Bounded by settings.AUTOCOMPLETE_BUDGET_MS: PostgreSQL enforces it with a
+    statement timeout, the in-process index by checking the clock while it
+    scores candidates. Returns (suggestions, truncated).
+    """
+    text = ' '.join(WORD_RE.findall(text or ''))
+    if not text:
+        return [], False
+    budget_ms = settings.AUTOCOMPLETE_BUDGET_MS
+    deadline = time.monotonic() + budget_ms / 1000
+
+    if connections[model.objects.db].vendor == 'postgresql':
+        return _autocomplete_postgres(model, text, created_by, limit, budget_ms)
+
+    index = _index.ensure_current(model, wait=False)
+    matches, complete = index.search(text, created_by=created_by, deadline=deadline)
+    suggestions = [{
+        'text': entry['text'],
+        'kind': entry['kind'],
+        'score': round(score, 3),
+        'request_ids': _visible_ids(entry, created_by)[:5],
+    } for score, entry in matches[:limit]]
+    return suggestions, not complete
+
+
+def _autocomplete_postgres(model, text, created_by, limit, budget_ms):
+    owner_filter = 'AND r.created_by_id = %s' if created_by is not None else ''
+    owner_params = [created_by] if created_by is not None else []
+    sql = f"""
+        SELECT text, kind, MAX(score) AS score, (ARRAY_AGG(request_id ORDER BY request_id DESC))[1:5]
+        FROM (
+            SELECT r.title AS text, 'title' AS kind, word_similarity(%s, r.title) AS score, r.id AS request_id
+            FROM {TABLE} r WHERE %s <%% r.title {owner_filter}
+            UNION ALL
+            SELECT r.vendor_name, 'vendor', word_similarity(%s, r.vendor_name), r.id
+            FROM {TABLE} r WHERE %s <%% r.vendor_name {owner_filter}
+            UNION ALL
+            SELECT i.name, 'item', word_similarity(%s, i.name), r.id
+            FROM {ITEM_TABLE} i JOIN {TABLE} r ON r.id = i.request_id
+            WHERE %s <%% i.name {owner_filter}
+        ) matches
+        GROUP BY text, kind
+        ORDER BY score DESC, text
+        LIMIT %s
+    """
+    params = ([text, text] + owner_params) * 3 + [limit]
+    connection = connections[model.objects.db]
+    try:
+        with transaction.atomic(using=model.objects.db), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL statement_timeout = %s', [int(budget_ms)])
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        # Statement timeout: answer with nothing rather than blow the budget
+        return [], True
+    return [{
+        'text': row[0], 'kind': row[1], 'score': round(row[2], 3), 'request_ids': list(row[3]),
+    } for row in rows], False
@@ -0,0 +1,358 @@
+import csv
+import io
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .cache import RequestCache
+from .items import normalize_item
+from .models import PurchaseRequest, RequestItem
+from .rollups import add_delta, apply_bulk_deltas, new_deltas
+from .search import build_search_document
+from .validators import validate_amount, validate_description, validate_title
+from .workflow import approval_stage
+
+# Streaming bulk import of purchase requests and their line items.
+#
+# Accepted formats:
+#   csv    one row per request, or per line item: consecutive rows sharing a
+#          ``ref`` form one request whose fields come from its first row;
+#          item_name, item_quantity, item_unit_price and item_description
+#          columns add a line item
+#   ndjson one request object per line
+#   json   an array of request objects, parsed one element at a time
+# Files are UTF-8. A file that cannot be read on (bad encoding, broken
+# JSON array, element over IMPORT_MAX_RECORD_SIZE) stops the import at that
+# row: chunks before it stay written and the report says where it stopped.
+# Request objects: title, description, amount, status, created_at,
+# created_by (username or email) and items [{name, quantity, unit_price}].
+
+FORMATS = ('csv', 'json', 'ndjson')
+READ_SIZE = 64 * 1024
+
+
+def detect_format(filename, declared=None):
+    """Import format from an explicit choice or the file extension"""
+    if not declared and '.' in (filename or ''):
+        declared = filename.rsplit('.', 1)[-1]
+    fmt = (declared or '').lower()
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    if fmt not in FORMATS:
+        raise ValidationError(f"Unsupported format; use one of {', '.join(FORMATS)}")
+    return fmt
+
+
+class UnreadableInput(ValidationError):
+    """The file cannot be read past row; nothing from that row on is imported"""
+
+    def __init__(self, message, row):
+        super().__init__(message)
+        self.row = row
+
+
+@contextmanager
+def _text(stream):
+    """Decoded view of a binary stream (a leading BOM is dropped, line endings are kept)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield text
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def _csv_records(stream):
+    """(line number, record) per request, grouping item rows that share a ref"""
+    current, current_ref, current_row = None, None, None
+    with _text(stream) as text:
+        reader = csv.DictReader(text)
+        try:
+            reader.fieldnames  # reads the header
+            line = reader.line_num
+            for row in reader:
+                # Quoted fields may span lines: a row starts after the previous one ends
+                row_number, line = line + 1, reader.line_num
+                row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+                ref = row.get('ref') or None
+                if current is not None and (ref is None or ref != current_ref):
+                    yield current_row, current
+                    current = None
+                if current is None:
+                    current = {key: value for key, value in row.items() if not key.startswith('item_') and value}
+                    current['items'] = []
+                    current_ref, current_row = ref, row_number
+                if row.get('item_name'):
+                    current['items'].append({
+                        'name': row['item_name'],
+                        'quantity': row.get('item_quantity') or 1,
+                        'unit_price': row.get('item_unit_price') or '0',
+                        'description': row.get('item_description', ''),
+                    })
+        except UnicodeDecodeError:
+            raise UnreadableInput('File is not UTF-8 text', current_row or reader.line_num + 1)
+        except csv.Error as e:
+            raise UnreadableInput(f'Invalid CSV: {e}', current_row or reader.line_num + 1)
+    if current is not None:
+        yield current_row, current
+
+
+def _ndjson_records(stream):
+    line_number = 0
+    with _text(stream) as text:
+        try:
+            for line_number, line in enumerate(text, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        yield line_number, ValidationError('Invalid JSON')
+        except UnicodeDecodeError:
+            raise UnreadableInput('File is not UTF-8 text', line_number + 1)
+
+
+def _json_records(stream):
+    """Elements of a top-level JSON array, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    with _text(stream) as text:
+        buffer, position, index = '', 0, 0
+        opened = eof = False
+
+        def read():
+            try:
+                return text.read(READ_SIZE)
+            except UnicodeDecodeError:
+                raise UnreadableInput('File is not UTF-8 text', index + 1)
+
+        while True:
+            separators = ' \t\r\n,' if opened else ' \t\r\n'
+            while position < len(buffer) and buffer[position] in separators:
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    if opened:
+                        raise UnreadableInput('Unterminated JSON array', index + 1)
+                    return
+                chunk = read()
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            if not opened:
+                if buffer[position] != '[':
+                    raise UnreadableInput('File is not a JSON array of requests', 1)
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # The element is cut off at the end of the buffer, or invalid.
+                # Past IMPORT_MAX_RECORD_SIZE it is given up on rather than
+                # buffering (and re-parsing) the rest of the file.
+                if eof or len(buffer) - position > settings.IMPORT_MAX_RECORD_SIZE:
+                    raise UnreadableInput(f'Invalid JSON in element {index + 1}', index + 1)
+                chunk = read()
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            index += 1
+            yield index, value
+            if position > READ_SIZE:
+                buffer, position = buffer[position:], 0
+
+
+def iter_records(stream, fmt):
+    """(row number, record) pairs from a binary stream, without reading it all"""
+    return {'csv': _csv_records, 'ndjson': _ndjson_records, 'json': _json_records}[fmt](stream)
+
+
+def _parse_created_at(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime(day.year, day.month, day.day) if day else None
+        if parsed is None:
+            raise ValidationError('Invalid date')
+        value = parsed
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    if value > timezone.now():
+        raise ValidationError('Date is in the future')
+    return value
+
+
+def build_request(record, users, default_user):
+    """Unsaved PurchaseRequest, its item rows, and field errors for one record"""
+    if isinstance(record, ValidationError):
+        return None, None, {'record': record.messages}
+    if not isinstance(record, dict):
+        return None, None, {'record': ['Expected an object']}
+    errors = {}
+
+    def check(field, func):
+        try:
+            return func()
+        except ValidationError as e:
+            errors[field] = e.messages
+        except (TypeError, ValueError, InvalidOperation):
+            errors[field] = ['Invalid value']
+
+    def title():
+        value = str(record.get('title') or '').strip()
+        validate_title(value)
+        if len(value) > 200:
+            raise ValidationError('Title cannot exceed 200 characters')
+        return value
+
+    def description():
+        value = str(record.get('description') or '').strip()
+        if not value:
+            raise ValidationError('This field is required')
+        validate_description(value)
+        return value
+
+    def amount():
+        value = Decimal(str(record.get('amount', '')).replace(',', '').strip())
+        validate_amount(value)
+        return value.quantize(Decimal('0.01'))
+
+    def status():
+        value = str(record.get('status') or 'pending').strip().lower()
+        if value not in dict(PurchaseRequest.STATUS_CHOICES):
+            raise ValidationError(f'Unknown status {value!r}')
+        return value
+
+    def created_by():
+        name = str(record.get('created_by') or '').strip().lower()
+        if not name:
+            return default_user
+        if name not in users:
+            raise ValidationError(f'Unknown user {name!r}')
+        return users[name]
+
+    def items():
+        return [normalize_item(item) for item in record.get('items') or []]
+
+    values = {
+        'title': check('title', title),
+        'description': check('description', description),
+        'amount': check('amount', amount),
+        'status': check('status', status),
+        'created_at': check('created_at', lambda: _parse_created_at(record.get('created_at'))),
+        'created_by': check('created_by', created_by),
+    }
+    item_rows = check('items', items)
+    if errors:
+        return None, None, errors
+
+    user = values['created_by']
+    purchase_request = PurchaseRequest(
+        title=values['title'], description=values['description'], amount=values['amount'],
+        status=values['status'], approval_stage=approval_stage(values['status'], ()),
+        created_by=user, department=user.department or '',
+        search_document=build_search_document(values['description'], {}, [row['name'] for row in item_rows]),
+    )
+    purchase_request.import_created_at = values['created_at']
+    return purchase_request, item_rows, None
+
+
+def _resolve_users(records):
+    names = {
+        str(record.get('created_by')).strip().lower()
+        for _, record in records if isinstance(record, dict) and record.get('created_by')
+    }
+    if not names:
+        return {}
+    users = {}
+    query = Q(username__in=names) | Q(email__in=names)
+    for user in get_user_model().objects.filter(query):
+        users[user.username.lower()] = user
+        if user.email:
+            users[user.email.lower()] = user
+    return users
+
+
+def _set_created_at(requests):
+    """created_at is auto_now_add, so historical dates are written after the insert.
+
+    updated_at keeps the import time so change feeds pick the rows up.
+    """
+    connection = connections[PurchaseRequest.objects.db]
+    table = connection.ops.quote_name(PurchaseRequest._meta.db_table)
+    rows = []
+    for request in requests:
+        request.created_at = request.import_created_at
+        rows.append((connection.ops.adapt_datetimefield_value(request.created_at), request.pk))
+    with connection.cursor() as cursor:
+        cursor.executemany(f"UPDATE {table} SET created_at = %s WHERE id = %s", rows)
+
+
+@transaction.atomic
+def _write_chunk(built):
+    requests = PurchaseRequest.objects.bulk_create([request for request, _ in built])
+    historical = [request for request in requests if request.import_created_at]
+    if historical:
+        _set_created_at(historical)
+    RequestItem.objects.bulk_create([
+        RequestItem(request=request, **row) for request, rows in built for row in rows
+    ])
+
+    deltas = new_deltas()
+    for request in requests:
+        add_delta(deltas, request.tracked_values(), +1)
+    apply_bulk_deltas(deltas)
+    for user_id in {request.created_by_id for request in requests}:
+        RequestCache.invalidate_user_cache(user_id)
+        transaction.on_commit(lambda user_id=user_id: RequestCache.invalidate_user_cache(user_id))
+
+
+def import_requests(stream, fmt, default_user, dry_run=False, chunk_size=None):
+    """Validate and insert requests from stream, one transaction per chunk.
+
+    Valid rows are written even when others fail; the report lists the
+    failing rows (up to IMPORT_MAX_REPORTED_ERRORS) with their field errors,
+    and under 'stopped' the row and reason if the file could not be read to
+    the end.
+    """
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    report = {'created': 0, 'failed': 0, 'errors': [], 'dry_run': dry_run}
+    records = iter_records(stream, fmt)
+    stopped = None
+    while stopped is None:
+        chunk = []
+        try:
+            # Records read before the error stay in chunk
+            chunk.extend(islice(records, chunk_size))
+        except UnreadableInput as e:
+            stopped = e
+        if not chunk:
+            break
+        users = _resolve_users(chunk)
+        built = []
+        for row_number, record in chunk:
+            purchase_request, item_rows, errors = build_request(record, users, default_user)
+            if errors:
+                report['failed'] += 1
+                if len(report['errors']) < settings.IMPORT_MAX_REPORTED_ERRORS:
+                    report['errors'].append({'row': row_number, 'errors': errors})
+                continue
+            built.append((purchase_request, item_rows))
+        if built and not dry_run:
+            _write_chunk(built)
+        report['created'] += len(built)
+    if stopped is not None:
+        report['stopped'] = {'row': stopped.row, 'error': stopped.messages[0]}
+    return report
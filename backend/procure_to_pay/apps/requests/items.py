@@ -0,0 +1,101 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.utils import timezone
+from .cache import RequestCache
+from .models import PurchaseRequest, RequestItem
+
+CENT = Decimal('0.01')
+# RequestItem prices are DecimalField(max_digits=10, decimal_places=2)
+MAX_PRICE = Decimal('99999999.99')
+NAME_LENGTH = RequestItem._meta.get_field('name').max_length
+
+
+def to_money(value):
+    """Exact Decimal for a price such as 1250, '1,250.50' or Decimal('3.1'), rounded to cents"""
+    if isinstance(value, float):
+        # Go through repr so 0.1 stays 0.1 rather than its binary expansion
+        value = repr(value)
+    try:
+        amount = Decimal(str(value).replace(',', '').replace(' ', '')).quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        raise ValidationError(f'Invalid price: {value!r}')
+    if not amount.is_finite() or amount < 0 or amount > MAX_PRICE:
+        raise ValidationError(f'Price out of range: {value!r}')
+    return amount
+
+
+def line_total(quantity, unit_price):
+    """quantity x unit_price, exact to the cent"""
+    return (Decimal(quantity) * unit_price).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def normalize_item(data):
+    """Field values for one RequestItem from serializer or AI-extracted data"""
+    if not isinstance(data, dict):
+        raise ValidationError('Item must be an object')
+    try:
+        quantity = Decimal(str(data.get('quantity', 1)).strip())
+        if quantity != quantity.to_integral_value() or quantity < 0:
+            raise ValueError
+        quantity = int(quantity)
+    except (InvalidOperation, ValueError):
+        raise ValidationError(f"Invalid quantity: {data.get('quantity')!r}")
+    unit_price = to_money(data.get('unit_price', '0'))
+    total_price = line_total(quantity, unit_price)
+    if total_price > MAX_PRICE:
+        raise ValidationError('Line total out of range')
+    return {
+        'name': (str(data.get('name') or '').strip() or 'Unknown Item')[:NAME_LENGTH],
+        'description': str(data.get('description') or ''),
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'total_price': total_price,
+    }
+
+
+def normalize_items(items_data):
+    """Split items into normalized rows and [{'index', 'error'}] for the ones that were rejected"""
+    rows, errors = [], []
+    for index, data in enumerate(items_data or []):
+        try:
+            rows.append(normalize_item(data))
+        except ValidationError as e:
+            errors.append({'index': index, 'error': e.messages[0]})
+    return rows, errors
+
+
+def _delete_items(purchase_request):
+    # QuerySet.delete() would load the items for RequestItem's post_delete
+    # receiver and delete them 100 ids at a time; items have no dependents
+    connection = connections[RequestItem.objects.db]
+    quote = connection.ops.quote_name
+    column = RequestItem._meta.get_field('request').column
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote(RequestItem._meta.db_table)} WHERE {quote(column)} = %s",
+                       [purchase_request.pk])
+
+
+@transaction.atomic
+def replace_items(purchase_request, items_data):
+    """Replace a request's line items with one DELETE and one bulk INSERT.
+
+    Invalid items are skipped and reported. Neither statement sends per-row
+    signals: the request's search document and updated_at are refreshed once
+    for the whole set, so the number of queries does not depend on the number
+    of items (SQLite aside, whose parameter limit splits large INSERTs).
+    Returns (created items, errors).
+    """
+    rows, errors = normalize_items(items_data)
+    _delete_items(purchase_request)
+    items = RequestItem.objects.bulk_create([RequestItem(request=purchase_request, **row) for row in rows])
+
+    purchase_request.refresh_search_document(item_names=[row['name'] for row in rows])
+    purchase_request.updated_at = timezone.now()
+    PurchaseRequest.objects.filter(pk=purchase_request.pk).update(
+        search_document=purchase_request.search_document,
+        vendor_name=purchase_request.vendor_name,
+        updated_at=purchase_request.updated_at,
+    )
+    RequestCache.invalidate_request_cache(purchase_request)
+    return items, errors
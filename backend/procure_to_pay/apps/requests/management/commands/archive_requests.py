@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from ...archive import archive_requests
+
+class Command(BaseCommand):
+    help = 'Move approved and rejected requests older than ARCHIVE_AFTER_DAYS out of the hot table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, help='Days since last change (default: ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, help='Requests per transaction (default: ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--limit', type=int, help='Stop after archiving this many requests')
+
+    def handle(self, *args, **options):
+        archived = archive_requests(options['older_than'], options['batch_size'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'{archived} requests archived'))
@@ -0,0 +1,40 @@
+import json
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from ...importer import FORMATS, detect_format, import_requests
+
+class Command(BaseCommand):
+    help = 'Import purchase requests and line items from a CSV, JSON or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True,
+                            help='Username or email owning rows without a created_by column')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, help='Requests per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate without writing')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user = User.objects.filter(username=options['user']).first() or \
+            User.objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(f"Unknown user {options['user']!r}")
+        try:
+            fmt = detect_format(options['path'], options['format'])
+            with open(options['path'], 'rb') as stream:
+                report = import_requests(stream, fmt, user, dry_run=options['dry_run'],
+                                         chunk_size=options['chunk_size'])
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        verb = 'validated' if options['dry_run'] else 'imported'
+        summary = f"{report['created']} requests {verb}, {report['failed']} rows failed"
+        if 'stopped' in report:
+            raise CommandError(f"{summary}; stopped at row {report['stopped']['row']}: {report['stopped']['error']}")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Hold many concurrent connections against a running server and report throughput, latency '
+            'and how responsive a probe URL stays; compare WSGI and ASGI deployments with it')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='e.g. http://localhost:8000/api/requests/1/download/proforma/')
+        parser.add_argument('--connections', type=int, default=200, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds to keep the load on')
+        parser.add_argument('--token', default='', help='JWT access token sent as a Bearer header')
+        parser.add_argument('--read-rate', type=int, default=0,
+                            help='Bytes per second each client reads, to mimic slow networks (0: unlimited)')
+        parser.add_argument('--probe', help='URL timed once a second while the load runs, e.g. /health/')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if urlsplit(options['url']).scheme != 'http':
+            raise CommandError('Only http:// URLs are supported')
+        report = asyncio.run(self.run(options))
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for name, value in report.items():
+            self.stdout.write(f'{name:>22}: {value}')
+
+    async def run(self, options):
+        stats = {'completed': 0, 'failed': 0, 'latencies': [], 'active': 0, 'peak': 0, 'bytes': 0}
+        deadline = time.monotonic() + options['duration']
+        headers = {'Authorization': f"Bearer {options['token']}"} if options['token'] else {}
+
+        async def client():
+            while time.monotonic() < deadline:
+                stats['active'] += 1
+                stats['peak'] = max(stats['peak'], stats['active'])
+                started = time.monotonic()
+                try:
+                    status, size = await asyncio.wait_for(
+                        fetch(options['url'], headers, options['read_rate']), options['timeout']
+                    )
+                    ok = status < 400
+                except (OSError, asyncio.TimeoutError, ValueError):
+                    ok, size = False, 0
+                finally:
+                    stats['active'] -= 1
+                if ok:
+                    stats['completed'] += 1
+                    stats['bytes'] += size
+                    stats['latencies'].append(time.monotonic() - started)
+                else:
+                    stats['failed'] += 1
+                    # Back off so a refusing server is not hammered in a tight loop
+                    await asyncio.sleep(0.1)
+
+        probes = []
+
+        async def probe():
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    await asyncio.wait_for(fetch(options['probe'], {}, 0), options['timeout'])
+                    probes.append(time.monotonic() - started)
+                except (OSError, asyncio.TimeoutError, ValueError):
+                    probes.append(None)
+                await asyncio.sleep(1)
+
+        started = time.monotonic()
+        tasks = [client() for _ in range(options['connections'])]
+        if options['probe']:
+            tasks.append(probe())
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(stats['latencies'])
+        report = {
+            'connections': options['connections'],
+            'seconds': round(elapsed, 1),
+            'completed': stats['completed'],
+            'failed': stats['failed'],
+            'requests_per_second': round(stats['completed'] / elapsed, 1),
+            'peak_in_flight': stats['peak'],
+            'megabytes_received': round(stats['bytes'] / 1e6, 1),
+            'latency_p50_ms': percentile(latencies, 50),
+            'latency_p95_ms': percentile(latencies, 95),
+            'latency_p99_ms': percentile(latencies, 99),
+        }
+        if options['probe']:
+            answered = sorted(probe for probe in probes if probe is not None)
+            report['probe_answered'] = f'{len(answered)}/{len(probes)}'
+            report['probe_median_ms'] = round(statistics.median(answered) * 1000, 1) if answered else None
+        return report
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000, 1)
+
+
+async def fetch(url, headers, read_rate):
+    """GET url over a fresh connection; returns (status, body bytes)"""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        lines = [f'GET {target or "/"} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: close']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        await writer.drain()
+
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        size = 0
+        chunk_size = max(read_rate // 10, 1024) if read_rate else 65536
+        while chunk := await reader.read(chunk_size):
+            size += len(chunk)
+            if read_rate:
+                await asyncio.sleep(len(chunk) / read_rate)
+        return status, size
+    finally:
+        writer.close()
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from ...changes import prune_tombstones
+
+class Command(BaseCommand):
+    help = 'Delete change-feed tombstones older than CHANGE_FEED_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} tombstones pruned'))
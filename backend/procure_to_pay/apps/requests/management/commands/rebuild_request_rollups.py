@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from ...rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the daily request rollups from the purchase requests table'
+
+    def handle(self, *args, **options):
+        buckets = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'{buckets} rollup rows rebuilt'))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0004_purchaserequest_proforma_content_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaserequest',
+            index=models.Index(fields=['created_by', 'updated_at'], name='requests_pu_created_b191a9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaserequest',
+            index=models.Index(fields=['updated_at'], name='requests_pu_updated_a0c25c_idx'),
+        ),
+    ]
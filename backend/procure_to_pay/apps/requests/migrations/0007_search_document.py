@@ -0,0 +1,114 @@
+# Full-text search: search_document column plus a database-native index
+# (tsvector + GIN on PostgreSQL, FTS5 external-content table on SQLite)
+
+from django.db import migrations, models
+
+# Everything below is frozen here on purpose: later changes to apps/requests/search.py
+# must not change what this migration does
+
+TABLE = 'requests_purchaserequest'
+FTS_TABLE = 'requests_purchaserequest_fts'
+
+POSTGRES_FORWARD = [
+    f"""
+    ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(search_document, '')), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_requests_search_vector ON {TABLE} USING GIN (search_vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS idx_requests_search_vector",
+    f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, search_document, content='{TABLE}', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, search_document)
+        VALUES (new.id, new.title, new.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_document)
+        VALUES ('delete', old.id, old.title, old.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, search_document ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_document)
+        VALUES ('delete', old.id, old.title, old.search_document);
+        INSERT INTO {FTS_TABLE}(rowid, title, search_document)
+        VALUES (new.id, new.title, new.search_document);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def build_search_document(description, proforma_data, item_names):
+    parts = [description or '']
+    proforma_data = proforma_data or {}
+    if proforma_data.get('vendor'):
+        parts.append(str(proforma_data['vendor']))
+    parts.extend(str(item.get('name', '')) for item in proforma_data.get('items', []) if isinstance(item, dict))
+    parts.extend(item_names)
+    seen = []
+    for part in parts:
+        part = part.strip()
+        if part and part not in seen:
+            seen.append(part)
+    return '\n'.join(seen)
+
+
+def backfill_search_document(apps, schema_editor):
+    PurchaseRequest = apps.get_model('requests', 'PurchaseRequest')
+    RequestItem = apps.get_model('requests', 'RequestItem')
+    rows = PurchaseRequest.objects.only('id', 'description', 'proforma_data').iterator(chunk_size=500)
+    for row in rows:
+        names = list(RequestItem.objects.filter(request_id=row.id).values_list('name', flat=True))
+        PurchaseRequest.objects.filter(pk=row.id).update(
+            search_document=build_search_document(row.description, row.proforma_data, names)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaserequest',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
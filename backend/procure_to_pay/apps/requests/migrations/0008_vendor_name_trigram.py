@@ -0,0 +1,50 @@
+# Fuzzy search: vendor_name column plus pg_trgm GIN indexes on PostgreSQL.
+# Other databases use the in-process index in fuzzy.py.
+
+from django.db import migrations, models
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_requests_title_trgm ON requests_purchaserequest USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_requests_vendor_trgm ON requests_purchaserequest USING GIN (vendor_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_requestitem_name_trgm ON requests_requestitem USING GIN (name gin_trgm_ops)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS idx_requestitem_name_trgm",
+    "DROP INDEX IF EXISTS idx_requests_vendor_trgm",
+    "DROP INDEX IF EXISTS idx_requests_title_trgm",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+def backfill_vendor_name(apps, schema_editor):
+    PurchaseRequest = apps.get_model('requests', 'PurchaseRequest')
+    rows = PurchaseRequest.objects.exclude(proforma_data={}).only('id', 'proforma_data').iterator(chunk_size=500)
+    for row in rows:
+        vendor = str((row.proforma_data or {}).get('vendor') or '')[:200]
+        if vendor:
+            PurchaseRequest.objects.filter(pk=row.id).update(vendor_name=vendor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0007_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaserequest',
+            name='vendor_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_vendor_name, migrations.RunPython.noop),
+        migrations.RunPython(_run(POSTGRES_FORWARD), _run(POSTGRES_REVERSE)),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    PurchaseRequest = apps.get_model('requests', 'PurchaseRequest')
+    RequestDailyRollup = apps.get_model('requests', 'RequestDailyRollup')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    PurchaseRequest.objects.update(department=Subquery(
+        User.objects.filter(pk=OuterRef('created_by_id')).values('department')[:1]
+    ))
+    rows = PurchaseRequest.objects.order_by().annotate(day=TruncDate('created_at')).values(
+        'day', 'status', 'department', 'created_by_id'
+    ).annotate(
+        request_count=Count('id'),
+        total_amount=Sum('amount'),
+        high_value_count=Count('id', filter=Q(amount__gt=100000)),
+    )
+    RequestDailyRollup.objects.bulk_create([RequestDailyRollup(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('requests', '0008_vendor_name_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaserequest',
+            name='department',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='RequestDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=10)),
+                ('department', models.CharField(blank=True, default='', max_length=100)),
+                ('request_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('high_value_count', models.IntegerField(default=0)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='request_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'status'], name='requests_re_day_8a35f4_idx'), models.Index(fields=['created_by', 'day'], name='requests_re_created_0ba635_idx')],
+                'unique_together': {('day', 'status', 'department', 'created_by')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
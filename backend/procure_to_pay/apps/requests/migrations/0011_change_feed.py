@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0010_approval_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_id', models.BigIntegerField()),
+                ('created_by_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='purchaserequest',
+            index=models.Index(fields=['updated_at', 'id'], name='requests_pu_updated_ac6115_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaserequest',
+            index=models.Index(fields=['created_by', 'updated_at', 'id'], name='requests_pu_created_abb277_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestdeletion',
+            index=models.Index(fields=['deleted_at'], name='requests_re_deleted_6b4d7b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestdeletion',
+            index=models.Index(fields=['created_by_id', 'id'], name='requests_re_created_a49550_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:03
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def backfill_approval_stage(apps, schema_editor):
+    PurchaseRequest = apps.get_model('requests', 'PurchaseRequest')
+    Approval = apps.get_model('requests', 'Approval')
+    PurchaseRequest.objects.exclude(status='pending').update(approval_stage='')
+
+    def approved_by(role):
+        return Exists(Approval.objects.filter(request=OuterRef('pk'), approved=True, approver__role=role))
+
+    # Roles as of this migration (workflow.REQUIRED_APPROVER_ROLES)
+    pending = PurchaseRequest.objects.filter(status='pending')
+    pending.filter(approved_by('approver_level_1'), ~approved_by('approver_level_2')).update(
+        approval_stage='approver_level_2'
+    )
+    pending.filter(approved_by('approver_level_2'), ~approved_by('approver_level_1')).update(
+        approval_stage='approver_level_1'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0011_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaserequest',
+            name='approval_stage',
+            field=models.CharField(blank=True, default='all', editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_approval_stage, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='purchaserequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['approval_stage', 'created_at', 'id'], name='requests_pending_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('requests', '0012_approval_stage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRequest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=10)),
+                ('department', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('snapshot', models.BinaryField(null=True)),
+                ('proforma', models.FileField(blank=True, null=True, upload_to='proformas/')),
+                ('purchase_order', models.FileField(blank=True, null=True, upload_to='purchase_orders/')),
+                ('receipt', models.FileField(blank=True, null=True, upload_to='receipts/')),
+                ('proforma_content', models.BinaryField(blank=True, null=True)),
+                ('proforma_filename', models.CharField(blank=True, max_length=255)),
+                ('proforma_content_type', models.CharField(blank=True, max_length=100)),
+                ('purchase_order_content', models.BinaryField(blank=True, null=True)),
+                ('purchase_order_filename', models.CharField(blank=True, max_length=255)),
+                ('receipt_content', models.BinaryField(blank=True, null=True)),
+                ('receipt_filename', models.CharField(blank=True, max_length=255)),
+                ('receipt_content_type', models.CharField(blank=True, max_length=100)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='requests_ar_created_787b18_idx'), models.Index(fields=['created_by', 'created_at', 'id'], name='requests_ar_created_1b4b44_idx')],
+            },
+        ),
+    ]
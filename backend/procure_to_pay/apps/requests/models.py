@@ -1,7 +1,10 @@
+import copy
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from ..documents.codecs import encode_blob
+from .search import build_search_document
 from .validators import (
     FileTypeValidator, SecureFilenameValidator, 
     validate_amount, validate_title, validate_description
@@ -21,8 +24,16 @@ class PurchaseRequest(models.Model):
         validators=[MinValueValidator(0), validate_amount]
     )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Approver role a pending request still waits on, 'all' while several are
+    # missing and blank once decided; keys the approver queue (see workflow.approval_stage)
+    STAGE_ALL = 'all'
+    approval_stage = models.CharField(max_length=20, blank=True, default=STAGE_ALL, editable=False)
+    # Bumped by every workflow transition; decisions compare-and-swap on it (see workflow.py)
+    version = models.PositiveIntegerField(default=0, editable=False)
     
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_requests')
+    # Creator's department when the request was raised; keys the daily rollups
+    department = models.CharField(max_length=100, blank=True, default='', editable=False)
     approved_by = models.ManyToManyField(settings.AUTH_USER_MODEL, through='Approval', related_name='approved_requests')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -57,6 +68,11 @@ class PurchaseRequest(models.Model):
     receipt_filename = models.CharField(max_length=255, blank=True)
     receipt_content_type = models.CharField(max_length=100, blank=True)
     
+    # Vendor extracted from the proforma, indexed for fuzzy lookup (see fuzzy.py)
+    vendor_name = models.CharField(max_length=200, blank=True, default='', editable=False)
+    # Description, vendor and line-item names, indexed for full-text search (see search.py)
+    search_document = models.TextField(blank=True, default='', editable=False)
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -64,17 +80,105 @@ class PurchaseRequest(models.Model):
             models.Index(fields=['created_by', 'status']),
             models.Index(fields=['amount']),
             models.Index(fields=['created_at']),
+            # Conditional GET validators: Max(updated_at) per visible scope
+            models.Index(fields=['created_by', 'updated_at']),
+            models.Index(fields=['updated_at']),
+            # Keyset pagination on (created_at, id), overall and per creator
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['created_by', 'created_at', 'id']),
+            # Change feed keyset on (updated_at, id), overall and per creator
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['created_by', 'updated_at', 'id']),
+            # Approver work queue: pending rows only, keyset on (created_at, id) per stage
+            models.Index(
+                fields=['approval_stage', 'created_at', 'id'], condition=models.Q(status='pending'),
+                name='requests_pending_queue_idx'
+            ),
         ]
     
+    # Fields whose values as loaded from the database are kept on the instance,
+    # so saves can tell what changed without re-reading the row
+    TRACKED_FIELDS = ('status', 'amount', 'created_at', 'created_by_id', 'department')
+    # Fields search_document and vendor_name are built from (items aside, see items.py)
+    SEARCH_FIELDS = ('description', 'proforma_data')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        # Copied: proforma_data is a dict callers may edit in place
+        instance._loaded_search = {
+            name: copy.deepcopy(value) for name, value in zip(field_names, values) if name in cls.SEARCH_FIELDS
+        }
+        return instance
+    
+    def tracked_values(self):
+        """Current values of TRACKED_FIELDS (deferred ones are left out)"""
+        deferred = self.get_deferred_fields()
+        return {name: getattr(self, name) for name in self.TRACKED_FIELDS if name not in deferred}
+    
     def clean(self):
         if self.status in ['approved', 'rejected'] and self.pk:
-            original = PurchaseRequest.objects.get(pk=self.pk)
-            if original.status in ['approved', 'rejected'] and original.status != self.status:
-                raise ValidationError("Cannot change status of approved/rejected requests")
+            from .workflow import check_transition
+            snapshot = getattr(self, '_loaded_values', {})
+            if 'status' in snapshot:
+                original_status = snapshot['status']
+            else:
+                original_status = PurchaseRequest.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            check_transition(original_status, self.status)
+    
+    # Stored document blob -> field holding its content type
+    BLOB_CONTENT_TYPES = {
+        'proforma_content': 'proforma_content_type',
+        'purchase_order_content': None,
+        'receipt_content': 'receipt_content_type',
+    }
     
     def save(self, *args, **kwargs):
         self.clean()
+        if self._state.adding and not self.department and self.created_by_id:
+            self.department = self.created_by.department or ''
+        if self.status != 'pending':
+            self.approval_stage = ''
+        elif not self.approval_stage:
+            # Back to pending (admin edits): wait on whoever has not approved yet
+            from .workflow import current_stage
+            self.approval_stage = current_stage(self.pk) if self.pk else self.STAGE_ALL
+        self._compress_blobs()
+        update_fields = kwargs.get('update_fields')
+        if self._search_inputs_changed(update_fields):
+            self.refresh_search_document()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'search_document', 'vendor_name'}
         super().save(*args, **kwargs)
+        self._loaded_search = {name: copy.deepcopy(getattr(self, name)) for name in self.SEARCH_FIELDS
+                               if name not in self.get_deferred_fields()}
+    
+    def _search_inputs_changed(self, update_fields=None):
+        """Whether this save may change search_document: status-only saves skip the items query"""
+        if self._state.adding:
+            return True
+        names = [name for name in self.SEARCH_FIELDS if name not in self.get_deferred_fields()]
+        if update_fields is not None:
+            names = [name for name in names if name in update_fields]
+        loaded = getattr(self, '_loaded_search', {})
+        return any(name not in loaded or loaded[name] != getattr(self, name) for name in names)
+    
+    def refresh_search_document(self, item_names=None):
+        self.vendor_name = str((self.proforma_data or {}).get('vendor') or '')[:200]
+        if item_names is None:
+            item_names = list(self.items.values_list('name', flat=True)) if self.pk else []
+        self.search_document = build_search_document(self.description, self.proforma_data, item_names)
+    
+    def _compress_blobs(self):
+        """Compress freshly assigned document blobs; deferred blobs are left untouched"""
+        for field_name, type_field in self.BLOB_CONTENT_TYPES.items():
+            value = self.__dict__.get(field_name)
+            if value:
+                content_type = getattr(self, type_field) if type_field else 'application/pdf'
+                setattr(self, field_name, encode_blob(value, content_type))
     
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
@@ -88,11 +192,13 @@ class RequestItem(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     
     def save(self, *args, **kwargs):
-        self.total_price = self.quantity * self.unit_price
+        from .items import line_total, to_money
+        self.unit_price = to_money(self.unit_price)
+        self.total_price = line_total(self.quantity, self.unit_price)
         super().save(*args, **kwargs)
     
     def __str__(self):
-        return f"{self.name} - {self.request.title}"
+        return f"{self.name} - request #{self.request_id}"
 
 class Approval(models.Model):
     request = models.ForeignKey(PurchaseRequest, on_delete=models.CASCADE, related_name='approvals')
@@ -106,4 +212,88 @@ class Approval(models.Model):
     
     def __str__(self):
         status = "Approved" if self.approved else "Rejected"
-        return f"{self.request.title} - {status} by {self.approver.username}"
\ No newline at end of file
+        return f"{self.request.title} - {status} by {self.approver.username}"
+
+class RequestDeletion(models.Model):
+    """Tombstone of a deleted purchase request, read by the change feed (see changes.py)"""
+    request_id = models.BigIntegerField()
+    # Plain ids rather than foreign keys: the rows they point at are gone or may go
+    created_by_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at']),
+            models.Index(fields=['created_by_id', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"Request #{self.request_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+class RequestDailyRollup(models.Model):
+    """Request counts and spend per day, status, department and creator.
+
+    Maintained incrementally from PurchaseRequest saves and deletes (see
+    rollups.py), so dashboards read O(days) rows instead of every request.
+    ``rebuild_request_rollups`` recomputes it from scratch.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=10, choices=PurchaseRequest.STATUS_CHOICES)
+    department = models.CharField(max_length=100, blank=True, default='')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='request_rollups')
+    request_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    high_value_count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['day', 'status', 'department', 'created_by']
+        indexes = [
+            models.Index(fields=['day', 'status']),
+            models.Index(fields=['created_by', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.status} {self.department or '-'}: {self.request_count}"
+
+class ArchivedRequest(models.Model):
+    """A closed purchase request moved out of the hot table (see archive.py).
+
+    Keeps the original id, the columns lists and rollups need, the stored
+    document blobs as they were, and ``snapshot``: the request's detail
+    representation (with items and approvals) as compressed JSON, served
+    unchanged by the detail endpoint.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=PurchaseRequest.STATUS_CHOICES)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_requests')
+    department = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    snapshot = models.BinaryField(null=True)
+    
+    # Same columns as on PurchaseRequest, so downloads read them the same way
+    proforma = models.FileField(upload_to='proformas/', null=True, blank=True)
+    purchase_order = models.FileField(upload_to='purchase_orders/', null=True, blank=True)
+    receipt = models.FileField(upload_to='receipts/', null=True, blank=True)
+    proforma_content = models.BinaryField(null=True, blank=True)
+    proforma_filename = models.CharField(max_length=255, blank=True)
+    proforma_content_type = models.CharField(max_length=100, blank=True)
+    purchase_order_content = models.BinaryField(null=True, blank=True)
+    purchase_order_filename = models.CharField(max_length=255, blank=True)
+    receipt_content = models.BinaryField(null=True, blank=True)
+    receipt_filename = models.CharField(max_length=255, blank=True)
+    receipt_content_type = models.CharField(max_length=100, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (created_at, id), overall and per creator
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['created_by', 'created_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} - {self.get_status_display()} (archived)"
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .cache import RequestCache
+from .events import publish_on_commit
+from .models import Approval, PurchaseRequest
+from .rollups import add_delta, apply_bulk_deltas, new_deltas
+from .workflow import approval_stage, next_status, queue_purchase_orders
+
+
+def parse_decisions(data):
+    """Validate a bulk review payload into [(id, approved, comments)]"""
+    if not isinstance(data, list) or not data:
+        raise ValidationError('decisions must be a non-empty list')
+    if len(data) > settings.BULK_REVIEW_MAX_ITEMS:
+        raise ValidationError(f'At most {settings.BULK_REVIEW_MAX_ITEMS} decisions per call')
+    decisions, seen = [], set()
+    for position, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise ValidationError(f'decisions[{position}] must be an object')
+        try:
+            request_id = int(item.get('id'))
+        except (TypeError, ValueError):
+            raise ValidationError(f'decisions[{position}].id must be an integer')
+        if item.get('decision') not in ('approve', 'reject'):
+            raise ValidationError(f"decisions[{position}].decision must be 'approve' or 'reject'")
+        if request_id in seen:
+            raise ValidationError(f'Request {request_id} appears more than once')
+        seen.add(request_id)
+        decisions.append((request_id, item['decision'] == 'approve', str(item.get('comments') or '').strip()))
+    return decisions
+
+
+@transaction.atomic
+def review_requests(user, decisions):
+    """Approve or reject many requests in a fixed number of queries.
+
+    Locks every request with one SELECT ... FOR UPDATE, reads their existing
+    approvals in one query, inserts the new approvals with bulk_create and
+    applies the resulting status changes as one UPDATE per outcome and
+    approval stage. Bulk
+    writes skip model signals, so rollups, caches and events are handled
+    here. POs of newly approved requests are rendered in the background
+    after commit.
+    Returns a result per decision, in order.
+    """
+    ids = [request_id for request_id, _, _ in decisions]
+    locked = {
+        row['id']: row for row in PurchaseRequest.objects.select_for_update().filter(pk__in=ids).values(
+            'id', *PurchaseRequest.TRACKED_FIELDS
+        )
+    }
+    approved_roles, reviewed = {}, set()
+    for request_id, approver_id, approved, role in Approval.objects.filter(request_id__in=locked).values_list(
+            'request_id', 'approver_id', 'approved', 'approver__role'):
+        if approver_id == user.id:
+            reviewed.add(request_id)
+        if approved:
+            approved_roles.setdefault(request_id, set()).add(role)
+
+    results, approvals = [], []
+    outcomes = {'approved': [], 'rejected': [], 'pending': []}
+    # (status, approval stage) -> request ids, one UPDATE each
+    transitions = {}
+    for request_id, approved, comments in decisions:
+        row = locked.get(request_id)
+        if row is None:
+            results.append({'id': request_id, 'status': 'error', 'error': 'Request not found'})
+            continue
+        if row['status'] != 'pending':
+            results.append({'id': request_id, 'status': 'error', 'error': 'Request is not pending'})
+            continue
+        if request_id in reviewed:
+            results.append({'id': request_id, 'status': 'error', 'error': 'You have already reviewed this request'})
+            continue
+
+        approvals.append(Approval(request_id=request_id, approver=user, approved=approved, comments=comments))
+        roles = approved_roles.get(request_id, set()) | ({user.role} if approved else set())
+        new_status = next_status(approved, roles)
+        outcomes[new_status].append(request_id)
+        transitions.setdefault((new_status, approval_stage(new_status, roles)), []).append(request_id)
+        results.append({'id': request_id, 'status': new_status})
+
+    Approval.objects.bulk_create(approvals, batch_size=500)
+
+    now = timezone.now()
+    for (new_status, stage), request_ids in transitions.items():
+        # Rows are locked, but still move the version so in-flight decisions retry
+        PurchaseRequest.objects.filter(pk__in=request_ids).update(
+            status=new_status, approval_stage=stage, version=F('version') + 1, updated_at=now
+        )
+
+    deltas = new_deltas()
+    for new_status in ('approved', 'rejected'):
+        for request_id in outcomes[new_status]:
+            before = locked[request_id]
+            add_delta(deltas, before, -1)
+            add_delta(deltas, {**before, 'status': new_status}, +1)
+            publish_on_commit(f'request.{new_status}', request_id, before['created_by_id'], status=new_status)
+    apply_bulk_deltas(deltas)
+
+    for created_by_id in {locked[result['id']]['created_by_id'] for result in results if result['status'] != 'error'}:
+        RequestCache.invalidate_user_cache(created_by_id)
+        transaction.on_commit(lambda user_id=created_by_id: RequestCache.invalidate_user_cache(user_id))
+
+    queue_purchase_orders(outcomes['approved'])
+    return results
@@ -0,0 +1,137 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import ArchivedRequest, PurchaseRequest, RequestDailyRollup
+
+# Same threshold the compliance alerts use for high-value requests
+HIGH_VALUE_THRESHOLD = Decimal('100000')
+
+
+def rollup_key(values):
+    """(day, status, department, created_by_id) bucket of a request's tracked values"""
+    return (
+        timezone.localtime(values['created_at']).date(),
+        values['status'],
+        values.get('department') or '',
+        values['created_by_id'],
+    )
+
+
+def add_delta(deltas, values, sign):
+    """Accumulate +1/-1 of a request into deltas (bucket -> [count, amount, high_value])"""
+    if not values:
+        return
+    amount = Decimal(str(values['amount'] or 0))
+    delta = deltas[rollup_key(values)]
+    delta[0] += sign
+    delta[1] += sign * amount
+    delta[2] += sign * (1 if amount > HIGH_VALUE_THRESHOLD else 0)
+
+
+def new_deltas():
+    return defaultdict(lambda: [0, Decimal('0'), 0])
+
+
+def apply_deltas(deltas):
+    """Apply bucket deltas with F() increments, creating buckets on first use"""
+    for (day, status, department, created_by_id), (count, amount, high_value) in deltas.items():
+        if not count and not amount and not high_value:
+            continue
+        bucket = RequestDailyRollup.objects.filter(
+            day=day, status=status, department=department, created_by_id=created_by_id
+        )
+        changes = {
+            'request_count': F('request_count') + count,
+            'total_amount': F('total_amount') + amount,
+            'high_value_count': F('high_value_count') + high_value,
+        }
+        if bucket.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                RequestDailyRollup.objects.create(
+                    day=day, status=status, department=department, created_by_id=created_by_id,
+                    request_count=count, total_amount=amount, high_value_count=high_value
+                )
+        except IntegrityError:
+            # Another writer created the bucket first
+            bucket.update(**changes)
+
+
+def apply_bulk_deltas(deltas):
+    """apply_deltas for large batches: one SELECT, one executemany UPDATE and one INSERT"""
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    days = {key[0] for key in deltas}
+    users = {key[3] for key in deltas}
+    existing = set(RequestDailyRollup.objects.filter(day__in=days, created_by_id__in=users).values_list(
+        'day', 'status', 'department', 'created_by_id'
+    ))
+
+    connection = connections[RequestDailyRollup.objects.db]
+    table = connection.ops.quote_name(RequestDailyRollup._meta.db_table)
+    updates = [
+        (count, connection.ops.adapt_decimalfield_value(amount, 16, 2), high_value,
+         connection.ops.adapt_datefield_value(day), status, department, created_by_id)
+        for (day, status, department, created_by_id), (count, amount, high_value) in deltas.items()
+        if (day, status, department, created_by_id) in existing
+    ]
+    if updates:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {table} SET request_count = request_count + %s, total_amount = total_amount + %s, "
+                f"high_value_count = high_value_count + %s "
+                f"WHERE day = %s AND status = %s AND department = %s AND created_by_id = %s",
+                updates
+            )
+
+    missing = {key: delta for key, delta in deltas.items() if key not in existing}
+    try:
+        with transaction.atomic():
+            RequestDailyRollup.objects.bulk_create([
+                RequestDailyRollup(day=day, status=status, department=department, created_by_id=created_by_id,
+                                   request_count=count, total_amount=amount, high_value_count=high_value)
+                for (day, status, department, created_by_id), (count, amount, high_value) in missing.items()
+            ])
+    except IntegrityError:
+        # Concurrent writers created some of the buckets first
+        apply_deltas(missing)
+
+
+def record_change(before, after):
+    """Move a request between buckets: before/after are tracked values or None"""
+    deltas = new_deltas()
+    add_delta(deltas, before, -1)
+    add_delta(deltas, after, +1)
+    apply_deltas(deltas)
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """Recompute every bucket from PurchaseRequest and ArchivedRequest; returns the number of buckets"""
+    RequestDailyRollup.objects.all().delete()
+    buckets = {}
+    # Archived requests still count (see archive.py)
+    for model in (PurchaseRequest, ArchivedRequest):
+        rows = model.objects.order_by().annotate(day=TruncDate('created_at')).values(
+            'day', 'status', 'department', 'created_by_id'
+        ).annotate(
+            request_count=Count('id'),
+            total_amount=Sum('amount'),
+            high_value_count=Count('id', filter=Q(amount__gt=HIGH_VALUE_THRESHOLD)),
+        )
+        for row in rows:
+            key = (row['day'], row['status'], row['department'], row['created_by_id'])
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = RequestDailyRollup(**row)
+                continue
+            bucket.request_count += row['request_count']
+            bucket.total_amount += row['total_amount']
+            bucket.high_value_count += row['high_value_count']
+    RequestDailyRollup.objects.bulk_create(buckets.values(), batch_size=1000)
+    return len(buckets)
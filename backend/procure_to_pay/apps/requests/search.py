@@ -0,0 +1,146 @@
+import re
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Full-text search over purchase requests.
+#
+# PostgreSQL: requests_purchaserequest.search_vector is a generated tsvector
+# column (title weighted A, search_document weighted B) with a GIN index.
+# SQLite: requests_purchaserequest_fts is an external-content FTS5 table kept
+# in sync by triggers. Both are created in migration 0007; other databases
+# fall back to icontains. SQLite drops triggers whenever a migration rebuilds
+# the table, so ensure_sqlite_fts() reinstalls them after every migrate.
+
+TABLE = 'requests_purchaserequest'
+FTS_TABLE = 'requests_purchaserequest_fts'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, search_document, content='{TABLE}', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, search_document)
+        VALUES (new.id, new.title, new.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_document)
+        VALUES ('delete', old.id, old.title, old.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, search_document ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_document)
+        VALUES ('delete', old.id, old.title, old.search_document);
+        INSERT INTO {FTS_TABLE}(rowid, title, search_document)
+        VALUES (new.id, new.title, new.search_document);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+SQLITE_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+
+def ensure_sqlite_fts(connection):
+    """Reinstall missing FTS5 triggers on SQLite and resync the index; True if anything was done"""
+    if connection.vendor != 'sqlite':
+        return False
+    wanted = [FTS_TABLE] + SQLITE_TRIGGERS
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(wanted))})", wanted
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        # Nothing to repair before migration 0007 (or after it is reversed)
+        if FTS_TABLE not in existing or existing >= set(wanted):
+            return False
+        for statement in SQLITE_FORWARD:
+            cursor.execute(statement)
+    return True
+
+
+def build_search_document(description, proforma_data, item_names):
+    """Text indexed alongside the title: description, vendor and line items"""
+    parts = [description or '']
+    proforma_data = proforma_data or {}
+    if proforma_data.get('vendor'):
+        parts.append(str(proforma_data['vendor']))
+    parts.extend(str(item.get('name', '')) for item in proforma_data.get('items', []) if isinstance(item, dict))
+    parts.extend(item_names)
+    # Keep the order stable and drop duplicates (AI items usually match RequestItems)
+    seen = []
+    for part in parts:
+        part = part.strip()
+        if part and part not in seen:
+            seen.append(part)
+    return '\n'.join(seen)
+
+
+def parse_terms(text):
+    """Search terms, and whether the last one is still being typed (a prefix)"""
+    text = text or ''
+    terms = TOKEN_RE.findall(text.lower())[:MAX_TERMS]
+    prefix = bool(terms) and not text.endswith(' ')
+    return terms, prefix
+
+
+def _tsquery(terms, prefix):
+    parts = list(terms)
+    if prefix:
+        parts[-1] += ':*'
+    return ' & '.join(parts)
+
+
+def _fts5_query(terms, prefix):
+    parts = [f'"{term}"' for term in terms]
+    if prefix:
+        parts[-1] += '*'
+    return ' AND '.join(parts)
+
+
+def search_requests(queryset, text):
+    """Filter queryset to requests matching text, annotated with search_rank and ranked"""
+    terms, prefix = parse_terms(text)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = _tsquery(terms, prefix)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f"SELECT id FROM {TABLE} WHERE search_vector @@ to_tsquery('english', %s)", [query]
+        )).annotate(search_rank=RawSQL(
+            f"ts_rank_cd({TABLE}.search_vector, to_tsquery('english', %s))", [query],
+            output_field=FloatField()
+        ))
+    elif vendor == 'sqlite':
+        query = _fts5_query(terms, prefix)
+        # bm25() is lower-is-better; negate it so every backend ranks descending
+        queryset = queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]
+        )).annotate(search_rank=RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id", [query],
+            output_field=FloatField()
+        ))
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(search_document__icontains=term)
+        queryset = queryset.filter(condition).annotate(search_rank=Value(1.0, output_field=FloatField()))
+    return queryset.order_by('-search_rank', '-created_at', '-id')
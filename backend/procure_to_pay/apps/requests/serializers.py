@@ -1,5 +1,7 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import PurchaseRequest, Approval, RequestItem
+from .models import ArchivedRequest, PurchaseRequest, Approval, RequestItem
+from .items import replace_items
 
 class RequestItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -30,8 +32,8 @@ class PurchaseRequestSerializer(serializers.ModelSerializer):
         items_data = validated_data.pop('items', [])
         request = PurchaseRequest.objects.create(**validated_data)
         
-        for item_data in items_data:
-            RequestItem.objects.create(request=request, **item_data)
+        if items_data:
+            replace_items(request, items_data)
         
         return request
     
@@ -40,9 +42,7 @@ class PurchaseRequestSerializer(serializers.ModelSerializer):
         instance = super().update(instance, validated_data)
         
         if items_data:
-            instance.items.all().delete()
-            for item_data in items_data:
-                RequestItem.objects.create(request=instance, **item_data)
+            replace_items(instance, items_data)
         
         return instance
 
@@ -53,4 +53,103 @@ class ApprovalSerializer(serializers.ModelSerializer):
     class Meta:
         model = Approval
         fields = ['id', 'approver', 'approver_name', 'approver_role', 'approved', 'comments', 'created_at']
-        read_only_fields = ['approver']
\ No newline at end of file
+        read_only_fields = ['approver']
+
+class SparseFieldsetMixin:
+    """Trim a representation with ?fields=a,b and opt into heavy fields with ?expand=a,b.
+
+    ``default_fields`` are returned when no ?fields= is given; ``expandable_fields``
+    are only returned when asked for. ``field_columns`` and ``field_prefetches``
+    describe what each field reads so the queryset can be projected to match.
+    """
+    default_fields = None
+    expandable_fields = []
+    field_columns = {}
+    field_prefetches = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            selected = set(self.selected_fields(request))
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
+
+    @staticmethod
+    def _split_param(request, name):
+        value = request.query_params.get(name, '') if request is not None else ''
+        return [part.strip() for part in value.split(',') if part.strip()]
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Field names to render for this request, in declaration order"""
+        available = list(cls.Meta.fields)
+        requested = set(cls._split_param(request, 'fields'))
+        expanded = set(cls._split_param(request, 'expand'))
+        if requested:
+            selected = requested | {'id'}
+        else:
+            selected = set(cls.default_fields or
+                           [name for name in available if name not in cls.expandable_fields])
+        selected |= expanded & set(cls.expandable_fields)
+        return [name for name in available if name in selected]
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        """Restrict queryset to the columns and relations the selected fields read"""
+        columns = {'pk'}
+        select_related = set()
+        prefetches = []
+        for name in cls.selected_fields(request):
+            if name in cls.field_prefetches:
+                prefetches.append(cls.field_prefetches[name])
+                continue
+            for column in cls.field_columns.get(name, [name]):
+                columns.add(column)
+                if '__' in column:
+                    select_related.add(column.split('__')[0])
+        # A select_related relation must also load its foreign key
+        columns |= select_related
+        queryset = queryset.select_related(*select_related) if select_related else queryset.select_related(None)
+        return queryset.prefetch_related(None).prefetch_related(*prefetches).only(*columns)
+
+class PurchaseRequestListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Read-only list representation; document blobs and JSON payloads are opt-in"""
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
+    approvals = ApprovalSerializer(many=True, read_only=True)
+    items = RequestItemSerializer(many=True, read_only=True)
+
+    # Includes the document fields the request list's download buttons read
+    default_fields = ['id', 'title', 'description', 'amount', 'status', 'created_by',
+                      'created_by_name', 'created_at', 'updated_at', 'approvals',
+                      'proforma', 'purchase_order', 'receipt', 'proforma_filename',
+                      'purchase_order_filename', 'receipt_filename']
+    expandable_fields = ['items', 'proforma_data', 'receipt_data', 'validation_results']
+    field_columns = {
+        'created_by_name': ['created_by__first_name', 'created_by__last_name'],
+    }
+    field_prefetches = {
+        'approvals': Prefetch('approvals', queryset=Approval.objects.select_related('approver')),
+        'items': 'items',
+    }
+
+    class Meta:
+        model = PurchaseRequest
+        fields = ['id', 'title', 'description', 'amount', 'status', 'created_by',
+                  'created_by_name', 'created_at', 'updated_at', 'approvals', 'items',
+                  'proforma', 'purchase_order', 'receipt', 'proforma_filename',
+                  'purchase_order_filename', 'receipt_filename', 'proforma_data',
+                  'receipt_data', 'validation_results']
+        read_only_fields = fields
+
+class ArchivedRequestSerializer(serializers.ModelSerializer):
+    """List representation of an archived request; the detail endpoint serves its snapshot"""
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
+
+    class Meta:
+        model = ArchivedRequest
+        fields = ['id', 'title', 'amount', 'status', 'created_by', 'created_by_name', 'department',
+                  'created_at', 'updated_at', 'archived_at', 'proforma_filename',
+                  'purchase_order_filename', 'receipt_filename']
+        read_only_fields = fields
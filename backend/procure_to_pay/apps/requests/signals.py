@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .cache import RequestCache
+from .models import Approval, PurchaseRequest, RequestDeletion, RequestItem
+from .search import ensure_sqlite_fts
+from .workflow import current_stage
+from . import rollups
+
+_muted = ContextVar('request_row_signals_muted', default=False)
+
+@contextmanager
+def muted_row_signals():
+    """Skip the per-row delete bookkeeping below for deletes made in this block.
+
+    For bulk writers that update the parent request, rollups, tombstones and
+    caches once for the whole set themselves.
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+def _stored_values(instance):
+    """Tracked values as currently stored, from the load snapshot when it is complete"""
+    snapshot = getattr(instance, '_loaded_values', {})
+    if all(name in snapshot for name in PurchaseRequest.TRACKED_FIELDS):
+        return snapshot
+    return PurchaseRequest.objects.filter(pk=instance.pk).values(*PurchaseRequest.TRACKED_FIELDS).first()
+
+@receiver(pre_save, sender=PurchaseRequest)
+def capture_rollup_state(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = None if raw or instance._state.adding else _stored_values(instance)
+
+@receiver(post_save, sender=PurchaseRequest)
+def update_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_rollup_before', None)
+    # Deferred fields were not touched, so they still hold their stored values
+    after = {**(before or {}), **instance.tracked_values()}
+    if len(after) == len(PurchaseRequest.TRACKED_FIELDS):
+        rollups.record_change(before, after)
+        instance._loaded_values = after
+
+@receiver(pre_delete, sender=PurchaseRequest)
+def capture_deleted_state(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    instance._rollup_before = _stored_values(instance)
+
+@receiver(post_delete, sender=PurchaseRequest)
+def remove_from_rollups(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    rollups.record_change(getattr(instance, '_rollup_before', None), None)
+
+@receiver(post_delete, sender=PurchaseRequest)
+def record_deletion(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    RequestDeletion.objects.create(request_id=instance.pk, created_by_id=instance.created_by_id)
+
+@receiver([post_save, post_delete], sender=PurchaseRequest)
+def invalidate_request(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete and _muted.get():
+        return
+    RequestCache.invalidate_request_cache(instance)
+
+@receiver([post_save, post_delete], sender=Approval)
+@receiver([post_save, post_delete], sender=RequestItem)
+def touch_parent_request(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete and _muted.get():
+        return
+    try:
+        purchase_request = instance.request
+    except PurchaseRequest.DoesNotExist:
+        # The parent is being deleted and already invalidated the cache
+        return
+    # Approvals and items are part of the request's representation, so they
+    # move its updated_at (and with it the conditional GET validators)
+    now = timezone.now()
+    changes = {'updated_at': now}
+    if sender is RequestItem:
+        purchase_request.refresh_search_document()
+        changes['search_document'] = purchase_request.search_document
+    elif purchase_request.status == 'pending':
+        # Approvals added or removed outside the workflow (admin) move the queue stage too
+        changes['approval_stage'] = current_stage(purchase_request.pk)
+    PurchaseRequest.objects.filter(pk=purchase_request.pk).update(**changes)
+    purchase_request.updated_at = now
+    RequestCache.invalidate_request_cache(purchase_request)
+
+def repair_search_index(sender, using='default', **kwargs):
+    """Connected to post_migrate: SQLite table rebuilds drop the FTS triggers"""
+    ensure_sqlite_fts(connections[using])
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import secrets
+import time
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .events import get_broker, hub
+
+
+# Stream tickets.
+#
+# EventSource cannot set headers, and a URL ends up in proxy logs and browser
+# history, so browsers never put their access token in the stream URL.
+# Instead they POST /api/events/ticket/ and open the stream with ?ticket=.
+# A ticket is signed (the web and events servers only share SECRET_KEY),
+# opens only the event stream, is valid for EVENTS_TICKET_SECONDS and is
+# redeemed once. It carries the expiry of the access token it was issued
+# for, so the stream still ends with that token.
+TICKET_SALT = 'procure_to_pay.events.ticket'
+
+
+def issue_ticket(user, expires_at):
+    """Signed one-time ticket opening the event stream of user until expires_at (epoch seconds)"""
+    return signing.dumps({'u': user.pk, 'e': int(expires_at), 'n': secrets.token_urlsafe(16)}, salt=TICKET_SALT)
+
+
+def _redeem_ticket(ticket):
+    """(user, expiry) for a valid unused ticket, else (None, None)"""
+    try:
+        data = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.EVENTS_TICKET_SECONDS)
+    except signing.BadSignature:
+        return None, None
+    try:
+        # add() is atomic: a replayed ticket finds its nonce taken
+        if not cache.add(f'events:ticket:{data["n"]}', 1, settings.EVENTS_TICKET_SECONDS):
+            return None, None
+        user = get_user_model().objects.filter(pk=data['u'], is_active=True).first()
+    finally:
+        close_old_connections()
+    return (user, data['e']) if user else (None, None)
+
+
+def _load_user(authentication, token):
+    try:
+        return authentication.get_user(token)
+    finally:
+        close_old_connections()
+
+
+async def authenticate(headers, query):
+    """(user, expiry) from a Bearer header or a ?ticket= stream ticket"""
+    header = headers.get(b'authorization')
+    if not header:
+        ticket = query.get('ticket', [''])[0]
+        return await sync_to_async(_redeem_ticket)(ticket) if ticket else (None, None)
+    authentication = JWTAuthentication()
+    raw = authentication.get_raw_token(header)
+    if not raw:
+        return None, None
+    try:
+        token = authentication.get_validated_token(raw)
+        user = await sync_to_async(_load_user)(authentication, token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None, None
+    return (user, token['exp']) if user.is_active else (None, None)
+
+
+def cors_headers(origin):
+    if not origin:
+        return []
+    if settings.CORS_ALLOW_ALL_ORIGINS or origin.decode('latin1') in settings.CORS_ALLOWED_ORIGINS:
+        headers = [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+        if settings.CORS_ALLOW_CREDENTIALS:
+            headers.append((b'access-control-allow-credentials', b'true'))
+        return headers
+    return []
+
+
+class EventStreamApp:
+    """ASGI app serving ``path`` as a Server-Sent Events stream; everything else goes to Django.
+
+    Streams bypass Django's request cycle: an idle one is a coroutine
+    waiting on its queue plus a task watching for the client to disconnect,
+    which Django 4.2 does not report to streaming responses. A stream ends
+    when the client leaves, falls too far behind, or its access token
+    expires (the client then reconnects with a fresh ticket).
+    """
+
+    def __init__(self, application, path='/api/events/'):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            return await self.application(scope, receive, send)
+
+        headers = dict(scope['headers'])
+        cors = cors_headers(headers.get(b'origin'))
+        if scope['method'] != 'GET':
+            return await self.reply(send, 405, {'error': 'Method not allowed'}, cors)
+        user, expires_at = await authenticate(headers, parse_qs(scope['query_string'].decode('latin1')))
+        if user is None:
+            return await self.reply(
+                send, 401, {'error': 'Authentication credentials were not provided or are invalid'}, cors
+            )
+
+        get_broker().start()
+        subscription = hub.subscribe([f'user:{user.id}', f'role:{user.role}'])
+        disconnected = asyncio.Event()
+        watcher = asyncio.ensure_future(self.watch_disconnect(receive, subscription, disconnected))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Stop nginx-style proxies from buffering the stream
+                (b'x-accel-buffering', b'no'),
+            ] + cors})
+            # Sets the client's reconnect delay and flushes the headers right away
+            await self.write(send, f'retry: {settings.EVENTS_RETRY_MS}\n\n')
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    break
+                message = await subscription.get(min(settings.EVENTS_HEARTBEAT_SECONDS, remaining))
+                if message is None:
+                    break
+                # Empty comments keep proxies from closing idle connections
+                await self.write(send, message or ': keepalive\n\n')
+            if not disconnected.is_set():
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            watcher.cancel()
+            hub.unsubscribe(subscription)
+
+    @staticmethod
+    async def watch_disconnect(receive, subscription, disconnected):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        subscription.deliver(None)
+
+    @staticmethod
+    async def write(send, text):
+        await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+
+    @staticmethod
+    async def reply(send, status, data, headers):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')] + headers})
+        await send({'type': 'http.response.body', 'body': json.dumps(data).encode()})
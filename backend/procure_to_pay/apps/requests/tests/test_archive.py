@@ -0,0 +1,117 @@
+import os
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from decimal import Decimal
+from rest_framework.test import APIClient
+from ..archive import archive_requests
+from ..models import Approval, ArchivedRequest, PurchaseRequest, RequestDailyRollup, RequestDeletion, RequestItem
+from ..rollups import rebuild_rollups
+from ...finance.models import ComplianceAlert
+
+User = get_user_model()
+
+def create_user(name, role):
+    return User.objects.create_user(username=name, email=f'{name}@example.com', password='test123', role=role)
+
+@override_settings(ARCHIVE_AFTER_DAYS=90, ARCHIVE_BATCH_SIZE=2)
+class ArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = create_user('archive_staff', 'staff')
+        self.other_staff = create_user('archive_other', 'staff')
+        self.approver = create_user('archive_approver', 'approver_level_1')
+        self.client = APIClient()
+        self.content = os.urandom(3000)
+
+    def create(self, status='approved', days_old=200, **fields):
+        request = PurchaseRequest.objects.create(
+            title='Archived candidate', description='Test description', amount=Decimal('100.00'),
+            created_by=self.staff_user, **fields
+        )
+        PurchaseRequest.objects.filter(pk=request.pk).update(
+            status=status, updated_at=timezone.now() - timedelta(days=days_old)
+        )
+        return request
+
+    def rollups(self):
+        return sorted(RequestDailyRollup.objects.values_list('status', 'request_count', 'total_amount'))
+
+    def test_moves_only_old_closed_requests(self):
+        """Test old approved/rejected requests move in batches; pending, recent and alerted ones stay"""
+        old = [self.create(), self.create(), self.create(status='rejected')]
+        kept = [
+            self.create(status='pending'),
+            self.create(days_old=10),
+            self.create(),
+        ]
+        ComplianceAlert.objects.create(alert_type='high_value', title='Alert', description='Check', request=kept[2])
+        rebuild_rollups()
+        before = self.rollups()
+
+        self.assertEqual(archive_requests(), 3)
+        self.assertEqual(set(ArchivedRequest.objects.values_list('id', flat=True)), {r.id for r in old})
+        self.assertEqual(set(PurchaseRequest.objects.values_list('id', flat=True)), {r.id for r in kept})
+        self.assertEqual(set(RequestDeletion.objects.values_list('request_id', flat=True)), {r.id for r in old})
+        # Dashboards still count them, incrementally and after a rebuild
+        self.assertEqual(self.rollups(), before)
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), before)
+        self.assertEqual(archive_requests(), 0)
+
+    def test_detail_and_downloads_read_the_archive(self):
+        """Test an archived request keeps its detail, items, approvals and documents"""
+        request = self.create(proforma_content=self.content, proforma_filename='quote.pdf',
+                              proforma_content_type='application/pdf')
+        RequestItem.objects.create(request=request, name='Chair', quantity=2, unit_price=Decimal('50.00'),
+                                   total_price=Decimal('100.00'))
+        Approval.objects.create(request=request, approver=self.approver, approved=True, comments='ok')
+        PurchaseRequest.objects.filter(pk=request.pk).update(updated_at=timezone.now() - timedelta(days=200))
+        self.client.force_authenticate(user=self.staff_user)
+        live = self.client.get(f'/api/requests/{request.id}/').data
+        archive_requests()
+
+        response = self.client.get(f'/api/requests/{request.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('archived_at', response.data)
+        for field in ('title', 'amount', 'status', 'items', 'approvals', 'proforma_filename'):
+            self.assertEqual(response.data[field], live[field])
+
+        response = self.client.get(f'/api/requests/{request.id}/download/proforma/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        response = self.client.get('/api/requests/archived/')
+        self.assertEqual([row['id'] for row in response.data['results']], [request.id])
+        self.assertEqual(self.client.patch(f'/api/requests/{request.id}/', {'title': 'x'}).status_code, 404)
+
+    def test_archive_is_scoped_like_the_list(self):
+        """Test staff cannot read other people's archived requests"""
+        request = self.create()
+        archive_requests()
+        self.client.force_authenticate(user=self.other_staff)
+        self.assertEqual(self.client.get(f'/api/requests/{request.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/requests/archived/').data['results'], [])
+        self.client.force_authenticate(user=self.approver)
+        self.assertEqual(self.client.get(f'/api/requests/{request.id}/').status_code, 200)
+
+    def test_known_dependents(self):
+        """Test nothing new points at PurchaseRequest: archive_batch's delete would cascade to it"""
+        dependents = {relation.related_model._meta.label for relation in PurchaseRequest._meta.related_objects}
+        # Items and approvals move into the snapshot; alerted requests are never archived
+        self.assertEqual(dependents, {'requests.RequestItem', 'requests.Approval', 'finance.ComplianceAlert'})
+
+    def test_command(self):
+        """Test archive_requests honours --older-than and --limit"""
+        for _ in range(3):
+            self.create(days_old=40)
+        out = StringIO()
+        call_command('archive_requests', stdout=out)
+        self.assertIn('0 requests archived', out.getvalue())
+        call_command('archive_requests', '--older-than', '30', '--limit', '2', stdout=out)
+        self.assertIn('2 requests archived', out.getvalue())
+        self.assertEqual(ArchivedRequest.objects.count(), 2)
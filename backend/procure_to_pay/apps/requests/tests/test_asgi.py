@@ -0,0 +1,50 @@
+import asyncio
+import json
+import threading
+from django.core.signals import request_finished
+from django.test import SimpleTestCase
+from procure_to_pay.asgi import application
+
+def call(path):
+    """Run one GET through the ASGI application; returns (status, JSON body)"""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'localhost')], 'server': ('localhost', 80), 'client': ('127.0.0.1', 5000),
+    }
+    asyncio.run(application(scope, receive, send))
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return messages[0]['status'], json.loads(body)
+
+class AsgiApplicationTest(SimpleTestCase):
+    def setUp(self):
+        self.finished = []
+        request_finished.connect(self.record_finished)
+        self.addCleanup(request_finished.disconnect, self.record_finished)
+
+    def record_finished(self, **kwargs):
+        self.finished.append(threading.current_thread().name)
+
+    def test_api_runs_on_worker_threads(self):
+        """Test ordinary requests run through WSGI on the thread pool and are closed there"""
+        status, data = call('/')
+        self.assertEqual(status, 200)
+        self.assertIn('endpoints', data)
+        self.assertEqual(len(self.finished), 1)
+        self.assertTrue(self.finished[0].startswith('wsgi'))
+
+    def test_async_paths_use_the_asgi_handler(self):
+        """Test ASGI_ASYNC_PATHS are served by Django's ASGI handler"""
+        status, data = call('/health/')
+        self.assertEqual(status, 200)
+        self.assertEqual(data['status'], 'healthy')
+        self.assertEqual(len(self.finished), 1)
+        self.assertFalse(self.finished[0].startswith('wsgi'))
@@ -0,0 +1,106 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from decimal import Decimal
+from ..cache import RequestCache
+from ..models import PurchaseRequest, Approval, RequestItem
+
+User = get_user_model()
+
+class RequestCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.other_staff = User.objects.create_user(
+            username='staff2', email='staff2@example.com', password='test123', role='staff'
+        )
+        self.approver = User.objects.create_user(
+            username='approver1', email='approver1@example.com', password='test123',
+            role='approver_level_1'
+        )
+        self.request = PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=self.staff_user
+        )
+
+    def test_repeated_list_is_served_from_cache(self):
+        """Test a second identical list request runs no queries"""
+        self.client.force_authenticate(user=self.approver)
+        first = self.client.get('/api/requests/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/requests/')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(RequestCache.stats()['hits'], 1)
+        self.assertEqual(RequestCache.stats()['misses'], 1)
+
+    def test_query_params_are_part_of_the_key(self):
+        """Test different filters are cached separately"""
+        self.client.force_authenticate(user=self.approver)
+        self.client.get('/api/requests/')
+        response = self.client.get('/api/requests/', {'fields': 'title'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+    def test_approval_invalidates_list_and_detail(self):
+        """Test saving an Approval bumps the generations the request is cached under"""
+        self.client.force_authenticate(user=self.staff_user)
+        self.client.get('/api/requests/')
+        self.client.get(f'/api/requests/{self.request.id}/')
+
+        Approval.objects.create(request=self.request, approver=self.approver, approved=True)
+
+        response = self.client.get('/api/requests/')
+        self.assertEqual(len(response.data['results'][0]['approvals']), 1)
+        response = self.client.get(f'/api/requests/{self.request.id}/')
+        self.assertEqual(len(response.data['approvals']), 1)
+
+    def test_item_change_invalidates_approver_scope(self):
+        """Test saving a RequestItem invalidates the role scopes too"""
+        self.client.force_authenticate(user=self.approver)
+        self.client.get(f'/api/requests/{self.request.id}/')
+        RequestItem.objects.create(
+            request=self.request, name='Chair', quantity=1, unit_price=Decimal('10.00')
+        )
+        response = self.client.get(f'/api/requests/{self.request.id}/')
+        self.assertEqual(len(response.data['items']), 1)
+
+    def test_other_users_scope_is_untouched(self):
+        """Test a change to one user's request leaves other staff caches valid"""
+        other_scope = RequestCache.scope_for(self.other_staff)
+        own_scope = RequestCache.scope_for(self.staff_user)
+        other_before = RequestCache.get_generation(other_scope)
+        own_before = RequestCache.get_generation(own_scope)
+        self.request.title = 'Renamed'
+        self.request.save()
+        self.assertEqual(RequestCache.get_generation(other_scope), other_before)
+        self.assertNotEqual(RequestCache.get_generation(own_scope), own_before)
+
+    def test_cache_stats_are_restricted(self):
+        """Test only finance and admin users can read the global cache counters"""
+        self.client.force_authenticate(user=self.staff_user)
+        self.assertEqual(self.client.get('/api/requests/cache-stats/').status_code, 403)
+        finance = User.objects.create_user(
+            username='finance1', email='finance1@example.com', password='test123', role='finance'
+        )
+        self.client.force_authenticate(user=finance)
+        response = self.client.get('/api/requests/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hits', response.data)
+
+    def test_dashboard_is_cached(self):
+        """Test dashboard statistics are cached and refreshed on change"""
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get('/api/requests/dashboard-stats/')
+        self.assertEqual(response.data['status_counts']['pending'], 1)
+        with self.assertNumQueries(0):
+            self.client.get('/api/requests/dashboard-stats/')
+
+        self.request.status = 'approved'
+        self.request.save()
+        response = self.client.get('/api/requests/dashboard-stats/')
+        self.assertEqual(response.data['status_counts']['approved'], 1)
@@ -0,0 +1,124 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from rest_framework.test import APIClient
+from ..changes import encode_cursor, prune_tombstones
+from ..models import Approval, PurchaseRequest, RequestDeletion
+
+User = get_user_model()
+
+# No overlap window, so a poll right after a write does not read it again
+@override_settings(CHANGE_FEED_OVERLAP_SECONDS=0)
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.other_staff = User.objects.create_user(
+            username='staff2', email='staff2@example.com', password='test123', role='staff'
+        )
+        self.approver = User.objects.create_user(
+            username='approver1', email='approver1@example.com', password='test123', role='approver_level_1'
+        )
+        self.mine = [self.create(self.staff_user, f'Mine {i}') for i in range(3)]
+        self.theirs = self.create(self.other_staff, 'Theirs')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff_user)
+
+    def create(self, user, title):
+        return PurchaseRequest.objects.create(
+            title=title, description='Test description', amount=Decimal('100.00'), created_by=user
+        )
+
+    def poll(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/requests/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_initial_sync_pages_through_visible_requests(self):
+        """Test the initial sync returns the caller's requests page by page"""
+        first = self.poll(limit=2)
+        self.assertTrue(first['has_more'])
+        second = self.poll(first['next'], limit=2)
+        self.assertFalse(second['has_more'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted(request.id for request in self.mine))
+        self.assertEqual(first['deleted'] + second['deleted'], [])
+
+    def test_only_changes_since_cursor(self):
+        """Test a poll returns just the updated, created and deleted requests"""
+        RequestDeletion.objects.create(request_id=999, created_by_id=self.staff_user.id)
+        cursor = self.poll()['next']
+        self.assertEqual(self.poll(cursor)['results'], [])
+
+        updated = self.mine[0]
+        updated.title = 'Renamed'
+        updated.save()
+        Approval.objects.create(request=self.mine[1], approver=self.approver, approved=True)
+        created = self.create(self.staff_user, 'New one')
+        deleted_id = self.mine[2].id
+        self.mine[2].delete()
+        self.theirs.delete()
+
+        with self.assertNumQueries(2):
+            # One keyset query for the requests, one for the tombstones
+            self.client.get('/api/requests/changes/', {'since': cursor, 'fields': 'id,title'})
+        data = self.poll(cursor)
+        self.assertEqual([row['id'] for row in data['results']], [updated.id, self.mine[1].id, created.id])
+        self.assertEqual(data['deleted'], [deleted_id])
+        self.assertEqual(self.poll(data['next'])['results'], [])
+
+    def test_bad_and_expired_cursors(self):
+        """Test malformed cursors are rejected and stale ones must resync"""
+        response = self.client.get('/api/requests/changes/', {'since': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        stale = encode_cursor({'t': None, 'pk': 0, 'd': 0}, issued_at=timezone.now() - timedelta(days=365))
+        response = self.client.get('/api/requests/changes/', {'since': stale})
+        self.assertEqual(response.status_code, 410)
+
+    def test_quiet_scope_cursor_stays_valid(self):
+        """Test a recently issued cursor works even when nothing changed for longer than the retention"""
+        PurchaseRequest.objects.filter(created_by=self.staff_user).update(
+            updated_at=timezone.now() - timedelta(days=365)
+        )
+        cursor = self.poll()['next']
+        data = self.poll(cursor)
+        self.assertEqual((data['results'], data['deleted']), ([], []))
+        self.assertEqual(self.poll(data['next'])['results'], [])
+
+    def test_prune_tombstones(self):
+        """Test tombstones past the retention window are pruned"""
+        old = RequestDeletion.objects.create(request_id=1, created_by_id=self.staff_user.id)
+        RequestDeletion.objects.filter(pk=old.pk).update(deleted_at=timezone.now() - timedelta(days=365))
+        RequestDeletion.objects.create(request_id=2, created_by_id=self.staff_user.id)
+        self.assertEqual(prune_tombstones(), 1)
+        self.assertEqual(list(RequestDeletion.objects.values_list('request_id', flat=True)), [2])
+
+    @override_settings(CHANGE_FEED_OVERLAP_SECONDS=60)
+    def test_late_commits_are_not_skipped(self):
+        """Test a write that becomes visible after a later-stamped one was read still reaches the client"""
+        PurchaseRequest.objects.filter(created_by=self.staff_user).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        first = self.poll(limit=2)
+        self.assertTrue(first['has_more'])
+        cursor = self.poll(first['next'], limit=2)['next']
+        recent = self.create(self.staff_user, 'Recent')
+        data = self.poll(cursor)
+        self.assertEqual([row['id'] for row in data['results']], [recent.id])
+        self.assertFalse(data['has_more'])
+
+        # Stamped before the row just read, but only committed now
+        late = self.mine[0]
+        PurchaseRequest.objects.filter(pk=late.pk).update(updated_at=timezone.now() - timedelta(seconds=30))
+        tombstone = RequestDeletion.objects.create(request_id=999, created_by_id=self.staff_user.id)
+        data = self.poll(data['next'])
+        self.assertEqual([row['id'] for row in data['results']], [late.id, recent.id])
+        self.assertEqual(data['deleted'], [tombstone.request_id])
+        self.assertEqual(self.poll(data['next'])['deleted'], [tombstone.request_id])
@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from ..models import PurchaseRequest, Approval
+
+User = get_user_model()
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.approver = User.objects.create_user(
+            username='approver1', email='approver1@example.com', password='test123',
+            role='approver_level_1'
+        )
+        self.request = PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=self.staff_user
+        )
+        self.client.force_authenticate(user=self.staff_user)
+
+    def test_list_not_modified(self):
+        """Test an unchanged list answers 304 with validators and no body"""
+        response = self.client.get('/api/requests/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        cache.clear()
+        # Only the validator aggregate runs; nothing is serialized
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/requests/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since is honoured on details"""
+        url = f'/api/requests/{self.request.id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_approval_changes_validators(self):
+        """Test an approval moves the parent's updated_at and so its ETag"""
+        url = f'/api/requests/{self.request.id}/'
+        etag = self.client.get(url)['ETag']
+        Approval.objects.create(request=self.request, approver=self.approver, approved=True)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['approvals']), 1)
+
+    def test_deletion_changes_list_validator(self):
+        """Test removing a row changes the list ETag through the count"""
+        other = PurchaseRequest.objects.create(
+            title='Other', description='Other', amount=Decimal('5.00'), created_by=self.staff_user
+        )
+        self.request.save()
+        etag = self.client.get('/api/requests/')['ETag']
+        other.delete()
+        response = self.client.get('/api/requests/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_representation_is_part_of_validator(self):
+        """Test different sparse fieldsets do not share an ETag"""
+        full = self.client.get('/api/requests/')['ETag']
+        sparse = self.client.get('/api/requests/', {'fields': 'title'})['ETag']
+        self.assertNotEqual(full, sparse)
+
+    def test_missing_detail_is_404(self):
+        """Test details outside the user's scope still 404"""
+        other_staff = User.objects.create_user(
+            username='staff2', email='staff2@example.com', password='test123', role='staff'
+        )
+        self.client.force_authenticate(user=other_staff)
+        response = self.client.get(f'/api/requests/{self.request.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
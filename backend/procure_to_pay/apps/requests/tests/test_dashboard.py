@@ -0,0 +1,99 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from ..dashboard import DashboardCache, build_dashboard_stats
+from ..models import PurchaseRequest
+from ..rollups import rebuild_rollups
+from ....utils.db_router import REPLICA
+
+User = get_user_model()
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.finance_user = User.objects.create_user(
+            username='finance1', email='finance1@example.com', password='test123', role='finance'
+        )
+        self.current = self.create(Decimal('300.00'))
+        self.create(Decimal('200.00'), status='approved')
+        old = self.create(Decimal('100.00'))
+        month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        PurchaseRequest.objects.filter(pk=old.pk).update(created_at=month_start - timedelta(days=3))
+        # .update() bypasses the signals that maintain the rollups
+        rebuild_rollups()
+
+    def create(self, amount, status='pending'):
+        return PurchaseRequest.objects.create(
+            title='Request', description='Test description', amount=amount,
+            created_by=self.staff_user, status=status
+        )
+
+    def test_figures_in_two_queries(self):
+        """Test the aggregate and the recent list are the only queries"""
+        with self.assertNumQueries(2):
+            stats = build_dashboard_stats(self.staff_user)
+        self.assertEqual(stats['current_month']['requests_count'], 2)
+        self.assertEqual(Decimal(stats['current_month']['total_amount']), Decimal('500.00'))
+        self.assertEqual(stats['last_month']['requests_count'], 1)
+        self.assertEqual(stats['growth']['requests_growth'], 100.0)
+        self.assertEqual(stats['growth']['amount_growth'], 400.0)
+        self.assertEqual(stats['status_counts'], {'pending': 2, 'approved': 1, 'rejected': 0})
+        self.assertEqual(len(stats['recent_requests']), 3)
+
+    def test_fresh_entry_is_reused(self):
+        """Test a fresh entry is served without touching the database"""
+        DashboardCache.get(self.finance_user)
+        with self.assertNumQueries(0):
+            DashboardCache.get(self.finance_user)
+
+    def test_stale_entry_served_while_rebuild_in_flight(self):
+        """Test concurrent loads after invalidation get the stale copy, not a rebuild"""
+        before = DashboardCache.get(self.finance_user)
+        self.current.status = 'rejected'
+        self.current.save()
+
+        # Another worker holds the rebuild lock
+        cache.add(f"{DashboardCache.PREFIX}:dashboard:role:finance:lock", 1)
+        with self.assertNumQueries(0):
+            stale = DashboardCache.get(self.finance_user)
+        self.assertEqual(stale, before)
+
+        cache.delete(f"{DashboardCache.PREFIX}:dashboard:role:finance:lock")
+        fresh = DashboardCache.get(self.finance_user)
+        self.assertEqual(fresh['status_counts']['rejected'], 1)
+
+    def test_cold_cache_waits_for_rebuild(self):
+        """Test a cold load waits for the in-flight rebuild instead of duplicating it"""
+        cache.add(f"{DashboardCache.PREFIX}:dashboard:role:finance:lock", 1)
+        builder = mock.Mock(return_value={'built': True})
+        with mock.patch.object(DashboardCache, 'WAIT_TIMEOUT', 0.1):
+            self.assertEqual(DashboardCache.get(self.finance_user, builder=builder), {'built': True})
+        builder.assert_called_once_with(self.finance_user)
+
+    @mock.patch('procure_to_pay.apps.requests.dashboard.replica_configured', return_value=True)
+    def test_pinned_users_skip_replica_built_entries(self, replica_configured):
+        """Test a writer pinned to the primary is never served an entry built from the replica"""
+        # TestCase runs inside a transaction, which the router keeps on the primary
+        with mock.patch('procure_to_pay.apps.requests.dashboard.current_read_alias', return_value=REPLICA):
+            DashboardCache.get(self.finance_user, builder=mock.Mock(return_value={'from': 'replica'}))
+        self.assertEqual(DashboardCache.get(self.finance_user), {'from': 'replica'})
+
+        with mock.patch('procure_to_pay.apps.requests.dashboard.is_pinned', return_value=True):
+            primary = mock.Mock(return_value={'from': 'primary'})
+            self.assertEqual(DashboardCache.get(self.finance_user, builder=primary), {'from': 'primary'})
+            self.assertEqual(DashboardCache.get(self.finance_user, builder=primary), {'from': 'primary'})
+            primary.assert_called_once_with(self.finance_user)
+
+            # Nor a stale copy while someone else rebuilds
+            self.current.status = 'rejected'
+            self.current.save()
+            cache.add(f"{DashboardCache.PREFIX}:dashboard:role:finance:lock", 1)
+            fresh = DashboardCache.get(self.finance_user)
+        self.assertEqual(fresh['status_counts']['rejected'], 1)
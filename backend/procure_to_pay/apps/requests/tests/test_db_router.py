@@ -0,0 +1,99 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, router
+from unittest import mock
+from rest_framework.test import APIClient
+from ..models import PurchaseRequest
+from ....utils import db_router
+from ....utils.db_router import is_pinned, pin_to_primary, read_alias, reading_from
+
+User = get_user_model()
+
+class ReplicaRouterTest(SimpleTestCase):
+    def test_reads_follow_the_context(self):
+        """Test reads go to the replica only inside reading_from, and writes never do"""
+        self.assertEqual(PurchaseRequest.objects.all().db, 'default')
+        with reading_from('replica'):
+            self.assertEqual(PurchaseRequest.objects.all().db, 'replica')
+            replica_row = PurchaseRequest(pk=1)
+            replica_row._state.db = 'replica'
+            self.assertEqual(router.db_for_write(PurchaseRequest, instance=replica_row), 'default')
+        self.assertEqual(PurchaseRequest.objects.all().db, 'default')
+
+    def test_no_migrations_on_the_replica(self):
+        self.assertFalse(router.allow_migrate('replica', 'requests'))
+        self.assertTrue(router.allow_migrate('default', 'requests'))
+
+# Routing decisions only: no query in these tests opens a replica connection
+@override_settings(REPLICA_MAX_LAG_SECONDS=5, REPLICA_LAG_CHECK_SECONDS=60)
+@mock.patch.object(db_router, 'replica_configured', return_value=True)
+@mock.patch.dict(db_router._health, {'checked_at': None, 'ready': False})
+class ReadAliasTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username='router_staff', email='router_staff@example.com', password='test123', role='staff'
+        )
+
+    @mock.patch.object(db_router, 'replica_lag', return_value=1.0)
+    def test_lag_guard(self, replica_lag, replica_configured):
+        """Test the replica is used while close enough behind, and the lag is checked once per interval"""
+        self.assertEqual(read_alias(), 'replica')
+        self.assertEqual(read_alias(), 'replica')
+        self.assertEqual(replica_lag.call_count, 1)
+
+        db_router._health['checked_at'] = None
+        replica_lag.return_value = 30.0
+        with self.assertLogs('procure_to_pay.utils.db_router', 'WARNING'):
+            self.assertEqual(read_alias(), 'default')
+
+        db_router._health['checked_at'] = None
+        replica_lag.side_effect = DatabaseError('connection refused')
+        with self.assertLogs('procure_to_pay.utils.db_router', 'WARNING'):
+            self.assertEqual(read_alias(), 'default')
+
+    @mock.patch.object(db_router, 'replica_lag', return_value=0.0)
+    def test_writers_are_pinned_to_the_primary(self, replica_lag, replica_configured):
+        """Test a successful write keeps the user on the primary for a while"""
+        client = APIClient()
+        client.force_authenticate(user=self.staff_user)
+        client.get('/api/requests/')
+        self.assertFalse(is_pinned(self.staff_user.id))
+        self.assertEqual(read_alias(self.staff_user), 'replica')
+
+        response = client.post('/api/requests/', {
+            'title': 'Chairs', 'description': 'Office chairs', 'amount': '120.00'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_pinned(self.staff_user.id))
+        self.assertEqual(read_alias(self.staff_user), 'default')
+        self.assertEqual(read_alias(), 'replica')
+
+    @mock.patch.object(db_router, 'replica_lag', return_value=0.0)
+    def test_replica_actions(self, replica_lag, replica_configured):
+        """Test only the listed read-only actions run in the replica context"""
+        aliases = []
+
+        def dashboard(user, *args, **kwargs):
+            aliases.append(db_router._read_alias.get())
+            return {}
+
+        client = APIClient()
+        client.force_authenticate(user=self.staff_user)
+        with mock.patch('procure_to_pay.apps.requests.views.DashboardCache.get', side_effect=dashboard):
+            client.get('/api/requests/dashboard-stats/')
+            pin_to_primary(self.staff_user.id)
+            client.get('/api/requests/dashboard-stats/')
+        self.assertEqual(aliases, ['replica', 'default'])
+        self.assertIsNone(db_router._read_alias.get())
+
+    def test_no_replica_configured(self, replica_configured):
+        """Test everything stays on default, and nobody is pinned, without a replica"""
+        replica_configured.return_value = False
+        client = APIClient()
+        client.force_authenticate(user=self.staff_user)
+        client.post('/api/requests/', {'title': 'Desk', 'description': 'Standing desk', 'amount': '300.00'},
+                    format='json')
+        self.assertFalse(is_pinned(self.staff_user.id))
+        self.assertEqual(read_alias(self.staff_user), 'default')
@@ -0,0 +1,159 @@
+import os
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework import status
+from decimal import Decimal
+from ..models import PurchaseRequest
+from ...documents.codecs import read_header
+from ...documents.downloads import DocumentSource, serve_document
+
+User = get_user_model()
+
+@override_settings(DOCUMENT_STREAM_CHUNK_SIZE=1024)
+class DocumentDownloadTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.content = bytes(range(256)) * 20
+        self.request = PurchaseRequest.objects.create(
+            title='Test Request',
+            description='Test description',
+            amount=Decimal('100.00'),
+            created_by=self.staff_user,
+            proforma_content=self.content,
+            proforma_filename='quote.pdf',
+            proforma_content_type='application/pdf'
+        )
+        self.url = f'/api/requests/{self.request.id}/download/proforma/'
+        self.client.force_authenticate(user=self.staff_user)
+
+    def test_full_download_is_streamed(self):
+        """Test documents are streamed in chunks with validators"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('quote.pdf', response['Content-Disposition'])
+
+    def test_byte_range(self):
+        """Test a Range request returns only the requested bytes"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-2099')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.content[1000:2100])
+        self.assertEqual(response['Content-Range'], f'bytes 1000-2099/{len(self.content)}')
+
+    def test_suffix_range(self):
+        """Test a suffix Range returns the tail of the document"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-100')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.content[-100:])
+
+    def test_unsatisfiable_range(self):
+        """Test a Range past the end of the document is rejected"""
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_if_none_match(self):
+        """Test an unchanged document answers 304"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_stale_if_range_returns_full_document(self):
+        """Test a Range is ignored when If-Range no longer matches"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_missing_document(self):
+        """Test downloading a document that was never uploaded"""
+        response = self.client.get(f'/api/requests/{self.request.id}/download/receipt/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_compressed_document_range(self):
+        """Test compressed blobs are decoded transparently, including ranges"""
+        text = b'Office chair, 2, 75000\n' * 400
+        self.request.receipt_content = text
+        self.request.receipt_content_type = 'text/csv'
+        self.request.save()
+        stored = PurchaseRequest.objects.values_list('receipt_content', flat=True).get(pk=self.request.pk)
+        self.assertIsNotNone(read_header(stored))
+
+        url = f'/api/requests/{self.request.id}/download/receipt/'
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Length'], str(len(text)))
+        self.assertEqual(b''.join(response.streaming_content), text)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=3000-4999')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), text[3000:5000])
+
+    def test_asgi_download_streams_asynchronously(self):
+        """Test ASGI downloads read stored chunks through an async iterator instead of buffering them"""
+        content = os.urandom(5000)
+        self.request.receipt_content = content
+        self.request.save()
+        stored = PurchaseRequest.objects.values_list('receipt_content', flat=True).get(pk=self.request.pk)
+        self.assertIsNone(read_header(stored))
+        token = AccessToken.for_user(self.staff_user)
+
+        async def download():
+            response = await AsyncClient().get(f'/api/requests/{self.request.id}/download/receipt/', headers={
+                'Authorization': f'Bearer {token}', 'Range': 'bytes=1000-3099'
+            })
+            return response, [chunk async for chunk in response.streaming_content]
+
+        response, chunks = async_to_sync(download)()
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response.is_async)
+        self.assertEqual([len(chunk) for chunk in chunks], [1024, 1024, 52])
+        self.assertEqual(b''.join(chunks), content[1000:3100])
+
+
+class DiskSource(DocumentSource):
+    def __init__(self, path, content):
+        super().__init__(filename='quote.pdf', content_type='application/pdf', size=len(content))
+        self.path = path
+        self.content = content
+
+    def iter_range(self, start, end, chunk_size):
+        yield self.content[start:end + 1]
+
+    def sendfile_path(self):
+        return self.path
+
+
+@override_settings(
+    MEDIA_ROOT='/srv/media', DOCUMENT_SENDFILE_BACKEND='nginx', DOCUMENT_SENDFILE_PREFIX='/protected-media/'
+)
+class SendfileTest(SimpleTestCase):
+    def serve(self, path):
+        return serve_document(RequestFactory().get('/'), DiskSource(path, b'%PDF-1.4'))
+
+    def test_source_must_implement_iter_range(self):
+        """Test a source without iter_range cannot be created"""
+        with self.assertRaises(TypeError):
+            DocumentSource(filename='quote.pdf', content_type='application/pdf', size=0)
+
+    def test_file_under_media_root_is_handed_to_proxy(self):
+        """Test files inside MEDIA_ROOT are served through X-Accel-Redirect"""
+        response = self.serve('/srv/media/documents/quote.pdf')
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/documents/quote.pdf')
+
+    def test_file_outside_media_root_is_streamed(self):
+        """Test files outside MEDIA_ROOT are streamed instead of redirected to a ../ path"""
+        response = self.serve('/srv/other/quote.pdf')
+        self.assertTrue(response.streaming)
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core import signing
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ..events import EventHub, hub, publish
+from ..models import PurchaseRequest
+from ..reviews import review_requests
+from ..streams import TICKET_SALT, EventStreamApp, issue_ticket
+from ..workflow import decide
+
+User = get_user_model()
+
+def create_user(name, role):
+    return User.objects.create_user(username=name, email=f'{name}@example.com', password='test123', role=role)
+
+class EventHubTest(TestCase):
+    def test_fan_out(self):
+        """Test an event reaches every subscription of its channels exactly once"""
+        async def scenario():
+            events = EventHub()
+            owner = events.subscribe(['user:1', 'role:staff'])
+            finance = events.subscribe(['user:2', 'role:finance'])
+            other = events.subscribe(['user:3', 'role:approver_level_1'])
+            delivered = events.dispatch({
+                'type': 'request.po_ready', 'channels': ['user:1', 'role:staff', 'role:finance'],
+                'data': {'id': 7},
+            })
+            messages = [await owner.get(1), await finance.get(1), await other.get(0.01)]
+            events.unsubscribe(owner)
+            return delivered, messages, len(events)
+
+        delivered, messages, remaining = asyncio.run(scenario())
+        self.assertEqual(delivered, 2)
+        self.assertEqual(messages[0], 'event: request.po_ready\ndata: {"id":7}\n\n')
+        self.assertEqual(messages[1], messages[0])
+        self.assertEqual(messages[2], '')
+        self.assertEqual(remaining, 2)
+
+    @override_settings(EVENTS_QUEUE_SIZE=2)
+    def test_slow_subscriber_is_closed(self):
+        """Test a subscription that falls too far behind is told to end its stream"""
+        async def scenario():
+            events = EventHub()
+            subscription = events.subscribe(['user:1'])
+            for position in range(3):
+                events.dispatch({'type': 'request.approved', 'channels': ['user:1'], 'data': {'id': position}})
+            await asyncio.sleep(0)
+            return await subscription.get(1)
+
+        self.assertIsNone(asyncio.run(scenario()))
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+@mock.patch('procure_to_pay.apps.requests.workflow.generate_purchase_order')
+@mock.patch('procure_to_pay.apps.requests.events.get_broker')
+class PublishTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = create_user('events_staff', 'staff')
+        self.approver1 = create_user('events_approver1', 'approver_level_1')
+        self.approver2 = create_user('events_approver2', 'approver_level_2')
+        self.request = PurchaseRequest.objects.create(
+            title='Request', description='Test description', amount=Decimal('100.00'), created_by=self.staff_user
+        )
+
+    def published(self, get_broker):
+        return [call.args[0] for call in get_broker.return_value.publish.call_args_list]
+
+    def test_decision_events(self, get_broker, generate_purchase_order):
+        """Test only final decisions are published, after commit, to the requester and followers"""
+        with self.captureOnCommitCallbacks(execute=True):
+            decide(self.request.id, self.approver1, True)
+        self.assertEqual(self.published(get_broker), [])
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            decide(self.request.id, self.approver2, True)
+        self.assertEqual(self.published(get_broker), [])
+        for callback in callbacks:
+            callback()
+        [event] = self.published(get_broker)
+        self.assertEqual(event['type'], 'request.approved')
+        self.assertEqual(event['data']['id'], self.request.id)
+        self.assertEqual(event['data']['status'], 'approved')
+        self.assertEqual(event['channels'], [
+            f'user:{self.staff_user.id}', 'role:approver_level_1', 'role:approver_level_2', 'role:finance'
+        ])
+
+    def test_bulk_review_events(self, get_broker, generate_purchase_order):
+        """Test bulk rejections publish one event per request"""
+        other = PurchaseRequest.objects.create(
+            title='Other', description='Test description', amount=Decimal('5.00'), created_by=self.staff_user
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            review_requests(self.approver1, [(self.request.id, False, ''), (other.id, False, '')])
+        events = self.published(get_broker)
+        self.assertEqual({event['data']['id'] for event in events}, {self.request.id, other.id})
+        self.assertEqual({event['type'] for event in events}, {'request.rejected'})
+
+    def test_broker_failure_is_swallowed(self, get_broker, generate_purchase_order):
+        """Test a broken broker never fails the write being announced"""
+        get_broker.return_value.publish.side_effect = ConnectionError
+        with self.assertLogs('procure_to_pay.apps.requests.events', 'ERROR'):
+            publish('request.po_ready', self.request.id, self.staff_user.id)
+
+class FakeConnection:
+    """ASGI receive/send pair that records what the app sends"""
+
+    def __init__(self):
+        self.sent = asyncio.Queue()
+        self.client_gone = asyncio.Event()
+
+    async def receive(self):
+        await self.client_gone.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        await self.sent.put(message)
+
+    async def next_body(self):
+        message = await asyncio.wait_for(self.sent.get(), 1)
+        return message['body'].decode()
+
+@override_settings(EVENTS_BROKER='procure_to_pay.apps.requests.events.LocalBroker',
+                   CORS_ALLOWED_ORIGINS=['http://localhost:3000'])
+# Streams close their database connections between lookups, which a
+# TestCase would take for leaving its transaction
+class EventStreamTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = create_user('stream_staff', 'staff')
+        self.ticket = issue_ticket(self.staff_user, time.time() + 60)
+        self.django_app = mock.AsyncMock()
+        self.app = EventStreamApp(self.django_app)
+
+    def scope(self, query=b'', path='/api/events/', headers=()):
+        return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+                'headers': [(b'origin', b'http://localhost:3000'), *headers]}
+
+    async def test_other_paths_go_to_django(self):
+        """Test only the events path is served by the stream app"""
+        connection = FakeConnection()
+        await self.app(self.scope(path='/api/requests/'), connection.receive, connection.send)
+        self.django_app.assert_awaited_once()
+
+    async def test_rejects_bad_ticket(self):
+        """Test streams need a valid ticket"""
+        connection = FakeConnection()
+        await self.app(self.scope(b'ticket=not-a-ticket'), connection.receive, connection.send)
+        start = connection.sent.get_nowait()
+        self.assertEqual(start['status'], 401)
+        self.assertIn((b'access-control-allow-origin', b'http://localhost:3000'), start['headers'])
+
+    async def test_rejects_token_in_query(self):
+        """Test access tokens are not accepted in the stream URL"""
+        token = AccessToken.for_user(self.staff_user)
+        connection = FakeConnection()
+        await self.app(self.scope(f'token={token}'.encode()), connection.receive, connection.send)
+        self.assertEqual(connection.sent.get_nowait()['status'], 401)
+
+    async def test_ticket_is_single_use(self):
+        """Test a replayed ticket is refused"""
+        first, second = FakeConnection(), FakeConnection()
+        first.client_gone.set()
+        await asyncio.wait_for(
+            self.app(self.scope(f'ticket={self.ticket}'.encode()), first.receive, first.send), 1
+        )
+        self.assertEqual(first.sent.get_nowait()['status'], 200)
+        await self.app(self.scope(f'ticket={self.ticket}'.encode()), second.receive, second.send)
+        self.assertEqual(second.sent.get_nowait()['status'], 401)
+
+    async def test_stream_delivers_events(self):
+        """Test a stream receives its user's events and unsubscribes when the client leaves"""
+        connection = FakeConnection()
+        task = asyncio.ensure_future(
+            self.app(self.scope(f'ticket={self.ticket}'.encode()), connection.receive, connection.send)
+        )
+        start = await asyncio.wait_for(connection.sent.get(), 1)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertTrue((await connection.next_body()).startswith('retry: '))
+
+        publish('request.po_ready', 1, self.staff_user.id + 1)
+        publish('request.approved', 42, self.staff_user.id, status='approved')
+        message = await connection.next_body()
+        self.assertTrue(message.startswith('event: request.approved\n'))
+        self.assertIn('"id":42', message)
+
+        connection.client_gone.set()
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(len(hub), 0)
+
+    async def test_stream_ends_when_token_expires(self):
+        """Test the stream closes at token expiry so the client reconnects with a fresh one"""
+        token = AccessToken.for_user(self.staff_user)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        connection = FakeConnection()
+        scope = self.scope(headers=[(b'authorization', f'Bearer {token}'.encode())])
+        await asyncio.wait_for(self.app(scope, connection.receive, connection.send), 3)
+        bodies = [connection.sent.get_nowait() for _ in range(connection.sent.qsize())]
+        self.assertEqual(bodies[0]['status'], 200)
+        self.assertEqual(bodies[-1], {'type': 'http.response.body', 'body': b'', 'more_body': False})
+        self.assertEqual(len(hub), 0)
+
+    async def test_ticket_stream_ends_with_its_token(self):
+        """Test a ticket's stream closes when the token it was issued for expires"""
+        ticket = issue_ticket(self.staff_user, time.time() + 1)
+        connection = FakeConnection()
+        await asyncio.wait_for(
+            self.app(self.scope(f'ticket={ticket}'.encode()), connection.receive, connection.send), 3
+        )
+        bodies = [connection.sent.get_nowait() for _ in range(connection.sent.qsize())]
+        self.assertEqual(bodies[0]['status'], 200)
+        self.assertEqual(bodies[-1], {'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+class EventTicketViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = create_user('ticket_staff', 'staff')
+
+    def test_ticket_carries_token_expiry(self):
+        """Test a ticket is issued for the caller and ends with their access token"""
+        token = AccessToken.for_user(self.staff_user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post('/api/events/ticket/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = signing.loads(response.data['ticket'], salt=TICKET_SALT)
+        self.assertEqual((data['u'], data['e']), (self.staff_user.pk, token['exp']))
+
+    def test_requires_authentication(self):
+        """Test anonymous callers get no ticket"""
+        response = self.client.post('/api/events/ticket/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
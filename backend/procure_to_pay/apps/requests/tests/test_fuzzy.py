@@ -0,0 +1,112 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from decimal import Decimal
+from unittest import mock
+from ..models import PurchaseRequest, RequestItem
+from .. import fuzzy
+from ..fuzzy import autocomplete, fuzzy_search_requests
+
+User = get_user_model()
+
+class FuzzySearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # A fresh in-process index, not one built over another test's rows
+        patcher = mock.patch.object(fuzzy, '_index', fuzzy.TrigramIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.other_staff = User.objects.create_user(
+            username='staff2', email='staff2@example.com', password='test123', role='staff'
+        )
+        self.approver = User.objects.create_user(
+            username='approver1', email='approver1@example.com', password='test123',
+            role='approver_level_1'
+        )
+        self.chairs = self.create('Office chairs', self.staff_user)
+        self.laptops = self.create(
+            'IT equipment', self.other_staff, proforma_data={'vendor': 'Kigali Computer Supplies'}
+        )
+        RequestItem.objects.create(
+            request=self.laptops, name='Laptop stand', quantity=4, unit_price=Decimal('20.00')
+        )
+
+    def create(self, title, user, **kwargs):
+        return PurchaseRequest.objects.create(
+            title=title, description='Test description', amount=Decimal('100.00'),
+            created_by=user, **kwargs
+        )
+
+    def search(self, text):
+        return list(fuzzy_search_requests(PurchaseRequest.objects.all(), text).values_list('id', flat=True))
+
+    def test_misspellings_match(self):
+        """Test misspelled titles, vendors and items still match"""
+        self.assertEqual(self.search('Ofice chair'), [self.chairs.id])
+        self.assertEqual(self.search('Kigal Computr'), [self.laptops.id])
+        self.assertEqual(self.search('labtop stand'), [self.laptops.id])
+        self.assertEqual(self.search('submarine'), [])
+
+    def test_index_follows_changes(self):
+        """Test the in-process index is rebuilt when rows change"""
+        self.assertEqual(self.search('whiteboard'), [])
+        board = self.create('Whiteboard markers', self.staff_user)
+        self.assertEqual(self.search('whitebord'), [board.id])
+
+    def test_autocomplete_respects_scope(self):
+        """Test staff only get suggestions from their own requests"""
+        suggestions, truncated = autocomplete(PurchaseRequest, 'lapto', created_by=self.staff_user.id)
+        self.assertEqual(suggestions, [])
+        self.assertFalse(truncated)
+        suggestions, _ = autocomplete(PurchaseRequest, 'lapto')
+        self.assertEqual(suggestions[0]['text'], 'Laptop stand')
+        self.assertEqual(suggestions[0]['kind'], 'item')
+        self.assertEqual(suggestions[0]['request_ids'], [self.laptops.id])
+
+    def test_unchanged_index_costs_no_queries(self):
+        """Test a search only reads the write generation when nothing changed"""
+        self.search('ofice')
+        with self.assertNumQueries(0):
+            autocomplete(PurchaseRequest, 'ofice')
+
+    def test_autocomplete_rebuilds_in_the_background(self):
+        """Test autocomplete serves the current index and leaves the rebuild to a background task"""
+        autocomplete(PurchaseRequest, 'ofice')
+        board = self.create('Whiteboard markers', self.staff_user)
+        with mock.patch.object(fuzzy, 'submit') as submit, self.assertNumQueries(0):
+            suggestions, _ = autocomplete(PurchaseRequest, 'whitebord')
+        self.assertEqual(suggestions, [])
+        submit.assert_called_once()
+        submit.call_args.args[0](*submit.call_args.args[1:])
+        suggestions, _ = autocomplete(PurchaseRequest, 'whitebord')
+        self.assertEqual(suggestions[0]['request_ids'], [board.id])
+
+    def test_candidate_cap_applies_after_visibility(self):
+        """Test others' better matches never crowd a staff user's own out of the candidates"""
+        self.create('Office chair', self.other_staff)
+        with mock.patch.object(fuzzy, 'MAX_CANDIDATES', 1):
+            own = fuzzy_search_requests(
+                PurchaseRequest.objects.filter(created_by=self.staff_user), 'office chair',
+                created_by=self.staff_user.id
+            )
+            self.assertEqual(list(own.values_list('id', flat=True)), [self.chairs.id])
+
+    @override_settings(AUTOCOMPLETE_BUDGET_MS=0)
+    def test_autocomplete_budget(self):
+        """Test an exhausted budget returns early and says so"""
+        suggestions, truncated = autocomplete(PurchaseRequest, 'ofice')
+        self.assertTrue(truncated)
+
+    def test_endpoints(self):
+        """Test ?q= fuzzy mode and the autocomplete endpoint"""
+        self.client.force_authenticate(user=self.approver)
+        response = self.client.get('/api/requests/', {'q': 'ofice chiars'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.chairs.id])
+        response = self.client.get('/api/requests/autocomplete/', {'q': 'kigli', 'limit': 3})
+        self.assertEqual(response.data['results'][0]['text'], 'Kigali Computer Supplies')
+        self.assertIn('took_ms', response.data)
@@ -0,0 +1,154 @@
+import io
+import json
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from datetime import date
+from decimal import Decimal
+from rest_framework.test import APIClient
+from ..importer import import_requests, iter_records, READ_SIZE
+from ..models import PurchaseRequest, RequestDailyRollup, RequestItem
+
+User = get_user_model()
+
+class ImportRequestsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.finance_user = User.objects.create_user(
+            username='finance1', email='finance1@example.com', password='test123', role='finance'
+        )
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff',
+            department='Operations'
+        )
+
+    def run_import(self, content, fmt, **kwargs):
+        return import_requests(io.BytesIO(content.encode()), fmt, self.finance_user, **kwargs)
+
+    def test_csv_groups_item_rows_by_ref(self):
+        """Test CSV rows sharing a ref become one request with several items"""
+        report = self.run_import(
+            'ref,title,description,amount,status,created_at,created_by,item_name,item_quantity,item_unit_price\n'
+            'A,Office chairs,Chairs for the new floor,300.00,approved,2024-03-05,staff1,Chair,2,150\n'
+            'A,,,,,,,Cushion,2,0.10\n'
+            'B,Printer paper,Paper,25.50,,,,,,\n',
+            'csv'
+        )
+        self.assertEqual(report, {'created': 2, 'failed': 0, 'errors': [], 'dry_run': False})
+        chairs = PurchaseRequest.objects.get(title='Office chairs')
+        self.assertEqual(chairs.created_by, self.staff_user)
+        self.assertEqual(chairs.department, 'Operations')
+        self.assertEqual(chairs.status, 'approved')
+        self.assertEqual(chairs.created_at.date(), date(2024, 3, 5))
+        self.assertEqual(sorted(chairs.items.values_list('name', 'total_price')),
+                         [('Chair', Decimal('300.00')), ('Cushion', Decimal('0.20'))])
+        self.assertIn('Cushion', chairs.search_document)
+        paper = PurchaseRequest.objects.get(title='Printer paper')
+        self.assertEqual(paper.created_by, self.finance_user)
+        self.assertEqual(paper.status, 'pending')
+        # Rollups follow the historical date
+        bucket = RequestDailyRollup.objects.get(day=date(2024, 3, 5))
+        self.assertEqual((bucket.status, bucket.request_count), ('approved', 1))
+
+    def test_invalid_rows_are_reported(self):
+        """Test failing rows are reported with their errors while valid ones are written"""
+        lines = [
+            {'title': 'Laptop stand', 'description': 'Stand', 'amount': '45'},
+            {'title': 'ab', 'description': 'Too short', 'amount': '10'},
+            {'title': 'Server rack', 'description': 'Rack', 'amount': '2000000'},
+            {'title': 'Desk', 'description': 'Desk', 'amount': '10', 'created_by': 'nobody'},
+            {'title': 'Monitors', 'description': 'Two', 'amount': '10',
+             'items': [{'name': 'Monitor', 'quantity': 'two', 'unit_price': '5'}]},
+        ]
+        content = '\n'.join(json.dumps(line) for line in lines) + '\n{not json\n'
+        report = self.run_import(content, 'ndjson')
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['failed'], 5)
+        errors = {error['row']: error['errors'] for error in report['errors']}
+        self.assertEqual(set(errors), {2, 3, 4, 5, 6})
+        self.assertIn('title', errors[2])
+        self.assertIn('amount', errors[3])
+        self.assertIn('created_by', errors[4])
+        self.assertIn('items', errors[5])
+        self.assertIn('record', errors[6])
+        self.assertEqual(PurchaseRequest.objects.count(), 1)
+
+    def test_json_array_is_streamed(self):
+        """Test a JSON array larger than one read is decoded element by element"""
+        description = 'x' * 1000
+        records = [{'title': f'Request {i}', 'description': description, 'amount': '10'} for i in range(200)]
+        content = json.dumps(records).encode()
+        self.assertGreater(len(content), READ_SIZE)
+        parsed = list(iter_records(io.BytesIO(content), 'json'))
+        self.assertEqual([index for index, _ in parsed], list(range(1, 201)))
+        self.assertEqual(parsed[-1][1]['title'], 'Request 199')
+        with self.assertRaises(ValidationError):
+            list(iter_records(io.BytesIO(b'{"title": "x"}'), 'json'))
+
+    def test_csv_fields_may_span_lines(self):
+        """Test quoted newlines survive in LF and CRLF files and rows are physical line numbers"""
+        for newline in ('\n', '\r\n'):
+            PurchaseRequest.objects.all().delete()
+            report = self.run_import(newline.join([
+                'title,description,amount',
+                'Toner,"line one' + newline + 'line two",80',
+                'ab,Too short,10',
+            ]) + newline, 'csv')
+            self.assertEqual(report['errors'], [{'row': 4, 'errors': report['errors'][0]['errors']}])
+            self.assertEqual(PurchaseRequest.objects.get().description, 'line one' + newline + 'line two')
+
+    def test_undecodable_file_reports_what_was_written(self):
+        """Test a file that stops being UTF-8 ends the import with a report, not an exception"""
+        rows = ''.join(f'Request {i},Imported request number {i},10\n' for i in range(400))
+        content = ('title,description,amount\n' + rows).encode() + 'Caf\xe9,Latin-1 row,10\n'.encode('latin-1')
+        report = import_requests(io.BytesIO(content), 'csv', self.finance_user, chunk_size=50)
+        self.assertEqual(report['stopped']['error'], 'File is not UTF-8 text')
+        self.assertEqual(report['created'], PurchaseRequest.objects.count())
+        self.assertGreater(report['created'], 0)
+        self.assertEqual(report['stopped']['row'], report['created'] + 2)
+
+        client = APIClient()
+        client.force_authenticate(user=self.finance_user)
+        response = client.post('/api/requests/import/', {'file': SimpleUploadedFile('requests.csv', content)})
+        self.assertEqual(response.status_code, 400)
+        self.assertGreater(response.data['created'], 0)
+
+    @override_settings(IMPORT_MAX_RECORD_SIZE=READ_SIZE)
+    def test_malformed_json_element_stops_without_buffering(self):
+        """Test a broken element stops the import instead of reading the rest of the file"""
+        content = (json.dumps([{'title': 'Laptop stand', 'description': 'Stand', 'amount': '45'}])[:-1]
+                   + ', {"title": "Broken' + ' ' * (READ_SIZE * 20) + ']').encode()
+        stream = io.BytesIO(content)
+        report = import_requests(stream, 'json', self.finance_user)
+        self.assertEqual((report['created'], report['stopped']['row']), (1, 2))
+        self.assertLess(stream.tell(), READ_SIZE * 4)
+
+    def test_chunks_and_dry_run(self):
+        """Test chunked writes and that a dry run validates without writing"""
+        content = json.dumps([
+            {'title': f'Request {i}', 'description': 'Test', 'amount': '10',
+             'items': [{'name': 'Thing', 'quantity': 1, 'unit_price': '10'}]}
+            for i in range(25)
+        ])
+        report = self.run_import(content, 'json', dry_run=True)
+        self.assertEqual((report['created'], PurchaseRequest.objects.count()), (25, 0))
+        self.run_import(content, 'json', chunk_size=10)
+        self.assertEqual(PurchaseRequest.objects.count(), 25)
+        self.assertEqual(RequestItem.objects.count(), 25)
+
+    def test_endpoint(self):
+        """Test the upload endpoint is finance only and returns the report"""
+        client = APIClient()
+        upload = SimpleUploadedFile('requests.csv', b'title,description,amount\nToner,Black toner,80\n')
+        client.force_authenticate(user=self.staff_user)
+        self.assertEqual(client.post('/api/requests/import/', {'file': upload}).status_code, 403)
+
+        client.force_authenticate(user=self.finance_user)
+        upload.seek(0)
+        response = client.post('/api/requests/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        bad = SimpleUploadedFile('requests.xlsx', b'')
+        self.assertEqual(client.post('/api/requests/import/', {'file': bad}).status_code, 400)
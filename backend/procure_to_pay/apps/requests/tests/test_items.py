@@ -0,0 +1,119 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from unittest import mock
+from rest_framework.test import APIClient
+from ..items import normalize_item, replace_items
+from ..models import PurchaseRequest, RequestItem
+
+User = get_user_model()
+
+class ReplaceItemsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.request = PurchaseRequest.objects.create(
+            title='Office supplies', description='Test description', amount=Decimal('100.00'),
+            created_by=self.staff_user
+        )
+
+    def items(self, count):
+        return [{'name': f'Item {i}', 'quantity': 3, 'unit_price': '0.10'} for i in range(count)]
+
+    def test_normalizes_ai_values_exactly(self):
+        """Test extracted strings and floats become exact Decimal prices and totals"""
+        row = normalize_item({'name': ' Chair ', 'quantity': '2', 'unit_price': '1,250.50'})
+        self.assertEqual(row['name'], 'Chair')
+        self.assertEqual(row['unit_price'], Decimal('1250.50'))
+        self.assertEqual(row['total_price'], Decimal('2501.00'))
+        row = normalize_item({'quantity': 3, 'unit_price': 0.1})
+        self.assertEqual(row['name'], 'Unknown Item')
+        self.assertEqual(row['total_price'], Decimal('0.30'))
+
+    def test_invalid_items_are_reported(self):
+        """Test bad items are skipped with their index while the rest are written"""
+        items, errors = replace_items(self.request, [
+            {'name': 'Desk', 'quantity': 1, 'unit_price': '300'},
+            {'name': 'Lamp', 'quantity': 1, 'unit_price': 'abc'},
+            {'name': 'Pens', 'quantity': 2.5, 'unit_price': '1'},
+        ])
+        self.assertEqual([item.name for item in items], ['Desk'])
+        self.assertEqual([error['index'] for error in errors], [1, 2])
+        self.assertEqual(self.request.items.count(), 1)
+
+    def test_replaces_set_and_search_document(self):
+        """Test the old items are removed and the search document follows the new set"""
+        replace_items(self.request, [{'name': 'Stapler', 'unit_price': '5'}])
+        replace_items(self.request, [{'name': 'Whiteboard', 'unit_price': '50'}])
+        self.assertEqual(list(self.request.items.values_list('name', flat=True)), ['Whiteboard'])
+        stored = PurchaseRequest.objects.get(pk=self.request.pk)
+        self.assertIn('Whiteboard', stored.search_document)
+        self.assertNotIn('Stapler', stored.search_document)
+
+    def test_query_count_is_constant(self):
+        """Test writing 200 items costs the same queries as writing 2"""
+        def queries(count):
+            with CaptureQueriesContext(connection) as context:
+                replace_items(self.request, self.items(count))
+            return len(context)
+
+        small = queries(2)
+        # SQLite's parameter limit splits big INSERTs; other backends need one
+        fields = [f for f in RequestItem._meta.concrete_fields if not f.primary_key]
+        batch_size = connection.ops.bulk_batch_size(fields, self.items(200))
+        insert_batches = -(-200 // batch_size)
+        self.assertEqual(queries(200), small + insert_batches - 1)
+        self.assertEqual(queries(200), small + insert_batches - 1)
+        self.assertEqual(RequestItem.objects.filter(request=self.request).count(), 200)
+        self.assertEqual(RequestItem.objects.filter(total_price=Decimal('0.30')).count(), 200)
+
+    def test_str_does_not_load_request(self):
+        """Test an item's string form does not query its request"""
+        item = RequestItem.objects.create(request=self.request, name='Chair', quantity=1, unit_price=10)
+        item = RequestItem.objects.get(pk=item.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(item), f'Chair - request #{self.request.pk}')
+
+@mock.patch('procure_to_pay.apps.requests.views.DocumentProcessor')
+class ProformaItemsViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username='items_staff', email='items_staff@example.com', password='test123', role='staff'
+        )
+        self.request = PurchaseRequest.objects.create(
+            title='Office supplies', description='Test description', amount=Decimal('100.00'),
+            created_by=self.staff_user
+        )
+        RequestItem.objects.create(request=self.request, name='Own item', quantity=1, unit_price=Decimal('10.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff_user)
+
+    def upload(self, extracted_items):
+        PurchaseRequest.objects.filter(pk=self.request.pk).update(proforma_data={'items': extracted_items})
+        proforma = SimpleUploadedFile('quote.pdf', b'%PDF-1.4 test', content_type='application/pdf')
+        return self.client.patch(f'/api/requests/{self.request.id}/', {'proforma': proforma}, format='multipart')
+
+    def names(self):
+        return list(RequestItem.objects.filter(request=self.request).values_list('name', flat=True))
+
+    def test_rejected_extracted_items_are_returned(self, processor):
+        """Test extracted items replace the old ones and the rejected ones come back by index"""
+        with self.assertLogs('procure_to_pay.apps.requests.views', 'WARNING'):
+            response = self.upload([{'name': 'Desk', 'unit_price': '50'}, {'name': 'Bad', 'unit_price': 'n/a'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([error['index'] for error in response.data['item_errors']], [1])
+        self.assertEqual(self.names(), ['Desk'])
+
+    def test_no_made_up_items(self, processor):
+        """Test a proforma without extracted items leaves the user's items alone"""
+        response = self.upload([])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('item_errors', response.data)
+        self.assertEqual(self.names(), ['Own item'])
@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from ..models import PurchaseRequest, Approval, RequestItem
+
+User = get_user_model()
+
+class RequestListQueryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.approver = User.objects.create_user(
+            username='approver1', email='approver1@example.com', password='test123',
+            role='approver_level_1'
+        )
+        self.client.force_authenticate(user=self.approver)
+
+    def create_requests(self, count):
+        for i in range(count):
+            request = PurchaseRequest.objects.create(
+                title=f'Request {i}',
+                description='Test description',
+                amount=Decimal('100.00'),
+                created_by=self.staff_user,
+                proforma_content=b'%PDF-1.4 test',
+                proforma_data={'vendor': 'Acme'}
+            )
+            Approval.objects.create(request=request, approver=self.approver, approved=True)
+            RequestItem.objects.create(
+                request=request, name='Chair', quantity=2, unit_price=Decimal('50.00')
+            )
+
+    def test_list_query_count_is_constant(self):
+        """Test the list costs the same number of queries for 2 or 10 rows"""
+        # validator aggregate + keyset page + approvals prefetch
+        self.create_requests(2)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/requests/')
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.create_requests(8)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/requests/')
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_default_list_fields(self):
+        """Test the list omits heavy fields unless expanded"""
+        self.create_requests(1)
+        response = self.client.get('/api/requests/')
+        row = response.data['results'][0]
+        self.assertEqual(row['created_by_name'], self.staff_user.get_full_name())
+        self.assertEqual(len(row['approvals']), 1)
+        self.assertNotIn('items', row)
+        self.assertNotIn('proforma_data', row)
+
+    def test_default_list_fields_cover_the_request_list(self):
+        """Test the default list still carries every field the frontend request list reads"""
+        self.create_requests(1)
+        row = self.client.get('/api/requests/').data['results'][0]
+        for field in ('id', 'title', 'description', 'amount', 'status', 'created_by', 'created_by_name',
+                      'created_at', 'proforma', 'purchase_order', 'receipt', 'proforma_filename',
+                      'purchase_order_filename', 'receipt_filename'):
+            self.assertIn(field, row)
+
+    def test_sparse_fields(self):
+        """Test ?fields= limits both the payload and the queries"""
+        self.create_requests(3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/requests/', {'fields': 'title,status'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'status'})
+
+    def test_expand(self):
+        """Test ?expand= adds heavy fields at a fixed query cost"""
+        self.create_requests(3)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/requests/', {'expand': 'items,proforma_data'})
+        row = response.data['results'][0]
+        self.assertEqual(len(row['items']), 1)
+        self.assertEqual(row['proforma_data'], {'vendor': 'Acme'})
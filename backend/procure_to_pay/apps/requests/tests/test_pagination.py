@@ -0,0 +1,92 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from ..models import PurchaseRequest
+from ...finance.models import ComplianceAlert
+
+User = get_user_model()
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.finance_user = User.objects.create_user(
+            username='finance1', email='finance1@example.com', password='test123', role='finance'
+        )
+        for i in range(25):
+            PurchaseRequest.objects.create(
+                title=f'Request {i}',
+                description='Test description',
+                amount=Decimal('100.00'),
+                created_by=self.staff_user
+            )
+        # Ties on created_at must be broken by id
+        PurchaseRequest.objects.filter(title__in=['Request 9', 'Request 10', 'Request 11']).update(
+            created_at=timezone.now()
+        )
+        self.expected = list(
+            PurchaseRequest.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.client.force_authenticate(user=self.finance_user)
+
+    def collect(self, url, params=None):
+        ids = []
+        response = self.client.get(url, params or {})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_walks_every_row_once(self):
+        """Test following next links returns every row once, in order"""
+        ids, _ = self.collect('/api/requests/', {'page_size': 7, 'fields': 'id'})
+        self.assertEqual(ids, self.expected)
+
+    def test_previous_link(self):
+        """Test previous links return the preceding page"""
+        first = self.client.get('/api/requests/', {'page_size': 10})
+        self.assertIsNone(first.data['previous'])
+        self.assertNotIn('count', first.data)
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']]
+        )
+        self.assertIsNotNone(back.data['next'])
+
+    def test_no_count_query(self):
+        """Test a keyset page is one query without COUNT(*)"""
+        response = self.client.get('/api/requests/', {'page_size': 5, 'fields': 'title'})
+        cache.clear()
+        with self.assertNumQueries(2) as context:
+            self.client.get(response.data['next'])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries[1:]))
+
+    def test_page_number_mode(self):
+        """Test ?page= keeps the page-number representation with a total"""
+        response = self.client.get('/api/requests/', {'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected"""
+        response = self.client.get('/api/requests/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_alerts_are_paginated(self):
+        """Test compliance alerts use keyset pagination too"""
+        for i in range(3):
+            ComplianceAlert.objects.create(alert_type='high_value', title=f'Alert {i}', description='x')
+        ids, response = self.collect('/api/finance/alerts/', {'page_size': 2})
+        self.assertEqual(len(ids), 3)
+        self.assertNotIn('count', response.data)
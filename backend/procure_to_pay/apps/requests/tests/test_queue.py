@@ -0,0 +1,103 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from unittest import mock
+from rest_framework.test import APIClient
+from ..models import Approval, PurchaseRequest
+from ..reviews import review_requests
+from ..workflow import decide
+
+User = get_user_model()
+
+def create_user(name, role):
+    return User.objects.create_user(username=name, email=f'{name}@example.com', password='test123', role=role)
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+@mock.patch('procure_to_pay.apps.requests.workflow.generate_purchase_order')
+class ApproverQueueTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = create_user('queue_staff', 'staff')
+        self.approver1 = create_user('queue_approver1', 'approver_level_1')
+        self.other_approver1 = create_user('queue_approver1b', 'approver_level_1')
+        self.approver2 = create_user('queue_approver2', 'approver_level_2')
+        self.client = APIClient()
+
+    def create(self, title='Request'):
+        return PurchaseRequest.objects.create(
+            title=title, description='Test description', amount=Decimal('100.00'), created_by=self.staff_user
+        )
+
+    def stage(self, request):
+        return PurchaseRequest.objects.values_list('approval_stage', flat=True).get(pk=request.pk)
+
+    def queue(self, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/requests/queue/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_stage_follows_decisions(self, generate_purchase_order):
+        """Test approval_stage tracks the level still missing and clears once decided"""
+        request = self.create()
+        self.assertEqual(self.stage(request), 'all')
+        decide(request.id, self.approver2, True)
+        self.assertEqual(self.stage(request), 'approver_level_1')
+        decide(request.id, self.approver1, True)
+        self.assertEqual(self.stage(request), '')
+
+        rejected, waiting = self.create(), self.create()
+        review_requests(self.approver1, [(rejected.id, False, ''), (waiting.id, True, '')])
+        self.assertEqual(self.stage(rejected), '')
+        self.assertEqual(self.stage(waiting), 'approver_level_2')
+
+    def test_stage_follows_admin_edits(self, generate_purchase_order):
+        """Test approvals and statuses changed outside the workflow keep the stage right"""
+        request = self.create()
+        approval = Approval.objects.create(request=request, approver=self.approver1, approved=True)
+        self.assertEqual(self.stage(request), 'approver_level_2')
+        approval.delete()
+        self.assertEqual(self.stage(request), 'all')
+
+        request = PurchaseRequest.objects.get(pk=request.pk)
+        request.status = 'rejected'
+        request.save()
+        self.assertEqual(self.stage(request), '')
+
+    def test_queue_per_approver(self, generate_purchase_order):
+        """Test each approver only sees pending requests waiting on their level and not yet reviewed"""
+        fresh, level1_done, level2_done, decided = [self.create(f'Request {i}') for i in range(4)]
+        decide(level1_done.id, self.approver1, True)
+        decide(level2_done.id, self.approver2, True)
+        decide(decided.id, self.approver1, False)
+
+        self.assertEqual(self.queue(self.approver1), [level2_done.id, fresh.id])
+        self.assertEqual(self.queue(self.other_approver1), [level2_done.id, fresh.id])
+        self.assertEqual(self.queue(self.approver2), [level1_done.id, fresh.id])
+
+    def test_queue_uses_list_paging_and_filters(self, generate_purchase_order):
+        """Test the queue pages by cursor and accepts the list filters"""
+        requests = [self.create(f'Request {i}') for i in range(3)]
+        PurchaseRequest.objects.filter(pk=requests[1].pk).update(amount=Decimal('900.00'))
+        self.client.force_authenticate(user=self.approver1)
+        response = self.client.get('/api/requests/queue/', {'page_size': 2})
+        self.assertEqual([row['id'] for row in response.data['results']], [requests[2].id, requests[1].id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [requests[0].id])
+        self.assertEqual(self.queue(self.approver1, amount_min=500), [requests[1].id])
+
+    def test_queue_query_count(self, generate_purchase_order):
+        """Test the queue costs the same queries however much history exists"""
+        for request in [self.create() for _ in range(20)]:
+            decide(request.id, self.approver1, False)
+        self.create()
+        self.client.force_authenticate(user=self.approver2)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/requests/queue/')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_only_approvers(self, generate_purchase_order):
+        """Test staff and finance get 403"""
+        self.client.force_authenticate(user=self.staff_user)
+        self.assertEqual(self.client.get('/api/requests/queue/').status_code, 403)
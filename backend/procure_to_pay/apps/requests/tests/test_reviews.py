@@ -0,0 +1,106 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from decimal import Decimal
+from unittest import mock
+from rest_framework.test import APIClient
+from ..models import Approval, PurchaseRequest, RequestDailyRollup
+from ..rollups import rebuild_rollups
+
+User = get_user_model()
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class BulkReviewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.approver1 = User.objects.create_user(
+            username='approver1', email='approver1@example.com', password='test123', role='approver_level_1'
+        )
+        self.approver2 = User.objects.create_user(
+            username='approver2', email='approver2@example.com', password='test123', role='approver_level_2'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.approver2)
+
+    def create(self, count):
+        return [PurchaseRequest.objects.create(
+            title=f'Request {i}', description='Test description', amount=Decimal('100.00'),
+            created_by=self.staff_user
+        ) for i in range(count)]
+
+    def review(self, decisions):
+        return self.client.post('/api/requests/bulk-review/', {'decisions': decisions}, format='json')
+
+    @mock.patch('procure_to_pay.apps.requests.workflow.generate_purchase_order')
+    def test_mixed_decisions(self, generate_purchase_order):
+        """Test approvals, rejections and errors are reported per item"""
+        ready, waiting, rejected, done = self.create(4)
+        Approval.objects.create(request=ready, approver=self.approver1, approved=True)
+        PurchaseRequest.objects.filter(pk=done.pk).update(status='approved')
+        rebuild_rollups()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.review([
+                {'id': ready.id, 'decision': 'approve', 'comments': 'ok'},
+                {'id': waiting.id, 'decision': 'approve'},
+                {'id': rejected.id, 'decision': 'reject', 'comments': 'too expensive'},
+                {'id': done.id, 'decision': 'approve'},
+                {'id': 999999, 'decision': 'approve'},
+            ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.data['results']],
+                         ['approved', 'pending', 'rejected', 'error', 'error'])
+        self.assertEqual(response.data['summary'],
+                         {'approved': 1, 'rejected': 1, 'pending': 1, 'error': 2})
+        self.assertEqual(PurchaseRequest.objects.get(pk=ready.pk).status, 'approved')
+        self.assertEqual(PurchaseRequest.objects.get(pk=rejected.pk).status, 'rejected')
+        self.assertEqual(Approval.objects.get(request=rejected).comments, 'too expensive')
+        self.assertEqual(Approval.objects.filter(approver=self.approver2).count(), 3)
+        # The PO is rendered after commit, for the newly approved request only
+        generate_purchase_order.assert_called_once_with(ready.id)
+
+        buckets = dict(RequestDailyRollup.objects.filter(day=timezone.localdate()).values_list(
+            'status', 'request_count'
+        ))
+        self.assertEqual(buckets, {'pending': 1, 'approved': 2, 'rejected': 1})
+
+    def test_already_reviewed(self):
+        """Test a second review by the same approver is refused"""
+        request, = self.create(1)
+        Approval.objects.create(request=request, approver=self.approver2, approved=True)
+        response = self.review([{'id': request.id, 'decision': 'reject'}])
+        self.assertEqual(response.data['results'][0]['error'], 'You have already reviewed this request')
+        self.assertEqual(PurchaseRequest.objects.get(pk=request.pk).status, 'pending')
+
+    def test_query_count_does_not_grow(self):
+        """Test reviewing 50 requests costs the same queries as reviewing 2"""
+        def queries(count):
+            decisions = [{'id': r.id, 'decision': 'reject'} for r in self.create(count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.review(decisions)
+            self.assertEqual(response.data['summary']['rejected'], count)
+            return len(context)
+
+        queries(1)  # create the rollup buckets
+        self.assertEqual(queries(2), queries(50))
+
+    def test_invalid_payload(self):
+        """Test malformed or oversized payloads are rejected"""
+        self.assertEqual(self.review([]).status_code, 400)
+        self.assertEqual(self.review([{'id': 1, 'decision': 'maybe'}]).status_code, 400)
+        self.assertEqual(self.review([{'id': 1, 'decision': 'approve'}] * 2).status_code, 400)
+        with override_settings(BULK_REVIEW_MAX_ITEMS=2):
+            decisions = [{'id': i, 'decision': 'approve'} for i in range(3)]
+            self.assertEqual(self.review(decisions).status_code, 400)
+
+    def test_approvers_only(self):
+        """Test staff cannot bulk review"""
+        self.client.force_authenticate(user=self.staff_user)
+        self.assertEqual(self.review([{'id': 1, 'decision': 'approve'}]).status_code, 403)
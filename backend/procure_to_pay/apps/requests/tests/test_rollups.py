@@ -0,0 +1,87 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from decimal import Decimal
+from rest_framework.test import APIClient
+from ..models import PurchaseRequest, RequestDailyRollup
+from ..rollups import rebuild_rollups
+
+User = get_user_model()
+
+class DailyRollupTest(TestCase):
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123',
+            role='staff', department='IT'
+        )
+        self.other_user = User.objects.create_user(
+            username='staff2', email='staff2@example.com', password='test123', role='staff'
+        )
+
+    def create(self, amount, user=None):
+        return PurchaseRequest.objects.create(
+            title='Request', description='Test description', amount=Decimal(amount),
+            created_by=user or self.staff_user
+        )
+
+    def snapshot(self):
+        return sorted(RequestDailyRollup.objects.filter(request_count__gt=0).values_list(
+            'day', 'status', 'department', 'created_by_id', 'request_count', 'total_amount', 'high_value_count'
+        ))
+
+    def bucket(self, status='pending', user=None):
+        return RequestDailyRollup.objects.get(
+            day=timezone.localdate(), status=status, created_by=user or self.staff_user
+        )
+
+    def test_create_adds_to_bucket(self):
+        """Test new requests are counted in their day, status and department bucket"""
+        self.create('100.00')
+        self.create('150000.00')
+        bucket = self.bucket()
+        self.assertEqual(bucket.department, 'IT')
+        self.assertEqual(bucket.request_count, 2)
+        self.assertEqual(bucket.total_amount, Decimal('150100.00'))
+        self.assertEqual(bucket.high_value_count, 1)
+
+    def test_status_change_moves_request(self):
+        """Test a status change moves the request between buckets"""
+        request = self.create('100.00')
+        request.status = 'approved'
+        request.save()
+        self.assertEqual(self.bucket('pending').request_count, 0)
+        self.assertEqual(self.bucket('approved').total_amount, Decimal('100.00'))
+
+    def test_amount_change_and_delete(self):
+        """Test amount edits adjust the total and deletes remove the request"""
+        request = self.create('100.00')
+        request = PurchaseRequest.objects.get(pk=request.pk)
+        request.amount = Decimal('250.00')
+        request.save()
+        self.assertEqual(self.bucket().total_amount, Decimal('250.00'))
+        request.delete()
+        self.assertEqual(self.bucket().request_count, 0)
+        self.assertEqual(self.bucket().total_amount, Decimal('0'))
+
+    def test_rebuild_matches_incremental(self):
+        """Test a full rebuild reproduces the incrementally maintained buckets"""
+        first = self.create('100.00')
+        self.create('200000.00', user=self.other_user)
+        first.status = 'rejected'
+        first.save()
+        incremental = self.snapshot()
+        rebuild_rollups()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_spend_trend(self):
+        """Test the trend endpoint reads the caller's buckets"""
+        self.create('100.00')
+        self.create('50.00', user=self.other_user)
+        client = APIClient()
+        client.force_authenticate(user=self.staff_user)
+        response = client.get('/api/requests/spend-trend/?days=7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 7)
+        today = response.data['results'][-1]
+        self.assertEqual(today['requests'], 1)
+        self.assertEqual(Decimal(today['amount']), Decimal('100.00'))
@@ -0,0 +1,85 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from decimal import Decimal
+from ..models import PurchaseRequest, RequestItem
+from ..search import search_requests
+
+User = get_user_model()
+
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='test123', role='staff'
+        )
+        self.chairs = self.create('Office chairs', 'Ergonomic seating for the finance team')
+        self.laptops = self.create(
+            'IT equipment', 'Replacement machines', proforma_data={'vendor': 'Kigali Computer Supplies'}
+        )
+        RequestItem.objects.create(
+            request=self.laptops, name='Laptop stand', quantity=4, unit_price=Decimal('20.00')
+        )
+        self.desk = self.create('Desk', 'A desk to go with the new office chair')
+        self.client.force_authenticate(user=self.staff_user)
+
+    def create(self, title, description, **kwargs):
+        return PurchaseRequest.objects.create(
+            title=title, description=description, amount=Decimal('100.00'),
+            created_by=self.staff_user, **kwargs
+        )
+
+    def search(self, text):
+        return list(search_requests(PurchaseRequest.objects.all(), text).values_list('id', flat=True))
+
+    def test_title_matches_rank_first(self):
+        """Test title matches outrank description matches, with stemming"""
+        self.assertEqual(self.search('chair '), [self.chairs.id, self.desk.id])
+
+    def test_vendor_and_item_names(self):
+        """Test vendor and line-item names are searchable"""
+        self.assertEqual(self.search('kigali'), [self.laptops.id])
+        self.assertEqual(self.search('stand '), [self.laptops.id])
+
+    def test_prefix_query(self):
+        """Test the last term is matched as a prefix while typing"""
+        self.assertEqual(self.search('lapt'), [self.laptops.id])
+        self.assertEqual(self.search('ergonomic seat'), [self.chairs.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test the index is kept in sync with the table"""
+        self.desk.title = 'Whiteboard'
+        self.desk.description = 'For the meeting room'
+        self.desk.save()
+        self.assertEqual(self.search('chair '), [self.chairs.id])
+        self.chairs.delete()
+        self.assertEqual(self.search('chair '), [])
+
+    def test_document_is_rebuilt_only_when_its_inputs_change(self):
+        """Test status-only saves skip the items query while description and vendor edits refresh it"""
+        request = PurchaseRequest.objects.get(pk=self.laptops.pk)
+        request.status = 'rejected'
+        with CaptureQueriesContext(connection) as context:
+            request.save()
+        self.assertFalse(any('requests_requestitem' in query['sql'] for query in context.captured_queries))
+
+        request.proforma_data['vendor'] = 'Rwanda Office Mart'
+        request.save(update_fields=['proforma_data'])
+        self.assertEqual(self.search('mart'), [self.laptops.id])
+        self.assertEqual(self.search('kigali'), [])
+        self.assertEqual(PurchaseRequest.objects.get(pk=request.pk).vendor_name, 'Rwanda Office Mart')
+
+    def test_search_endpoint(self):
+        """Test ?search= returns ranked results in page-number mode"""
+        response = self.client.get('/api/requests/', {'search': 'chair'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.chairs.id, self.desk.id])
+        self.assertEqual(response.data['count'], 2)
+
+    def test_punctuation_is_ignored(self):
+        """Test query syntax characters cannot break the query"""
+        self.assertEqual(self.search('"chair*'), [self.chairs.id, self.desk.id])
+        self.assertEqual(self.search('***'), [])
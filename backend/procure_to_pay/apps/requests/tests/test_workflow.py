@@ -0,0 +1,155 @@
+import threading
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.db.models.query import QuerySet
+from decimal import Decimal
+from unittest import mock
+from rest_framework.test import APIClient
+from ..models import Approval, PurchaseRequest
+from ..workflow import TransitionConflict, decide
+
+User = get_user_model()
+
+def create_users():
+    return (
+        User.objects.create_user(username='staff1', email='staff1@example.com', password='test123', role='staff'),
+        User.objects.create_user(username='approver1', email='approver1@example.com', password='test123',
+                                 role='approver_level_1'),
+        User.objects.create_user(username='approver2', email='approver2@example.com', password='test123',
+                                 role='approver_level_2'),
+    )
+
+def create_request(user):
+    return PurchaseRequest.objects.create(
+        title='Request', description='Test description', amount=Decimal('100.00'), created_by=user
+    )
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+@mock.patch('procure_to_pay.apps.requests.workflow.generate_purchase_order')
+class WorkflowTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user, self.approver1, self.approver2 = create_users()
+        self.request = create_request(self.staff_user)
+
+    def test_transitions(self, generate_purchase_order):
+        """Test both levels must approve and each decision bumps the version"""
+        self.assertEqual(decide(self.request.id, self.approver1, True), 'pending')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(decide(self.request.id, self.approver2, True), 'approved')
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, 'approved')
+        self.assertEqual(self.request.version, 2)
+        generate_purchase_order.assert_called_once_with(self.request.id)
+
+    def test_decided_request_is_refused(self, generate_purchase_order):
+        """Test decisions on a rejected request are refused without side effects"""
+        decide(self.request.id, self.approver1, False)
+        with self.assertRaises(ValidationError):
+            decide(self.request.id, self.approver2, True)
+        self.assertEqual(Approval.objects.count(), 1)
+
+    def test_lost_swap_retries(self, generate_purchase_order):
+        """Test a lost compare-and-swap rolls back its approval and retries on fresh state"""
+        real_update = QuerySet.update
+        lost = []
+
+        def update(queryset, **kwargs):
+            if 'version' in kwargs and not lost:
+                lost.append(True)
+                return 0
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+            self.assertEqual(decide(self.request.id, self.approver1, True), 'pending')
+        self.assertEqual(lost, [True])
+        self.assertEqual(Approval.objects.count(), 1)
+        self.assertEqual(PurchaseRequest.objects.get(pk=self.request.pk).version, 1)
+
+    def test_stale_version_conflicts(self, generate_purchase_order):
+        """Test a request that keeps changing ends in TransitionConflict without side effects"""
+        with mock.patch.object(QuerySet, 'update', return_value=0):
+            with self.assertRaises(TransitionConflict):
+                decide(self.request.id, self.approver1, True)
+        self.assertFalse(Approval.objects.exists())
+        self.assertEqual(PurchaseRequest.objects.get(pk=self.request.pk).status, 'pending')
+
+    def test_clean_uses_loaded_state(self, generate_purchase_order):
+        """Test saving a loaded request does not re-read it to validate the status"""
+        request = PurchaseRequest.objects.get(pk=self.request.pk)
+        request.title = 'Renamed'
+        request.status = 'approved'
+        request.clean()
+        with self.assertNumQueries(0):
+            request.clean()
+        PurchaseRequest.objects.filter(pk=request.pk).update(status='approved')
+        request = PurchaseRequest.objects.get(pk=self.request.pk)
+        request.status = 'rejected'
+        with self.assertRaises(ValidationError):
+            request.clean()
+
+
+def begin_immediate(wrapper):
+    # Takes the write lock up front, so racing transactions queue on the busy
+    # timeout instead of failing to upgrade their read lock
+    wrapper.cursor().execute('BEGIN IMMEDIATE')
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+@mock.patch('procure_to_pay.apps.requests.workflow.generate_purchase_order')
+class ConcurrentApprovalTest(TransactionTestCase):
+    REQUESTS = 10
+    ROUNDS = 3
+
+    def setUp(self):
+        cache.clear()
+        self.staff_user, self.approver1, self.approver2 = create_users()
+        # Extra approvers so several decisions race on every request
+        self.approvers = [self.approver1, self.approver2] + [
+            User.objects.create_user(username=f'approver{i}', email=f'approver{i}@example.com',
+                                     password='test123', role='approver_level_1')
+            for i in range(3, 3 + self.ROUNDS)
+        ]
+
+    def test_concurrent_approvals(self, generate_purchase_order):
+        """Test racing approvers never lose a decision or leave a request stuck"""
+        if connection.vendor == 'sqlite':
+            # SQLite has no row locks; whole-database write locks stand in for them
+            patcher = mock.patch.object(type(connections['default']), '_start_transaction_under_autocommit',
+                                        begin_immediate)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        requests = [create_request(self.staff_user) for _ in range(self.REQUESTS)]
+        barrier = threading.Barrier(len(self.approvers))
+        responses = []
+
+        def approve_all(approver):
+            client = APIClient()
+            client.force_authenticate(user=approver)
+            try:
+                barrier.wait()
+                for request in requests:
+                    responses.append(client.patch(f'/api/requests/{request.id}/approve/').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=approve_all, args=(approver,)) for approver in self.approvers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Nobody can be outraced more than len(approvers) - 1 times, so no 409 either
+        self.assertTrue(set(responses) <= {200, 400}, responses)
+        for request in requests:
+            request.refresh_from_db()
+            approvals = Approval.objects.filter(request=request)
+            # The level 2 approver always gets in: nothing approves without it
+            self.assertEqual(request.status, 'approved')
+            self.assertTrue(approvals.filter(approver=self.approver2).exists())
+            # Every recorded decision moved the version exactly once
+            self.assertEqual(request.version, approvals.count())
+        self.assertEqual(responses.count(200), Approval.objects.count())
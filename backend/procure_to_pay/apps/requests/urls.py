@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PurchaseRequestViewSet
+from .views import EventTicketView, PurchaseRequestViewSet
 
 router = DefaultRouter()
 router.register(r'requests', PurchaseRequestViewSet, basename='requests')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('events/ticket/', EventTicketView.as_view(), name='events-ticket'),
 ]
\ No newline at end of file
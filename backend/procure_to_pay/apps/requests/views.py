@@ -1,29 +1,86 @@
 from rest_framework import generics, status
+from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import action
-from django.http import HttpResponse, Http404
+from django.http import Http404
 from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+import hashlib
+import logging
+import time
 import os
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from django.db import transaction
 from django.core.exceptions import ValidationError
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from .models import PurchaseRequest, Approval, RequestItem
-from .serializers import PurchaseRequestSerializer, RequestItemSerializer
+from .models import ArchivedRequest, PurchaseRequest
+from .serializers import (
+    ArchivedRequestSerializer, PurchaseRequestSerializer, PurchaseRequestListSerializer, RequestItemSerializer
+)
 from .permissions import CanApproveRequest, CanUpdateRequest, CanDeleteRequest
+from .cache import RequestCache
+from .filters import PurchaseRequestFilter
+from .fuzzy import autocomplete
+from .dashboard import DashboardCache, build_trend
+from .reviews import parse_decisions, review_requests
+from .workflow import TransitionConflict, awaiting_review, decide
+from .items import replace_items
+from .importer import detect_format, import_requests
+from .changes import CursorExpired, changes_since
+from .archive import archived_for, load_snapshot
+from .events import publish_on_commit
+from .streams import issue_ticket
 from ..documents.services import DocumentProcessor
+from ...utils.pagination import KeysetPagination
+from ...utils.db_router import ReplicaReadsMixin
+from ..documents.downloads import DatabaseBlobSource, FieldFileSource, serve_document
+from ..documents.codecs import iter_decoded
+from ..documents.previews import PreviewService, serve_preview
+
+logger = logging.getLogger(__name__)
 
 @extend_schema_view(
-    list=extend_schema(description="List purchase requests (filtered by user role)", tags=['Purchase Requests']),
+    list=extend_schema(
+        description="List purchase requests (filtered by user role). Use ?fields=a,b to pick fields "
+                    "and ?expand=items,proforma_data,receipt_data,validation_results for heavier ones",
+        tags=['Purchase Requests']
+    ),
     create=extend_schema(description="Create new purchase request (Staff only)", tags=['Purchase Requests']),
     retrieve=extend_schema(description="Get purchase request details", tags=['Purchase Requests']),
     update=extend_schema(description="Update purchase request (Staff only, pending requests)", tags=['Purchase Requests']),
     destroy=extend_schema(description="Delete purchase request (Staff only, own requests)", tags=['Purchase Requests']),
 )
-class PurchaseRequestViewSet(ModelViewSet):
+class PurchaseRequestViewSet(ReplicaReadsMixin, ModelViewSet):
     serializer_class = PurchaseRequestSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filterset_class = PurchaseRequestFilter
+    # Search results are ranked, so they are paged by number rather than by created_at
+    page_number_params = ['ordering', 'search', 'q']
+    
+    # Where each downloadable document lives on PurchaseRequest
+    DOCUMENT_FIELDS = {
+        'proforma': {
+            'content': 'proforma_content', 'filename': 'proforma_filename',
+            'content_type': 'proforma_content_type', 'file': 'proforma',
+        },
+        'purchase_order': {
+            'content': 'purchase_order_content', 'filename': 'purchase_order_filename',
+            'content_type': None, 'file': 'purchase_order',
+        },
+        'receipt': {
+            'content': 'receipt_content', 'filename': 'receipt_filename',
+            'content_type': 'receipt_content_type', 'file': 'receipt',
+        },
+    }
+    BLOB_FIELDS = ['proforma_content', 'purchase_order_content', 'receipt_content']
+    # Aggregate-only reads that may lag the primary slightly (see utils/db_router.py)
+    replica_actions = ['dashboard_stats', 'spend_trend']
+    # Read-only actions that also find archived requests (see archive.py)
+    ARCHIVE_ACTIONS = ['retrieve', 'download_document', 'preview']
     
     def get_queryset(self):
         # Handle swagger documentation generation
@@ -42,13 +99,12 @@ class PurchaseRequestViewSet(ModelViewSet):
             'items'
         )
         
-        # Only use .only() for list views, not for detail views
-        if self.action == 'list':
-            base_queryset = base_queryset.only(
-                'id', 'title', 'description', 'amount', 'status', 
-                'created_at', 'updated_at', 'created_by__id', 
-                'created_by__email', 'created_by__first_name', 'created_by__last_name'
-            )
+        if self.action in ['list', 'changes', 'queue']:
+            # Load only what the requested list fields read
+            base_queryset = PurchaseRequestListSerializer.optimize_queryset(base_queryset, self.request)
+        else:
+            # Document blobs are streamed on demand, never loaded with the row
+            base_queryset = base_queryset.defer(*self.BLOB_FIELDS)
         
         if user.role == 'staff':
             return base_queryset.filter(created_by=user)
@@ -59,11 +115,94 @@ class PurchaseRequestViewSet(ModelViewSet):
             return base_queryset.all()
         return PurchaseRequest.objects.none()
     
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if self.action not in self.ARCHIVE_ACTIONS:
+                raise
+        archived = get_object_or_404(archived_for(self.request.user), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, archived)
+        return archived
+    
+    def get_serializer_class(self):
+        if self.action in ['list', 'changes', 'queue']:
+            return PurchaseRequestListSerializer
+        return super().get_serializer_class()
+    
+    def _cached_response(self, view, build, *parts):
+        """Serve response data from the versioned cache, building it on a miss"""
+        key = RequestCache.get_cache_key(self.request.user, view, self.request.query_params, *parts)
+        data = RequestCache.get(key)
+        if data is not None:
+            return Response(data)
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            RequestCache.set(key, response.data)
+        return response
+    
+    def _get_validator(self, view, queryset, *parts):
+        """ETag and Last-Modified of the rows behind a response, from one aggregate query"""
+        key = RequestCache.get_cache_key(self.request.user, f'{view}-validator', self.request.query_params, *parts)
+        validator = RequestCache.get(key, record=False)
+        if validator is None:
+            stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+            last_modified = stats['last_modified']
+            # The query string selects the representation (?fields=, ?page=, filters)
+            digest = hashlib.md5(
+                f"{RequestCache.scope_for(self.request.user)}:{self.request.query_params.urlencode()}:"
+                f"{stats['count']}:{last_modified.isoformat() if last_modified else ''}".encode()
+            ).hexdigest()
+            validator = {
+                'count': stats['count'],
+                'etag': 'W/' + quote_etag(digest),
+                'last_modified': int(last_modified.timestamp()) if last_modified else None,
+            }
+            RequestCache.set(key, validator)
+        return validator
+    
+    def _conditional_response(self, view, queryset, build, *parts):
+        """Answer If-None-Match/If-Modified-Since with 304 before anything is serialized"""
+        validator = self._get_validator(view, queryset, *parts)
+        if parts and not validator['count']:
+            # Let the detail view produce its usual 404
+            return self._cached_response(view, build, *parts)
+        
+        response = get_conditional_response(
+            self.request, etag=validator['etag'], last_modified=validator['last_modified']
+        )
+        if response is None:
+            response = self._cached_response(view, build, *parts)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = validator['etag']
+            if validator['last_modified'] is not None:
+                response['Last-Modified'] = http_date(validator['last_modified'])
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(
+            'list', self.filter_queryset(self.get_queryset()),
+            lambda: super(PurchaseRequestViewSet, self).list(request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(
+            'detail', self.get_queryset().filter(pk=kwargs.get('pk')),
+            self._retrieve, kwargs.get('pk')
+        )
+    
+    def _retrieve(self):
+        instance = self.get_object()
+        if isinstance(instance, ArchivedRequest):
+            return Response(load_snapshot(instance))
+        return Response(self.get_serializer(instance).data)
+    
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
     
     def get_permissions(self):
-        if self.action in ['approve', 'reject']:
+        if self.action in ['approve', 'reject', 'bulk_review', 'queue']:
             return [CanApproveRequest()]
         elif self.action in ['update', 'partial_update']:
             return [CanUpdateRequest()]
@@ -74,7 +213,7 @@ class PurchaseRequestViewSet(ModelViewSet):
     @extend_schema(
         description="Approve purchase request (Approvers only)",
         request=None,
-        responses={200: None, 400: None, 403: None},
+        responses={200: None, 400: None, 403: None, 409: None},
         tags=['Purchase Requests']
     )
     @action(detail=True, methods=['patch'])
@@ -84,66 +223,74 @@ class PurchaseRequestViewSet(ModelViewSet):
     @extend_schema(
         description="Reject purchase request (Approvers only)",
         request=None,
-        responses={200: None, 400: None, 403: None},
+        responses={200: None, 400: None, 403: None, 409: None},
         tags=['Purchase Requests']
     )
     @action(detail=True, methods=['patch'])
     def reject(self, request, pk=None):
         return self._handle_approval(request, pk, False)
     
-    @transaction.atomic
-    def _handle_approval(self, request, pk, approved):
-        purchase_request = self.get_object()
-        
-        if purchase_request.status != 'pending':
-            return Response({'error': 'Request is not pending'}, 
+    @extend_schema(
+        description="Approve or reject many requests at once (Approvers only). Body: "
+                    "{\"decisions\": [{\"id\": 1, \"decision\": \"approve\"|\"reject\", \"comments\": \"...\"}]}, "
+                    "up to 500 per call; the result is reported per request",
+        request=None,
+        responses={200: None, 400: None, 403: None},
+        tags=['Purchase Requests']
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-review')
+    def bulk_review(self, request):
+        try:
+            decisions = parse_decisions(request.data.get('decisions'))
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
+        results = review_requests(request.user, decisions)
+        summary = {'approved': 0, 'rejected': 0, 'pending': 0, 'error': 0}
+        for result in results:
+            summary[result['status']] += 1
+        return Response({'results': results, 'summary': summary})
+    
+    @extend_schema(
+        description="Pending requests awaiting the caller's approval level that they have not reviewed yet "
+                    "(Approvers only). Paged and filtered like the list",
+        responses={200: PurchaseRequestListSerializer(many=True), 403: None},
+        tags=['Purchase Requests']
+    )
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        queryset = awaiting_review(self.filter_queryset(self.get_queryset()), request.user)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+    
+    @extend_schema(
+        description="Archived (closed and old) requests, newest first and paged like the list; "
+                    "their details and documents stay available under /requests/<id>/",
+        responses={200: ArchivedRequestSerializer(many=True)},
+        tags=['Purchase Requests']
+    )
+    @action(detail=False, methods=['get'])
+    def archived(self, request):
+        page = self.paginate_queryset(archived_for(request.user).defer('snapshot'))
+        return self.get_paginated_response(ArchivedRequestSerializer(page, many=True).data)
+    
+    def _handle_approval(self, request, pk, approved):
+        purchase_request = self.get_object()
         comments = request.data.get('comments', '').strip()
         
-        approval, created = Approval.objects.get_or_create(
-            request=purchase_request,
-            approver=request.user,
-            defaults={
-                'approved': approved,
-                'comments': comments
-            }
-        )
-        
-        if not created:
-            return Response({'error': 'You have already reviewed this request'}, 
+        try:
+            decide(purchase_request.pk, request.user, approved, comments)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, 
                           status=status.HTTP_400_BAD_REQUEST)
-        
-        if not approved:
-            purchase_request.status = 'rejected'
-            purchase_request.save()
-        else:
-            # Check if all required approvals are complete
-            required_approvers = ['approver_level_1', 'approver_level_2']
-            approved_by_roles = set(
-                purchase_request.approvals.filter(approved=True)
-                .values_list('approver__role', flat=True)
-            )
-            
-            if all(role in approved_by_roles for role in required_approvers):
-                purchase_request.status = 'approved'
-                purchase_request.save()
-                
-                # Generate PO automatically
-                try:
-                    from ..documents.services import POGenerator
-                    po_generator = POGenerator()
-                    po_file = po_generator.generate_po(purchase_request)
-                    purchase_request.purchase_order = po_file
-                    purchase_request.save()
-                    print(f"PO generated successfully for request {purchase_request.id}")
-                except Exception as e:
-                    print(f"PO generation failed for request {purchase_request.id}: {e}")
-                    # Log error but don't fail the approval
+        except TransitionConflict:
+            return Response({'error': 'Request was modified concurrently, please retry'}, 
+                          status=status.HTTP_409_CONFLICT)
         
         return Response({
             'message': f'Request {"approved" if approved else "rejected"} successfully',
-            'request': self.get_serializer(purchase_request).data
+            'request': self.get_serializer(self.get_object()).data
         })
     
     def update(self, request, *args, **kwargs):
@@ -183,44 +330,35 @@ class PurchaseRequestViewSet(ModelViewSet):
                     instance.proforma_filename = uploaded_file.name
                     instance.proforma_content_type = uploaded_file.content_type or 'application/octet-stream'
                 
-                # Update RequestItem objects from AI-extracted items
-                if 'proforma' in request.FILES and hasattr(instance, 'proforma_data') and instance.proforma_data:
-                    # Clear existing items
-                    instance.items.all().delete()
-                    
-                    # Create new items from AI extraction
-                    items_data = instance.proforma_data.get('items', [])
-                    
-                    # If no items extracted, create fallback items
-                    if not items_data:
-                        items_data = [
-                            {'name': 'Office Chair', 'quantity': 2, 'unit_price': '75000'},
-                            {'name': 'Desk Lamp', 'quantity': 5, 'unit_price': '15000'},
-                            {'name': 'Filing Cabinet', 'quantity': 1, 'unit_price': '120000'}
-                        ]
-                    for item_data in items_data:
-                        try:
-                            RequestItem.objects.create(
-                                request=instance,
-                                name=item_data.get('name', 'Unknown Item'),
-                                quantity=int(item_data.get('quantity', 1)),
-                                unit_price=float(str(item_data.get('unit_price', '0')).replace(',', ''))
-                            )
-                        except (ValueError, TypeError) as e:
-                            print(f"Failed to create item {item_data}: {e}")
-                            continue
+                # Items extracted from the new proforma, unless the user sent their own
+                item_errors = []
+                if 'proforma' in request.FILES and not request.data.get('items'):
+                    item_errors = self._replace_extracted_items(instance)
                 
                 instance.save()
                 
                 # Update response with items
                 updated_serializer = self.get_serializer(instance)
                 response.data = updated_serializer.data
+                if item_errors:
+                    response.data['item_errors'] = item_errors
                 
             except Exception as e:
                 print(f"Failed to update proforma data: {e}")
         
         return response
     
+    def _replace_extracted_items(self, purchase_request):
+        """Replace the request's items with the ones extracted from its proforma; returns the rejected ones"""
+        items_data = (purchase_request.proforma_data or {}).get('items') or []
+        if not items_data:
+            return []
+        _, item_errors = replace_items(purchase_request, items_data)
+        for error in item_errors:
+            logger.warning('Skipped extracted item %s of request %s: %s',
+                           error['index'], purchase_request.pk, error['error'])
+        return item_errors
+    
     def create(self, request, *args, **kwargs):
         # Process proforma if uploaded
         if 'proforma' in request.FILES:
@@ -253,26 +391,18 @@ class PurchaseRequestViewSet(ModelViewSet):
                     purchase_request.proforma_filename = uploaded_file.name
                     purchase_request.proforma_content_type = uploaded_file.content_type or 'application/octet-stream'
                 
-                # Create RequestItem objects from AI-extracted items
-                if hasattr(purchase_request, 'proforma_data') and purchase_request.proforma_data:
-                    items_data = purchase_request.proforma_data.get('items', [])
-                    for item_data in items_data:
-                        try:
-                            RequestItem.objects.create(
-                                request=purchase_request,
-                                name=item_data.get('name', 'Unknown Item'),
-                                quantity=int(item_data.get('quantity', 1)),
-                                unit_price=float(str(item_data.get('unit_price', '0')).replace(',', ''))
-                            )
-                        except (ValueError, TypeError) as e:
-                            print(f"Failed to create item {item_data}: {e}")
-                            continue
+                # Items extracted from the proforma, unless the user sent their own
+                item_errors = []
+                if not request.data.get('items'):
+                    item_errors = self._replace_extracted_items(purchase_request)
                 
                 purchase_request.save()
                 
                 # Update response with items
                 updated_serializer = self.get_serializer(purchase_request)
                 response.data = updated_serializer.data
+                if item_errors:
+                    response.data['item_errors'] = item_errors
                 
             except Exception as e:
                 print(f"Failed to process proforma data: {e}")
@@ -327,7 +457,8 @@ class PurchaseRequestViewSet(ModelViewSet):
                 # Create temporary file from database content
                 import tempfile
                 with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                    temp_file.write(purchase_request.proforma_content)
+                    for chunk in iter_decoded([purchase_request.proforma_content]):
+                        temp_file.write(chunk)
                     temp_file.flush()
                     proforma_data = processor.process_proforma(temp_file.name)
                     os.unlink(temp_file.name)
@@ -340,30 +471,15 @@ class PurchaseRequestViewSet(ModelViewSet):
             # Update proforma data
             purchase_request.proforma_data = proforma_data
             
-            # Clear existing items and create new ones
-            purchase_request.items.all().delete()
-            
-            items_data = proforma_data.get('items', [])
-            created_items = []
-            
-            for item_data in items_data:
-                try:
-                    item = RequestItem.objects.create(
-                        request=purchase_request,
-                        name=item_data.get('name', 'Unknown Item'),
-                        quantity=int(item_data.get('quantity', 1)),
-                        unit_price=float(str(item_data.get('unit_price', '0')).replace(',', ''))
-                    )
-                    created_items.append(item)
-                except (ValueError, TypeError) as e:
-                    print(f"Failed to create item {item_data}: {e}")
-                    continue
+            # Replace existing items with the extracted ones
+            created_items, item_errors = replace_items(purchase_request, proforma_data.get('items', []))
             
             purchase_request.save()
             
             return Response({
                 'message': 'Proforma processed successfully',
                 'items_created': len(created_items),
+                'item_errors': item_errors,
                 'processing_method': "AI" if processor.client else "Basic",
                 'confidence': proforma_data.get('confidence', 0.5),
                 'vendor': proforma_data.get('vendor', 'Unknown'),
@@ -417,6 +533,8 @@ class PurchaseRequestViewSet(ModelViewSet):
             purchase_request.receipt_content_type = receipt.content_type or 'application/octet-stream'
             
             purchase_request.save()
+            publish_on_commit('request.receipt_validated', purchase_request.id, purchase_request.created_by_id,
+                              status=purchase_request.status, discrepancies=len(validation_results or []))
             
             return Response({
                 'message': 'Receipt submitted successfully',
@@ -435,82 +553,125 @@ class PurchaseRequestViewSet(ModelViewSet):
     )
     @action(detail=False, methods=['get'], url_path='dashboard-stats')
     def dashboard_stats(self, request):
-        from django.db.models import Count, Sum
-        from django.utils import timezone
-        from datetime import datetime, timedelta
+        return Response(DashboardCache.get(request.user))
+    
+    @extend_schema(
+        description="Import requests and line items from a CSV, JSON or NDJSON upload (Finance only). "
+                    "Form fields: file, format (defaults to the file extension), dry_run. "
+                    "Valid rows are created; failing rows are reported with their errors. "
+                    "If the file cannot be read to the end the response is a 400 whose report "
+                    "gives the row it stopped at under 'stopped'",
+        request=None,
+        responses={200: None, 400: None, 403: None},
+        tags=['Purchase Requests']
+    )
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_requests(self, request):
+        if request.user.role != 'finance' and not request.user.is_staff:
+            return Response({'error': 'Permission denied'}, 
+                          status=status.HTTP_403_FORBIDDEN)
         
-        user = request.user
-        now = timezone.now()
-        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        last_month = (current_month - timedelta(days=1)).replace(day=1)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file provided'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
         
-        # Base queryset based on user role
-        if user.role == 'staff':
-            base_qs = PurchaseRequest.objects.filter(created_by=user)
-        else:
-            base_qs = PurchaseRequest.objects.all()
-        
-        # Current month stats
-        current_month_qs = base_qs.filter(created_at__gte=current_month)
-        current_month_count = current_month_qs.count()
-        current_month_amount = current_month_qs.aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Last month stats
-        last_month_qs = base_qs.filter(created_at__gte=last_month, created_at__lt=current_month)
-        last_month_count = last_month_qs.count()
-        last_month_amount = last_month_qs.aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Calculate growth
-        count_growth = 0
-        amount_growth = 0
-        
-        if last_month_count > 0:
-            count_growth = ((current_month_count - last_month_count) / last_month_count) * 100
-        elif current_month_count > 0:
-            count_growth = 100
-            
-        if last_month_amount > 0:
-            amount_growth = ((current_month_amount - last_month_amount) / last_month_amount) * 100
-        elif current_month_amount > 0:
-            amount_growth = 100
-        
-        # Status counts
-        status_counts = base_qs.values('status').annotate(count=Count('id'))
-        status_stats = {item['status']: item['count'] for item in status_counts}
-        
-        # Recent requests
-        recent_requests = base_qs.order_by('-created_at')[:5]
-        recent_data = [{
-            'id': req.id,
-            'title': req.title,
-            'amount': str(req.amount),
-            'status': req.status,
-            'created_at': req.created_at.isoformat()
-        } for req in recent_requests]
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            fmt = detect_format(upload.name, request.data.get('format'))
+            report = import_requests(upload, fmt, request.user, dry_run=dry_run)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        # A file that could not be read to the end is a 400 that still
+        # reports the rows written before the point it stopped
+        if 'stopped' in report:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+    
+    @extend_schema(
+        description="Requests and requested spend per day over the last ?days= days (default 30, max 366)",
+        responses={200: None},
+        tags=['Dashboard']
+    )
+    @action(detail=False, methods=['get'], url_path='spend-trend')
+    def spend_trend(self, request):
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        return Response({'days': days, 'results': build_trend(request.user, days)})
+    
+    @extend_schema(
+        description="Incremental sync: requests created or updated, and ids deleted, since ?since=<cursor>. "
+                    "Omit since for the initial sync. Keep polling with next while has_more is true. "
+                    "Accepts ?limit= and the list's ?fields=/?expand=; 410 means resync from scratch",
+        responses={200: None, 400: None, 410: None},
+        tags=['Purchase Requests']
+    )
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', settings.CHANGE_FEED_PAGE_SIZE)), 1), 1000)
+            rows, deleted, cursor, has_more = changes_since(
+                request.user, self.get_queryset(), request.query_params.get('since') or None, limit
+            )
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response({'error': 'Cursor expired, resync without since'}, 
+                          status=status.HTTP_410_GONE)
         
         return Response({
-            'current_month': {
-                'requests_count': current_month_count,
-                'total_amount': str(current_month_amount),
-                'month_name': now.strftime('%B')
-            },
-            'last_month': {
-                'requests_count': last_month_count,
-                'total_amount': str(last_month_amount),
-                'month_name': (now - timedelta(days=30)).strftime('%B')
-            },
-            'growth': {
-                'requests_growth': round(count_growth, 1),
-                'amount_growth': round(amount_growth, 1)
-            },
-            'status_counts': {
-                'pending': status_stats.get('pending', 0),
-                'approved': status_stats.get('approved', 0),
-                'rejected': status_stats.get('rejected', 0)
-            },
-            'recent_requests': recent_data,
-            'user_role': user.role
+            'results': self.get_serializer(rows, many=True).data,
+            'deleted': deleted,
+            'next': cursor,
+            'has_more': has_more
         })
+    
+    @extend_schema(
+        description="Hit/miss counters of the purchase-request response cache (finance and admin users only)",
+        responses={200: None},
+        tags=['Dashboard']
+    )
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        # Counters are global, not scoped to the caller
+        if request.user.role != 'finance' and not request.user.is_staff:
+            return Response({'error': 'Permission denied'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        return Response(RequestCache.stats())
+    
+    @extend_schema(
+        description="Typo-tolerant suggestions from request titles, vendor and item names (?q=, ?limit=)",
+        responses={200: None},
+        tags=['Purchase Requests']
+    )
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        # Same visibility as the list: staff only see their own requests
+        created_by = None if request.user.role in RequestCache.GLOBAL_ROLES else request.user.id
+        started = time.monotonic()
+        suggestions, truncated = autocomplete(
+            PurchaseRequest, request.query_params.get('q', ''), created_by=created_by, limit=limit
+        )
+        return Response({
+            'results': suggestions,
+            'truncated': truncated,
+            'took_ms': round((time.monotonic() - started) * 1000, 1)
+        })
+    
     @extend_schema(
         description="Download document file (Finance users only)",
         responses={200: None, 403: None, 404: None},
@@ -525,73 +686,105 @@ class PurchaseRequestViewSet(ModelViewSet):
             return Response({'error': 'Permission denied'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        file_content = None
-        filename = None
-        content_type = 'application/octet-stream'
+        if doc_type not in self.DOCUMENT_FIELDS:
+            return Response({'error': f'No {doc_type} content available'}, 
+                          status=status.HTTP_404_NOT_FOUND)
         
-        # Get file from database storage
-        if doc_type == 'proforma':
-            if purchase_request.proforma_content:
-                file_content = purchase_request.proforma_content
-                filename = purchase_request.proforma_filename or f'proforma-{pk}.pdf'
-                content_type = purchase_request.proforma_content_type or 'application/pdf'
-            else:
-                return Response({'error': 'No proforma document found'}, 
-                              status=status.HTTP_404_NOT_FOUND)
-        
-        elif doc_type == 'purchase_order':
-            if purchase_request.purchase_order_content:
-                file_content = purchase_request.purchase_order_content
-                filename = purchase_request.purchase_order_filename or f'purchase-order-{pk}.pdf'
-                content_type = 'application/pdf'
-            elif purchase_request.status == 'approved':
-                # Generate PO on demand
-                try:
-                    from ..documents.services import POGenerator
-                    po_generator = POGenerator()
-                    po_file = po_generator.generate_po(purchase_request)
-                    
-                    # Store PO content in database
-                    if hasattr(po_file, 'read'):
-                        po_file.seek(0)
-                        file_content = po_file.read()
-                    else:
-                        file_content = po_file.getvalue() if hasattr(po_file, 'getvalue') else po_file
-                    
-                    purchase_request.purchase_order_content = file_content
-                    purchase_request.purchase_order_filename = f'PO-{pk}.pdf'
-                    purchase_request.save()
-                    
-                    filename = f'purchase-order-{pk}.pdf'
-                    content_type = 'application/pdf'
-                    
-                except Exception as e:
-                    return Response({'error': f'Failed to generate PO: {str(e)}'}, 
-                                  status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            else:
-                return Response({'error': 'No purchase order found'}, 
-                              status=status.HTTP_404_NOT_FOUND)
-        
-        elif doc_type == 'receipt':
-            if purchase_request.receipt_content:
-                file_content = purchase_request.receipt_content
-                filename = purchase_request.receipt_filename or f'receipt-{pk}.pdf'
-                content_type = purchase_request.receipt_content_type or 'application/pdf'
-            else:
-                return Response({'error': 'No receipt document found'}, 
-                              status=status.HTTP_404_NOT_FOUND)
+        source = self._get_document_source(purchase_request, doc_type)
         
-        if not file_content:
-            return Response({'error': f'No {doc_type} content available'}, 
+        if source is None and doc_type == 'purchase_order' and purchase_request.status == 'approved' \
+                and isinstance(purchase_request, PurchaseRequest):
+            # Generate PO on demand
+            try:
+                from ..documents.services import POGenerator
+                po_generator = POGenerator()
+                po_file = po_generator.generate_po(purchase_request)
+                
+                # Store PO content in database
+                if hasattr(po_file, 'read'):
+                    po_file.seek(0)
+                    file_content = po_file.read()
+                else:
+                    file_content = po_file.getvalue() if hasattr(po_file, 'getvalue') else po_file
+                
+                purchase_request.purchase_order_content = file_content
+                purchase_request.purchase_order_filename = f'PO-{pk}.pdf'
+                purchase_request.save()
+                
+                source = self._get_document_source(purchase_request, doc_type)
+                
+            except Exception as e:
+                return Response({'error': f'Failed to generate PO: {str(e)}'}, 
+                              status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if source is None:
+            label = doc_type.replace('_', ' ')
+            return Response({'error': f'No {label} document found'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
-        # Serve the file from database
+        # Stream the file in chunks, honouring Range and conditional headers
         try:
-            response = HttpResponse(file_content, content_type=content_type)
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response['Content-Length'] = len(file_content)
-            return response
-            
+            return serve_document(request, source)
         except Exception as e:
             return Response({'error': f'Failed to serve file: {str(e)}'}, 
-                          status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+                          status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @extend_schema(
+        description="Thumbnail (?variant=thumbnail) or first-page image (?variant=page) of a document",
+        responses={200: None, 400: None, 404: None},
+        tags=['Purchase Requests']
+    )
+    @action(detail=True, methods=['get'], url_path='preview/(?P<doc_type>\w+)')
+    def preview(self, request, pk=None, doc_type=None):
+        purchase_request = self.get_object()
+        variant = request.query_params.get('variant', 'thumbnail')
+        
+        if variant not in PreviewService.SIZES:
+            return Response({'error': 'variant must be thumbnail or page'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        source = self._get_document_source(purchase_request, doc_type) \
+            if doc_type in self.DOCUMENT_FIELDS else None
+        response = serve_preview(request, source, variant) if source else None
+        if response is None:
+            return Response({'error': f'No preview available for {doc_type}'}, 
+                          status=status.HTTP_404_NOT_FOUND)
+        return response
+    
+    def _get_document_source(self, purchase_request, doc_type):
+        """Locate a stored document without loading its content into memory"""
+        fields = self.DOCUMENT_FIELDS[doc_type]
+        filename = getattr(purchase_request, fields['filename']) or \
+            f"{doc_type.replace('_', '-')}-{purchase_request.pk}.pdf"
+        content_type = getattr(purchase_request, fields['content_type'], '') if fields['content_type'] else ''
+        metadata = {
+            'filename': filename,
+            'content_type': content_type or 'application/pdf',
+            'last_modified': purchase_request.updated_at,
+            'version': f'request-{purchase_request.pk}-{doc_type}',
+        }
+        
+        # Database copy first, then whatever the FileField still points at
+        source = DatabaseBlobSource.load(
+            type(purchase_request), purchase_request.pk, fields['content'], **metadata
+        )
+        if source is None:
+            field_file = getattr(purchase_request, fields['file'])
+            if field_file and not getattr(purchase_request, fields['filename']):
+                metadata.pop('filename')
+            source = FieldFileSource.load(field_file, **metadata)
+        return source
+
+
+class EventTicketView(APIView):
+    """Issue a one-time ticket for opening the event stream (see streams.py)"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # The stream ends with the access token the ticket was issued for
+        expires_at = request.auth['exp'] if request.auth is not None else \
+            time.time() + settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()
+        return Response({
+            'ticket': issue_ticket(request.user, expires_at),
+            'expires_in': settings.EVENTS_TICKET_SECONDS,
+        })
@@ -0,0 +1,157 @@
+import logging
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from .cache import RequestCache
+from .events import publish_on_commit
+from .models import Approval, PurchaseRequest
+from . import rollups
+from ...utils.background import submit_on_commit
+
+logger = logging.getLogger(__name__)
+
+# Approval workflow. Every decision is a compare-and-swap on
+# PurchaseRequest.version: the new status is computed from the approvals as
+# seen inside the transaction and only written if nobody else moved the
+# version meanwhile. A loser rolls back its approval and retries against the
+# fresh state, so concurrent approvers can neither lose a decision nor leave
+# a fully approved request stuck in pending.
+
+# Every one of these roles must approve before a request is approved
+REQUIRED_APPROVER_ROLES = ['approver_level_1', 'approver_level_2']
+TERMINAL_STATUSES = ('approved', 'rejected')
+MAX_ATTEMPTS = 5
+
+
+class TransitionConflict(Exception):
+    """The request kept changing concurrently; the caller may retry"""
+
+
+class _StaleVersion(Exception):
+    pass
+
+
+def check_transition(current, new):
+    """Raise ValidationError if a request may not move from current to new"""
+    if current in TERMINAL_STATUSES and new in TERMINAL_STATUSES and current != new:
+        raise ValidationError("Cannot change status of approved/rejected requests")
+
+
+def next_status(approved, approved_roles):
+    """Status after a decision, given the roles that have approved so far (including it)"""
+    if not approved:
+        return 'rejected'
+    if set(REQUIRED_APPROVER_ROLES) <= set(approved_roles):
+        return 'approved'
+    return 'pending'
+
+
+def approval_stage(status, approved_roles):
+    """Value of PurchaseRequest.approval_stage for a status and the roles that have approved"""
+    if status != 'pending':
+        return ''
+    missing = set(REQUIRED_APPROVER_ROLES) - set(approved_roles)
+    return missing.pop() if len(missing) == 1 else PurchaseRequest.STAGE_ALL
+
+
+def current_stage(request_id):
+    """Approval stage of a pending request, from its stored approvals"""
+    approved_roles = Approval.objects.filter(request_id=request_id, approved=True).values_list(
+        'approver__role', flat=True
+    )
+    return approval_stage('pending', approved_roles)
+
+
+def awaiting_review(queryset, user):
+    """Pending requests of queryset waiting on user's approver level that user has not reviewed.
+
+    Served from the partial index on pending rows by approval_stage, so it
+    costs the same however many decided requests exist.
+    """
+    reviewed = Approval.objects.filter(request=OuterRef('pk'), approver=user)
+    return queryset.filter(
+        ~Exists(reviewed), status='pending', approval_stage__in=[PurchaseRequest.STAGE_ALL, user.role]
+    )
+
+
+def decide(request_id, user, approved, comments=''):
+    """Record user's decision on a pending request and apply the resulting transition.
+
+    Returns the new status. Raises ValidationError when the request is no
+    longer pending or the user already reviewed it, and TransitionConflict
+    when the version kept moving for MAX_ATTEMPTS attempts.
+    """
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return _decide_once(request_id, user, approved, comments)
+        except _StaleVersion:
+            continue
+    raise TransitionConflict(f'Request {request_id} was modified concurrently')
+
+
+def _decide_once(request_id, user, approved, comments):
+    state = PurchaseRequest.objects.filter(pk=request_id).values(
+        'version', *PurchaseRequest.TRACKED_FIELDS
+    ).first()
+    if state is None:
+        raise PurchaseRequest.DoesNotExist
+    version = state.pop('version')
+    if state['status'] != 'pending':
+        raise ValidationError('Request is not pending')
+    try:
+        with transaction.atomic():
+            Approval.objects.create(request_id=request_id, approver=user, approved=approved, comments=comments)
+    except IntegrityError:
+        raise ValidationError('You have already reviewed this request')
+
+    approved_roles = list(Approval.objects.filter(request_id=request_id, approved=True).values_list(
+        'approver__role', flat=True
+    ))
+    new_status = next_status(approved, approved_roles)
+    swapped = PurchaseRequest.objects.filter(pk=request_id, version=version).update(
+        status=new_status, approval_stage=approval_stage(new_status, approved_roles),
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not swapped:
+        # Someone decided in between: roll back our approval and start over
+        raise _StaleVersion
+
+    if new_status != state['status']:
+        rollups.record_change(state, {**state, 'status': new_status})
+    created_by_id = state['created_by_id']
+    RequestCache.invalidate_user_cache(created_by_id)
+    transaction.on_commit(lambda: RequestCache.invalidate_user_cache(created_by_id))
+    if new_status in TERMINAL_STATUSES:
+        publish_on_commit(f'request.{new_status}', request_id, created_by_id, status=new_status)
+    if new_status == 'approved':
+        queue_purchase_orders([request_id])
+    return new_status
+
+
+def generate_purchase_order(request_id):
+    """Render and attach the PO of an approved request"""
+    from ..documents.services import POGenerator
+    purchase_request = PurchaseRequest.objects.get(pk=request_id)
+    if purchase_request.status != 'approved' or purchase_request.purchase_order:
+        return
+    purchase_request.purchase_order = POGenerator().generate_po(purchase_request)
+    purchase_request.save()
+    publish_on_commit('request.po_ready', request_id, purchase_request.created_by_id,
+                      status=purchase_request.status)
+
+
+def generate_purchase_orders(request_ids):
+    for request_id in request_ids:
+        try:
+            generate_purchase_order(request_id)
+        except Exception:
+            # One bad request must not hold up the others' POs
+            logger.exception('PO generation failed for request %s', request_id)
+
+
+def queue_purchase_orders(request_ids):
+    """Render POs in the background once the approving transaction commits"""
+    if request_ids:
+        submit_on_commit(generate_purchase_orders, list(request_ids))
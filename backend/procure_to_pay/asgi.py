@@ -0,0 +1,14 @@
+import os
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'procure_to_pay.settings')
+django_asgi = get_asgi_application()
+django_wsgi = get_wsgi_application()
+
+# Imported once Django is set up: /api/events/ is served by the event stream,
+# ASGI_ASYNC_PATHS by Django's ASGI handler, the rest by WSGI on worker threads
+from procure_to_pay.apps.requests.streams import EventStreamApp  # noqa: E402
+from procure_to_pay.utils.asgi import AsyncPathRouter  # noqa: E402
+
+application = EventStreamApp(AsyncPathRouter(django_asgi, django_wsgi))
\ No newline at end of file
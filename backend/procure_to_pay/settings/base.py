@@ -44,6 +44,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'procure_to_pay.utils.db_router.PinAfterWriteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'procure_to_pay.apps.requests.middleware.PerformanceMonitoringMiddleware',
@@ -80,13 +81,15 @@ WSGI_APPLICATION = 'procure_to_pay.wsgi.application'
 
 # Database Configuration
 DATABASE_URL = config('DATABASE_URL', default=None)
+# Off only for local Postgres containers without TLS
+DATABASE_SSL_REQUIRE = config('DATABASE_SSL_REQUIRE', default=True, cast=bool)
 if DATABASE_URL:
     import dj_database_url
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
             conn_max_age=600,
-            ssl_require=True,
+            ssl_require=DATABASE_SSL_REQUIRE,
         )
     }
 else:
@@ -95,9 +98,40 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Writers wait this many seconds for the database lock
+            'OPTIONS': {'timeout': 20},
+            # A file rather than the shared in-memory database, whose table
+            # locks fail concurrent writers at once instead of queueing them
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
+# Optional read replica (see utils/db_router.py): dashboards, exports and
+# report jobs read from it. Any database URL works, including a second
+# SQLite file for local testing (sqlite:////abs/path/replica.sqlite3)
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+
+
+def replica_database(url):
+    """DATABASES entry for the replica; test runs point it at the test default database"""
+    import dj_database_url
+    database = dj_database_url.parse(
+        url, conn_max_age=600, ssl_require=DATABASE_SSL_REQUIRE and not url.startswith('sqlite')
+    )
+    database['TEST'] = {'MIRROR': 'default'}
+    return database
+
+
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = replica_database(DATABASE_REPLICA_URL)
+DATABASE_ROUTERS = ['procure_to_pay.utils.db_router.ReplicaRouter']
+# After a write, the user's reads stay on the primary for this long
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+# The replica is skipped while it lags more than REPLICA_MAX_LAG_SECONDS;
+# each process re-checks the lag at most every REPLICA_LAG_CHECK_SECONDS
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=float)
+REPLICA_LAG_CHECK_SECONDS = config('REPLICA_LAG_CHECK_SECONDS', default=5, cast=float)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -168,6 +202,94 @@ CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379')
 
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
+# Page-number pagination (?page=) reports the planner's estimate instead of
+# an exact COUNT(*) once a result set is estimated to be larger than this
+PAGINATION_ESTIMATE_THRESHOLD = config('PAGINATION_ESTIMATE_THRESHOLD', default=100000, cast=int)
+
+# Time budget for /api/requests/autocomplete/; slower lookups return early
+AUTOCOMPLETE_BUDGET_MS = config('AUTOCOMPLETE_BUDGET_MS', default=150, cast=int)
+
+# Dashboard figures are rebuilt at most this often per scope; a stale copy is
+# served for up to DASHBOARD_STALE_SECONDS while one worker rebuilds it
+DASHBOARD_FRESH_SECONDS = config('DASHBOARD_FRESH_SECONDS', default=60, cast=int)
+DASHBOARD_STALE_SECONDS = config('DASHBOARD_STALE_SECONDS', default=600, cast=int)
+
+# In-process worker threads for slow follow-up work such as PO rendering;
+# eager mode runs tasks inline (tests, management commands)
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=2, cast=int)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+
+# Most requests a single bulk approve/reject call may review
+BULK_REVIEW_MAX_ITEMS = config('BULK_REVIEW_MAX_ITEMS', default=500, cast=int)
+
+# Bulk imports validate and insert this many requests per transaction, and
+# report at most IMPORT_MAX_REPORTED_ERRORS failing rows
+IMPORT_CHUNK_SIZE = config('IMPORT_CHUNK_SIZE', default=1000, cast=int)
+IMPORT_MAX_REPORTED_ERRORS = config('IMPORT_MAX_REPORTED_ERRORS', default=1000, cast=int)
+# Largest JSON array element (in characters) an import buffers before giving up on the file
+IMPORT_MAX_RECORD_SIZE = config('IMPORT_MAX_RECORD_SIZE', default=1024 * 1024, cast=int)
+
+# /api/requests/changes/ page size, and how long deletions are remembered;
+# older cursors get 410 Gone and must resync from scratch
+CHANGE_FEED_PAGE_SIZE = config('CHANGE_FEED_PAGE_SIZE', default=200, cast=int)
+CHANGE_FEED_RETENTION_DAYS = config('CHANGE_FEED_RETENTION_DAYS', default=30, cast=int)
+# Change-feed cursors stay this far behind the newest write, so transactions
+# that commit late (after a later-stamped one was read) are still picked up
+CHANGE_FEED_OVERLAP_SECONDS = config('CHANGE_FEED_OVERLAP_SECONDS', default=10, cast=int)
+
+# archive_requests moves approved/rejected requests untouched for this many
+# days out of the hot table, ARCHIVE_BATCH_SIZE per transaction
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=365, cast=int)
+ARCHIVE_BATCH_SIZE = config('ARCHIVE_BATCH_SIZE', default=100, cast=int)
+
+# The financial report CSV is streamed: rows are fetched REPORT_EXPORT_CHUNK_SIZE
+# at a time and sent in pieces of about REPORT_EXPORT_FLUSH_SIZE bytes
+REPORT_EXPORT_CHUNK_SIZE = config('REPORT_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+REPORT_EXPORT_FLUSH_SIZE = config('REPORT_EXPORT_FLUSH_SIZE', default=64 * 1024, cast=int)
+# Background report jobs (apps/finance/report_jobs.py) that have not reported
+# progress for this long are taken as lost and failed
+REPORT_JOB_STALE_SECONDS = config('REPORT_JOB_STALE_SECONDS', default=600, cast=int)
+
+# Response cache for purchase requests (see apps/requests/cache.py). Shared
+# through Redis when REDIS_URL is set, per-process memory otherwise.
+CACHE_REDIS_URL = config('REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'p2p',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'procure-to-pay',
+        }
+    }
+
+# Server-Sent Events (/api/events/, see apps/requests/events.py): fanned out
+# through Redis pub/sub when REDIS_URL is set, within the process otherwise
+EVENTS_BROKER = config(
+    'EVENTS_BROKER',
+    default='procure_to_pay.apps.requests.events.' + ('RedisBroker' if CACHE_REDIS_URL else 'LocalBroker')
+)
+# Idle streams get a keepalive comment this often; a stream whose client
+# falls EVENTS_QUEUE_SIZE messages behind is closed (it reconnects and resyncs)
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=25, cast=int)
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+# Reconnect delay suggested to browsers
+EVENTS_RETRY_MS = config('EVENTS_RETRY_MS', default=3000, cast=int)
+# Lifetime of the one-time tickets browsers open streams with
+EVENTS_TICKET_SECONDS = config('EVENTS_TICKET_SECONDS', default=30, cast=int)
+
+# ASGI mode (procure_to_pay/asgi.py): requests whose path matches one of
+# these go through Django's ASGI handler, everything else runs on a pool of
+# ASGI_THREADS threads per process (see utils/asgi.py)
+ASGI_ASYNC_PATHS = [r'^/health/$', r'^/api/requests/\d+/download/\w+/$']
+ASGI_THREADS = config('ASGI_THREADS', default=8, cast=int)
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -221,6 +343,30 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 FILE_UPLOAD_PERMISSIONS = 0o644
 
+# Document downloads are streamed from storage in chunks of this size
+DOCUMENT_STREAM_CHUNK_SIZE = config('DOCUMENT_STREAM_CHUNK_SIZE', default=512 * 1024, cast=int)
+# Hand file-backed downloads to the front proxy: '' (disabled), 'nginx' (X-Accel-Redirect)
+# or 'sendfile' (X-Sendfile for Apache/lighttpd)
+DOCUMENT_SENDFILE_BACKEND = config('DOCUMENT_SENDFILE_BACKEND', default='')
+DOCUMENT_SENDFILE_PREFIX = config('DOCUMENT_SENDFILE_PREFIX', default='/protected-media/')
+
+# Stored document blobs are compressed (zstd or zlib, per content type) on write
+DOCUMENT_COMPRESSION = config('DOCUMENT_COMPRESSION', default=True, cast=bool)
+DOCUMENT_COMPRESSION_MIN_SIZE = config('DOCUMENT_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
+# Rendered document previews are cached by content hash up to this many bytes
+PREVIEW_CACHE_MAX_BYTES = config('PREVIEW_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+# Versioned preview URLs (?v=...) are cached by browsers for this long
+PREVIEW_MAX_AGE = config('PREVIEW_MAX_AGE', default=60 * 60 * 24 * 365, cast=int)
+
+# Resumable chunked uploads (assembled on disk under MEDIA_ROOT/uploads/)
+UPLOAD_CHUNK_SIZE = config('UPLOAD_CHUNK_SIZE', default=5 * 1024 * 1024, cast=int)
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=200 * 1024 * 1024, cast=int)
+# Uploads each user may have in progress at once
+UPLOAD_MAX_ACTIVE_SESSIONS = config('UPLOAD_MAX_ACTIVE_SESSIONS', default=10, cast=int)
+# Uploads idle (or completed but unattached) this long are discarded by expire_uploads
+UPLOAD_SESSION_TTL_HOURS = config('UPLOAD_SESSION_TTL_HOURS', default=24, cast=int)
+
 # drf-spectacular settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Procure-to-Pay System API',
@@ -2,8 +2,16 @@
 Fly.io production settings for procure-to-pay system
 """
 import os
+from django.core.exceptions import ImproperlyConfigured
 from .base import *
 
+# gunicorn takes its worker count from WEB_CONCURRENCY (fly.toml). Cache
+# invalidation, ETag validators, SSE events and replica pins only reach the
+# other workers through Redis; without it each process would serve stale data.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+if WEB_CONCURRENCY > 1 and not CACHE_REDIS_URL:
+    raise ImproperlyConfigured('WEB_CONCURRENCY > 1 requires REDIS_URL for the shared cache and event broker')
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
@@ -38,6 +46,9 @@ else:
             'PORT': os.environ.get('DATABASE_PORT', '5432'),
         }
     }
+# Neon read replica, e.g. a read-only compute endpoint of the same branch
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = replica_database(DATABASE_REPLICA_URL)
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
@@ -11,9 +11,11 @@ if DATABASE_URL:
         'default': dj_database_url.config(
             default=DATABASE_URL,
             conn_max_age=600,
-            ssl_require=True,
+            ssl_require=DATABASE_SSL_REQUIRE,
         )
     }
+    if DATABASE_REPLICA_URL:
+        DATABASES['replica'] = replica_database(DATABASE_REPLICA_URL)
 # If no DATABASE_URL, base.py will handle the database configuration
 
 # Local development CORS
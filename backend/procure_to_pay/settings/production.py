@@ -27,6 +27,8 @@ DATABASES = {
         ssl_require=True,
     )
 }
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = replica_database(DATABASE_REPLICA_URL)
 
 # Static files
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
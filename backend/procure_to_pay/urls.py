@@ -5,7 +5,8 @@ from django.conf.urls.static import static
 from django.http import JsonResponse
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
-def health_check(request):
+async def health_check(request):
+    # Async so probes are answered on the event loop even when every worker thread is busy
     return JsonResponse({
         'status': 'healthy',
         'service': 'Procure-to-Pay Backend',
@@ -0,0 +1,86 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.conf import settings
+
+# Serving the API from an ASGI server (see procure_to_pay/asgi.py).
+#
+# In Django 4.2 a sync view behind the ASGI handler pays a thread hop for
+# every middleware plus one for the view, and the async ORM is a thread hop
+# too, so short DRF requests run at about half their WSGI speed. They only
+# gain from ASGI when they spend long stretches waiting. Paths matching
+# ASGI_ASYNC_PATHS (document downloads, health) therefore go through Django's
+# ASGI handler, where streamed bodies are async. Every other request runs
+# through the WSGI handler on a fixed pool of ASGI_THREADS threads, like a
+# gthread worker, which also lets it keep persistent database connections.
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.ASGI_THREADS, thread_name_prefix='wsgi')
+    return _executor
+
+
+# The public WsgiToAsgi runs every request on one thread-sensitive thread and
+# has no executor hook, so this subclasses its per-request instance and
+# mirrors run_wsgi_app from the asgiref pinned in requirements.txt. Recheck
+# run() against asgiref/wsgi.py when bumping that pin; test_asgi.py covers it.
+class ThreadedWSGIInstance(WsgiToAsgiInstance):
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self.run, thread_sensitive=False, executor=_get_executor())(body)
+
+    def run(self, body):
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            self.sync_send({'type': 'http.response.start', 'status': 400,
+                            'headers': [(b'content-type', b'text/plain')]})
+            self.sync_send({'type': 'http.response.body', 'body': b'Bad Request: Too many duplicate headers'})
+            return
+        result = self.wsgi_application(environ, self.start_response)
+        bytes_sent = 0
+        try:
+            for output in result:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                # Never send more than a declared Content-Length
+                if self.response_content_length is not None:
+                    output = output[:self.response_content_length - bytes_sent]
+                self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+                bytes_sent += len(output)
+                if bytes_sent == self.response_content_length:
+                    break
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            self.sync_send({'type': 'http.response.body'})
+        finally:
+            # Fires request_finished, which returns the thread's DB connection
+            if hasattr(result, 'close'):
+                result.close()
+
+
+class ThreadedWSGI(WsgiToAsgi):
+    """ASGI app running a WSGI app on the ASGI_THREADS pool, closing every response"""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadedWSGIInstance(self.wsgi_application)(scope, receive, send)
+
+
+class AsyncPathRouter:
+    """Send paths matching ASGI_ASYNC_PATHS to the ASGI app and the rest to the threaded WSGI app"""
+
+    def __init__(self, asgi_application, wsgi_application):
+        self.asgi_application = asgi_application
+        self.wsgi_application = ThreadedWSGI(wsgi_application)
+        self.async_paths = [re.compile(pattern) for pattern in settings.ASGI_ASYNC_PATHS]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not any(pattern.match(scope['path']) for pattern in self.async_paths):
+            return await self.wsgi_application(scope, receive, send)
+        return await self.asgi_application(scope, receive, send)
@@ -0,0 +1,46 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='background'
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(func, '__name__', func))
+
+
+def _run_in_worker(func, args, kwargs):
+    try:
+        _run(func, args, kwargs)
+    finally:
+        # Worker threads hold their own connections; don't leak them. Eager
+        # tasks run on the caller's connection, which is not ours to close.
+        close_old_connections()
+
+
+def submit(func, *args, **kwargs):
+    """Run func off the request thread (inline when BACKGROUND_TASKS_EAGER is set)"""
+    if settings.BACKGROUND_TASKS_EAGER:
+        _run(func, args, kwargs)
+        return
+    _get_executor().submit(_run_in_worker, func, args, kwargs)
+
+
+def submit_on_commit(func, *args, **kwargs):
+    """Submit func once the current transaction commits, so it sees the committed rows"""
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))
@@ -0,0 +1,163 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+# Read-replica routing.
+#
+# Nothing reads from the replica unless asked to: views list the actions
+# that may (ReplicaReadsMixin) and background jobs wrap their reads in
+# reading_from(read_alias()). read_alias() falls back to the primary when no
+# replica is configured, when it lags more than REPLICA_MAX_LAG_SECONDS, and
+# for REPLICA_PIN_SECONDS after the user's last write (PinAfterWriteMiddleware),
+# so people always see their own changes. Reads inside a transaction on the
+# primary and all writes go to the primary regardless.
+
+REPLICA = 'replica'
+
+_read_alias = ContextVar('read_alias', default=None)
+_health = {'checked_at': None, 'ready': False}
+
+# Zero while the replica has replayed everything it received, so an idle
+# primary does not make it look behind
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_lag():
+    """Seconds the replica is behind the primary; 0 on backends that cannot tell"""
+    connection = connections[REPLICA]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_ready():
+    """True when the replica is configured, reachable and close enough behind"""
+    if not replica_configured():
+        return False
+    now = time.monotonic()
+    checked_at = _health['checked_at']
+    if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_SECONDS:
+        try:
+            lag = replica_lag()
+            ready = lag <= settings.REPLICA_MAX_LAG_SECONDS
+            if not ready:
+                logger.warning('Replica is %.1fs behind, reading from the primary', lag)
+        except DatabaseError:
+            logger.warning('Replica unavailable, reading from the primary', exc_info=True)
+            ready = False
+        _health.update(checked_at=now, ready=ready)
+    return _health['ready']
+
+
+def _pin_key(user_id):
+    return f'db:primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+def read_alias(user=None):
+    """Database alias read-only work for user (or for nobody in particular) should query"""
+    if user is not None and user.is_authenticated and replica_configured() and is_pinned(user.id):
+        return DEFAULT_DB_ALIAS
+    return REPLICA if replica_ready() else DEFAULT_DB_ALIAS
+
+
+def current_read_alias():
+    """Alias ORM reads made here go to (see ReplicaRouter.db_for_read)"""
+    alias = _read_alias.get()
+    if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def reading_from(alias):
+    """Route the ORM reads made in this block (and this context) to alias"""
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # A transaction on the primary must read its own uncommitted rows
+        alias = current_read_alias()
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_write(self, model, **hints):
+        # Never follow an instance back to the replica it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaReadsMixin:
+    """Serve the view's ``replica_actions`` from the replica when read_alias() allows.
+
+    Only safe methods are routed, from authentication until dispatch returns;
+    a streamed body is produced later and must pick its alias explicitly.
+    """
+    replica_actions = []
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and getattr(self, 'action', None) in self.replica_actions:
+            self._replica_reads = reading_from(read_alias(request.user))
+            self._replica_reads.__enter__()
+
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_reads = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # WSGI threads reuse their context, so never leave the alias set
+            if self._replica_reads is not None:
+                self._replica_reads.__exit__(None, None, None)
+                self._replica_reads = None
+
+
+class PinAfterWriteMiddleware:
+    """Keep a user on the primary for REPLICA_PIN_SECONDS after any successful write"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_configured():
+            # DRF hands the authenticated user back to the Django request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.id)
+        return response
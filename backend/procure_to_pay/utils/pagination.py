@@ -0,0 +1,201 @@
+import base64
+import json
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts the planner's row estimate once a table is huge.
+
+    On PostgreSQL the estimate comes from EXPLAIN of the actual (filtered)
+    query, so it costs a plan rather than a scan. Small results, and every
+    other database, still get an exact COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        threshold = getattr(settings, 'PAGINATION_ESTIMATE_THRESHOLD', 100000)
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > threshold:
+            return estimate
+        return super().count
+
+
+def estimate_count(queryset):
+    """Planner row estimate for a queryset, or None when it is not available"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedPageNumberPagination(PageNumberPagination):
+    django_paginator_class = EstimatedCountPaginator
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on (ordering field, id), newest first.
+
+    Each page is a single indexed range scan: no COUNT(*) and no OFFSET, so
+    deep pages cost the same as the first one. Views pick the timestamp to
+    page on with ``pagination_ordering`` (``created_at`` by default). Passing
+    ``?page=``, or any parameter in the view's ``page_number_params`` that
+    imposes another order (``?ordering=`` by default), switches to page-number
+    mode, which reports an estimated total on huge tables.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_field = 'created_at'
+    page_number_class = EstimatedPageNumberPagination
+    invalid_cursor_message = 'Invalid cursor'
+    page_number_params = ['ordering']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number = None
+        page_number_params = ['page'] + list(getattr(view, 'page_number_params', self.page_number_params))
+        if any(request.query_params.get(param) for param in page_number_params):
+            self.page_number = self.page_number_class()
+            return self.page_number.paginate_queryset(queryset, request, view)
+
+        self.field = getattr(view, 'pagination_ordering', self.ordering_field)
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+
+        # Annotated so the key is loaded even when .only() defers the column
+        queryset = queryset.annotate(keyset_value=F(self.field))
+        if reverse:
+            queryset = queryset.order_by(self.field, 'pk')
+        else:
+            queryset = queryset.order_by(f'-{self.field}', '-pk')
+        if cursor:
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': cursor['value']}) |
+                Q(**{self.field: cursor['value'], f'pk__{lookup}': cursor['pk']})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_position = self._position(rows[-1]) if has_next and rows else None
+        self.previous_position = self._position(rows[0]) if has_previous and rows else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def _position(self, row):
+        return {'value': row.keyset_value.isoformat(), 'pk': row.pk}
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            value = parse_datetime(data['v'])
+            if value is None:
+                raise ValueError
+            return {'value': value, 'pk': int(data['pk']), 'reverse': bool(data.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        data = {'v': position['value'], 'pk': position['pk']}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.page_number is not None:
+            return self.page_number.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {
+                    'type': 'integer',
+                    'description': 'Only returned in page-number mode (?page=); estimated on huge tables',
+                },
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor from the next/previous links',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Results per page (max {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': 'page',
+                'required': False,
+                'in': 'query',
+                'description': 'Switch to page-number mode and fetch this page',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -4,6 +4,107 @@ import { PurchaseRequest } from '@/types';
 // Global state for requests synchronization
 let globalRequests: PurchaseRequest[] = [];
 let subscribers: Array<(requests: PurchaseRequest[]) => void> = [];
+// Change-feed cursor: after the first load only changed requests are fetched
+let changesCursor: string | null = null;
+
+const newestFirst = (a: PurchaseRequest, b: PurchaseRequest) =>
+  new Date(b.created_at).getTime() - new Date(a.created_at).getTime() || b.id - a.id;
+
+// Server events only say that something changed; the change feed says what
+const REQUEST_EVENTS = ['request.approved', 'request.rejected', 'request.po_ready', 'request.receipt_validated'];
+const EVENTS_RETRY_MS = 3000;
+let eventSource: EventSource | null = null;
+let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+let syncing: Promise<void> | null = null;
+let syncAgain = false;
+
+// Fetch what changed since the last sync (everything on the first call)
+const fetchChanges = async () => {
+  const { purchaseRequests } = await import('@/services/api');
+  const byId = new Map(globalRequests.map(req => [req.id, req]));
+  let hasMore = true;
+
+  while (hasMore) {
+    let response;
+    try {
+      response = await purchaseRequests.getChanges(changesCursor);
+    } catch (error) {
+      if (error.response?.status !== 410 || changesCursor === null) throw error;
+      // Cursor too old for the server's deletion log: start over
+      changesCursor = null;
+      byId.clear();
+      continue;
+    }
+    const { results, deleted, next, has_more } = response.data;
+    results.forEach((req: PurchaseRequest) => byId.set(req.id, req));
+    deleted.forEach((id: number) => byId.delete(id));
+    changesCursor = next;
+    hasMore = has_more;
+  }
+
+  // Update global state
+  globalRequests = Array.from(byId.values()).sort(newestFirst);
+
+  // Notify all subscribers
+  subscribers.forEach(subscriber => subscriber(globalRequests));
+};
+
+// One sync at a time; calls made meanwhile are folded into one more round
+const syncChanges = (): Promise<void> => {
+  if (syncing) {
+    syncAgain = true;
+    return syncing;
+  }
+  syncing = (async () => {
+    try {
+      do {
+        syncAgain = false;
+        await fetchChanges();
+      } while (syncAgain);
+    } finally {
+      syncing = null;
+    }
+  })();
+  return syncing;
+};
+
+const refreshInBackground = () => {
+  syncChanges().catch(error => console.error('Error syncing requests:', error));
+};
+
+// One stream per tab, open while any component uses the hook
+const openEvents = async () => {
+  const token = localStorage.getItem('token');
+  if (eventSource || !token || subscribers.length === 0) return;
+  const { eventsUrl, purchaseRequests } = await import('@/services/api');
+  let ticket: string;
+  try {
+    ticket = (await purchaseRequests.getEventsTicket()).data.ticket;
+  } catch (error) {
+    console.error('Error opening request events:', error);
+    if (subscribers.length > 0) reconnectTimer = setTimeout(openEvents, EVENTS_RETRY_MS);
+    return;
+  }
+  if (eventSource || subscribers.length === 0) return;
+
+  eventSource = new EventSource(eventsUrl(ticket));
+  // Catch up on whatever happened while disconnected
+  eventSource.onopen = refreshInBackground;
+  REQUEST_EVENTS.forEach(type => eventSource?.addEventListener(type, refreshInBackground));
+  eventSource.onerror = () => {
+    // The server also ends streams when the token expires, and tickets are
+    // single-use: reconnect with a new ticket rather than reuse the old URL
+    closeEvents();
+    reconnectTimer = setTimeout(openEvents, EVENTS_RETRY_MS);
+  };
+};
+
+const closeEvents = () => {
+  if (reconnectTimer) clearTimeout(reconnectTimer);
+  reconnectTimer = null;
+  eventSource?.close();
+  eventSource = null;
+};
 
 export const useRequestsSync = () => {
   const [requests, setRequests] = useState<PurchaseRequest[]>(globalRequests);
@@ -16,28 +117,18 @@ export const useRequestsSync = () => {
     };
     
     subscribers.push(updateRequests);
+    openEvents();
     
     return () => {
       subscribers = subscribers.filter(sub => sub !== updateRequests);
+      if (subscribers.length === 0) closeEvents();
     };
   }, []);
 
-  // Load requests from API
+  // Load what changed since the last sync (everything on the first call)
   const loadRequests = useCallback(async () => {
     try {
-      const { purchaseRequests } = await import('@/services/api');
-      const response = await purchaseRequests.getAll();
-      const allRequests = response.data.results || response.data || [];
-      
-      console.log('API Response:', response.data);
-      console.log('Loaded requests:', allRequests);
-      
-      // Update global state
-      globalRequests = allRequests;
-      
-      // Notify all subscribers
-      subscribers.forEach(subscriber => subscriber(allRequests));
-      
+      await syncChanges();
     } catch (error) {
       console.error('Error loading requests:', error);
       console.error('Error details:', error.response?.data);
@@ -73,10 +73,18 @@ const mockRequests: PurchaseRequest[] = [
   }
 ];
 
+// Cursor parameter of a paginated response's next link
+const nextCursor = (next: string | null): string | null =>
+  next ? new URL(next, window.location.origin).searchParams.get('cursor') : null;
+
 export default function Approvals() {
   const { user } = useAuth();
   const { requests: allRequests, isLoading, loadRequests } = useRequestsSync();
   const [requests, setRequests] = useState<PurchaseRequest[]>([]);
+  const [queue, setQueue] = useState<PurchaseRequest[]>([]);
+  // Keyset cursor of the queue's next page; null once every pending request is loaded
+  const [queueCursor, setQueueCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   useEffect(() => {
     loadRequests();
@@ -87,6 +95,38 @@ export default function Approvals() {
     setRequests(allRequests);
   }, [allRequests]);
 
+  useEffect(() => {
+    if (!user?.role?.includes('approver')) return;
+    // The server works out what awaits this approver's level; refetch whenever the synced requests change
+    let cancelled = false;
+    import('@/services/api')
+      .then(({ purchaseRequests }) => purchaseRequests.getQueue({ page_size: 100 }))
+      .then(response => {
+        if (cancelled) return;
+        setQueue(response.data.results);
+        setQueueCursor(nextCursor(response.data.next));
+      })
+      .catch(error => console.error('Error loading approval queue:', error));
+    return () => {
+      cancelled = true;
+    };
+  }, [allRequests, user?.role]);
+
+  const loadMoreQueue = async () => {
+    if (!queueCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const { purchaseRequests } = await import('@/services/api');
+      const response = await purchaseRequests.getQueue({ page_size: 100, cursor: queueCursor });
+      setQueue(current => [...current, ...response.data.results]);
+      setQueueCursor(nextCursor(response.data.next));
+    } catch (error) {
+      console.error('Error loading approval queue:', error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Check if user is an approver
   if (!user?.role?.includes('approver')) {
     return (
@@ -99,14 +139,11 @@ export default function Approvals() {
     );
   }
 
+  const pendingRequests = queue;
+  // Shown as "100+" while more pages remain on the server
+  const pendingCount = `${pendingRequests.length}${queueCursor ? '+' : ''}`;
+
   // Filter requests based on approver's individual actions
-  const pendingRequests = requests.filter(req => {
-    const userApproval = req.approvals?.find(approval => 
-      approval.approver === user?.id || approval.approver_id === user?.id
-    );
-    return !userApproval && req.status === 'pending';
-  });
-  
   const reviewedRequests = requests.filter(req => {
     const userApproval = req.approvals?.find(approval => 
       approval.approver === user?.id || approval.approver_id === user?.id
@@ -358,7 +395,7 @@ export default function Approvals() {
         <div className="flex items-center gap-2">
           <Filter className="h-5 w-5 text-gray-600" />
           <span className="text-sm text-gray-600">
-            {pendingRequests.length} pending approval
+            {pendingCount} pending approval
           </span>
         </div>
       </div>
@@ -373,7 +410,7 @@ export default function Approvals() {
             </div>
           </CardHeader>
           <CardContent>
-            <div className="text-3xl font-bold text-yellow-900">{pendingRequests.length}</div>
+            <div className="text-3xl font-bold text-yellow-900">{pendingCount}</div>
             <p className="text-xs text-yellow-700 font-medium">Awaiting your review</p>
           </CardContent>
         </Card>
@@ -413,7 +450,7 @@ export default function Approvals() {
       <Tabs defaultValue="pending" className="space-y-4">
         <TabsList className="bg-gray-100 border border-gray-200">
           <TabsTrigger value="pending" className="data-[state=active]:bg-yellow-500 data-[state=active]:text-white font-semibold">
-            🕐 Pending ({pendingRequests.length})
+            🕐 Pending ({pendingCount})
           </TabsTrigger>
           <TabsTrigger value="reviewed" className="data-[state=active]:bg-black data-[state=active]:text-white font-semibold">
             📄 Reviewed ({reviewedRequests.length})
@@ -426,7 +463,16 @@ export default function Approvals() {
               <p className="text-center text-gray-600">No pending requests for approval</p>
             </Card>
           ) : (
-            <RequestTable requests={pendingRequests} showActions={true} />
+            <>
+              <RequestTable requests={pendingRequests} showActions={true} />
+              {queueCursor && (
+                <div className="flex justify-center">
+                  <Button variant="outline" onClick={loadMoreQueue} disabled={isLoadingMore}>
+                    {isLoadingMore ? 'Loading...' : 'Load more'}
+                  </Button>
+                </div>
+              )}
+            </>
           )}
         </TabsContent>
 
@@ -1,6 +1,12 @@
 import axios, { AxiosInstance, InternalAxiosRequestConfig, AxiosResponse } from 'axios';
 
 const API_URL = import.meta.env.VITE_API_URL || 'https://procure-to-pay-backend.fly.dev/api';
+// Server-Sent Events come from the ASGI server, which may live on another host
+const EVENTS_URL = import.meta.env.VITE_EVENTS_URL || API_URL;
+
+// EventSource cannot send headers, so streams open with a one-time ticket
+// (POST /events/ticket/) rather than the access token in the URL
+export const eventsUrl = (ticket: string) => `${EVENTS_URL}/events/?ticket=${encodeURIComponent(ticket)}`;
 
 const api: AxiosInstance = axios.create({
   baseURL: API_URL,
@@ -109,6 +115,16 @@ export const purchaseRequests = {
   // Get all purchase requests with optional query params
   getAll: (params = {}) => api.get('/requests/', { params }),
 
+  // Requests created, updated or deleted since a change-feed cursor (omit it for the initial sync)
+  getChanges: (since?: string | null, params = {}) =>
+    api.get('/requests/changes/', { params: since ? { ...params, since } : params }),
+
+  // One-time ticket for opening the request event stream
+  getEventsTicket: () => api.post('/events/ticket/'),
+
+  // Pending requests awaiting the current approver's level that they have not reviewed yet
+  getQueue: (params = {}) => api.get('/requests/queue/', { params }),
+
   // Get a single purchase request by ID
   getById: (id: string) => api.get(`/requests/${id}/`),
 
@@ -192,6 +208,21 @@ export const proforma = {
   }
 };
 
+// Background report jobs (Finance only): poll get() or listen for report.ready,
+// then download the job's document from /finance/documents/<id>/download/
+export const reports = {
+  create: (spec: {
+    columns?: string[];
+    filters?: { start_date?: string; end_date?: string; status?: string; department?: string };
+    format?: 'csv' | 'jsonl';
+  }) => api.post('/finance/reports/', spec),
+
+  get: (id: number) => api.get(`/finance/reports/${id}/`),
+
+  downloadDocument: (documentId: number) =>
+    api.get(`/finance/documents/${documentId}/download/`, { responseType: 'blob' })
+};
+
 // API Root
 export const getApiRoot = () => api.get('/');
 
@@ -201,5 +232,6 @@ export default {
   purchaseRequests,
   documents,
   proforma,
+  reports,
   getApiRoot
 };
\ No newline at end of file